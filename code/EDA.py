@@ -7,18 +7,27 @@ DATA_DIR = PROJECT_ROOT / 'data'
 
 sample_json = f"{DATA_DIR}/Nepal/ODI/1154649.json"
 
-match = extract_match_data(sample_json)
-x_1 = match.convert_json_to_df(0)
-x_2 = match.convert_json_to_df(1)
 
-print(f"{x_1['runs.total'].sum()}/ {x_1['is_wicket'].sum()} ")
-print(f"{x_2['runs.total'].sum()}/ {x_2['is_wicket'].sum()} ")
+def main():
+    match = extract_match_data(sample_json)
+    df = match.convert_match_to_df(with_state=True)
 
+    # Last ball of each innings carries the final match state (see match_state.py)
+    final = df.groupby('innings_number').tail(1)
+    for row in final.itertuples():
+        print(f"{row.team} {row.innings_runs}/{row.innings_wickets} ({row.legal_balls // 6}.{row.legal_balls % 6} overs)")
 
-runs_compare = (x_1['runs.total'].sum()) - (x_2['runs.total'].sum())
+    chase = final[final['target_runs'].notna()]
+    if not chase.empty:
+        row = chase.iloc[-1]
+        if row['runs_required'] == 0:
+            print(f"{row['team']} won by {10 - row['innings_wickets']} wickets")
+        else:
+            print(f"{final.iloc[0]['team']} won by {row['runs_required'] - 1} runs")
 
-if (runs_compare > 0):
-    print(f"1st innings wins by {runs_compare} runs")
-else:
-    print("2nd innings wins by  wickets")
+    # Chase situations are plain filters on the state columns
+    tight = df[(df['runs_required'] > 0) & (df['balls_remaining'] <= 60) & (df['required_run_rate'] > 6)]
+    print(f"Balls bowled with over 6 an over needed in the last 10 overs: {len(tight)}")
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pc = None
+    pq = None
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+from corpus import DEFAULT_DATA_DIRS, match_files
+from bulk_loader import FRAME_COLUMNS, FLOAT_COLUMNS, INT_COLUMNS, NULLABLE_INT_COLUMNS
+from player_registry import PLAYER_ID_COLUMNS
+from ingest_manifest import FileState
+from process_nepal_odi import flatten_match_batch, match_info_record
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CODE_DIR = PROJECT_ROOT / 'code'
+DATA_DIR = PROJECT_ROOT / 'data'
+
+SNAPSHOT_DIR = DATA_DIR / 'snapshot'
+
+
+'''
+Embedded analytics over a Parquet snapshot of the corpus (no database server needed).
+- Matches and deliveries are written as Parquet, hive-partitioned by match_type and season:
+      snapshot/cricket_deliveries/match_type=ODI/season=2018/part.parquet
+      snapshot/cricket_matches/match_type=ODI/season=2018/part.parquet
+- Columns follow the cricket_matches / cricket_deliveries tables in database_model.py,
+  with match_type and season coming from the partition path; deliveries carry the player
+  names (as in the file) instead of the player IDs.
+- snapshot/_manifest.json records size, mtime and sha256 per source file, so a rebuild
+  only re-flattens new or changed files and only rewrites the partitions they touch.
+- DuckDB exposes both tables as views over the Parquet files.
+
+Use case
+build_snapshot()
+con = connect_snapshot()
+con.sql("SELECT batter, SUM(runs_batter) AS runs FROM cricket_deliveries GROUP BY 1 ORDER BY 2 DESC LIMIT 10").df()
+'''
+
+MATCH_COLUMNS = ['match_id', 'match_type_number', 'gender', 'venue', 'city', 'dates',
+                 'team1', 'team2', 'toss_winner', 'toss_decision',
+                 'winner', 'result_type', 'result_margin', 'player_of_match']
+PARTITION_COLUMNS = ['match_type', 'season']
+
+MANIFEST_FILE = '_manifest.json'
+PART_FILE = 'part.parquet'
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for the Parquet snapshot: uv add pyarrow")
+
+
+def _require_duckdb():
+    if duckdb is None:
+        raise ImportError("duckdb is required to query the snapshot: uv add duckdb")
+
+
+def delivery_schema():
+    """Arrow schema for the deliveries files (partition columns live in the path; player names, not IDs)"""
+    int_columns = set(INT_COLUMNS) | set(NULLABLE_INT_COLUMNS)
+    return pa.schema([(col, pa.int64() if col in int_columns else pa.float64() if col in FLOAT_COLUMNS else pa.string())
+                      for col in FRAME_COLUMNS if col not in PARTITION_COLUMNS and col not in PLAYER_ID_COLUMNS])
+
+
+def match_schema():
+    """Arrow schema for the matches files (partition columns live in the path)"""
+    return pa.schema([(col, pa.int64() if col == 'match_type_number' else pa.string()) for col in MATCH_COLUMNS])
+
+
+def season_key(season):
+    """Partition value for a Cricsheet season ('2018/19' -> '2018-19')"""
+    return str(season).replace('/', '-') if season is not None else 'unknown'
+
+
+def partition_key(info):
+    return (info.get('match_type') or 'unknown', season_key(info.get('season')))
+
+
+def partition_dir(root, table_name, key):
+    match_type, season = key
+    return Path(root) / table_name / f"match_type={match_type}" / f"season={season}"
+
+
+class AnalyticsSnapshot:
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR, data_dirs=None, workers=1):
+        """
+        Args:
+            snapshot_dir: Root directory of the Parquet snapshot
+            data_dirs: Directories with match JSON files (defaults to Nepal ODI/ODM/T20)
+            workers: Worker processes used to flatten changed files
+        """
+        self.snapshot_dir = Path(snapshot_dir)
+        self.data_dirs = [Path(d) for d in (data_dirs or DEFAULT_DATA_DIRS)]
+        self.workers = workers
+
+    def load_manifest(self):
+        manifest_path = self.snapshot_dir / MANIFEST_FILE
+        if not manifest_path.exists():
+            return {}
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest):
+        manifest_path = self.snapshot_dir / MANIFEST_FILE
+        tmp_path = manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+
+    def source_files(self):
+        """match_id -> file path (first directory wins for duplicates)"""
+        return match_files(self.data_dirs)
+
+    def plan(self, manifest, files):
+        """Return (changed match_ids with their FileState, removed match_ids)"""
+        changed = {}
+        for match_id, file_path in files.items():
+            state = FileState(file_path, match_id)
+            entry = manifest.get(match_id)
+            if entry and entry['file_path'] == str(file_path) and entry['file_size'] == state.file_size \
+                    and entry['file_mtime'] == state.file_mtime:
+                continue
+            if entry and state.compute_hash() == entry['content_hash']:
+                # Same content: only the stat moved
+                entry.update(file_path=str(file_path), file_size=state.file_size, file_mtime=state.file_mtime)
+                continue
+            if state.content_hash is None:
+                state.compute_hash()
+            changed[match_id] = state
+        removed = [match_id for match_id in manifest if match_id not in files]
+        return changed, removed
+
+    def flatten(self, states):
+        """Flatten changed files, in a process pool when workers > 1"""
+        paths = [str(state.file_path) for state in states.values()]
+        if self.workers > 1 and len(paths) > 1:
+            chunk = max(1, len(paths) // (self.workers * 4))
+            batches = [paths[i:i + chunk] for i in range(0, len(paths), chunk)]
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                for results in pool.map(flatten_match_batch, batches):
+                    yield from results
+        else:
+            yield from flatten_match_batch(paths)
+
+    def schema_current(self):
+        """False when the existing deliveries files were written with other columns"""
+        part_path = next((self.snapshot_dir / 'cricket_deliveries').glob('**/' + PART_FILE), None)
+        return part_path is None or pq.read_schema(part_path).names == delivery_schema().names
+
+    def rewrite_partition(self, table_name, key, schema, new_frames, drop_ids):
+        """Rewrite one partition file: keep untouched matches, drop changed/removed ones, add new rows"""
+        directory = partition_dir(self.snapshot_dir, table_name, key)
+        part_path = directory / PART_FILE
+        tables = []
+        if part_path.exists():
+            existing = pq.read_table(part_path, schema=schema)
+            if drop_ids:
+                keep = pc.invert(pc.is_in(existing['match_id'], pa.array(sorted(drop_ids))))
+                existing = existing.filter(keep)
+            tables.append(existing)
+        for frame in new_frames:
+            tables.append(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+
+        combined = pa.concat_tables(tables) if tables else schema.empty_table()
+        if combined.num_rows == 0:
+            if part_path.exists():
+                part_path.unlink()
+            return 0
+
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = directory / (PART_FILE + '.tmp')
+        pq.write_table(combined, tmp_path, compression='zstd')
+        os.replace(tmp_path, part_path)
+        return combined.num_rows
+
+    def build(self, rebuild=False):
+        """Bring the snapshot up to date with the source files; returns a summary dict"""
+        _require_pyarrow()
+        started = time.perf_counter()
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+        if not rebuild and not self.schema_current():
+            print("🔁 Deliveries schema changed since the last build, rebuilding")
+            rebuild = True
+        manifest = {} if rebuild else self.load_manifest()
+        if rebuild:
+            for table_name in ('cricket_matches', 'cricket_deliveries'):
+                for part_path in (self.snapshot_dir / table_name).glob('**/' + PART_FILE):
+                    part_path.unlink()
+
+        files = self.source_files()
+        changed, removed = self.plan(manifest, files)
+
+        # Partition -> new rows and the match_ids to drop from it
+        new_matches, new_deliveries, drops = {}, {}, {}
+        for match_id in removed:
+            key = tuple(manifest[match_id]['partition'])
+            drops.setdefault(key, set()).add(match_id)
+            del manifest[match_id]
+
+        failed = []
+        for match_id, meta, info, table, error, _ in self.flatten(changed):
+            if error is not None:
+                print(f"  ❌ Error processing {match_id}: {error}")
+                failed.append(match_id)
+                continue
+            state = changed[match_id]
+            key = partition_key(info)
+            previous = manifest.get(match_id)
+            if previous:
+                drops.setdefault(tuple(previous['partition']), set()).add(match_id)
+            drops.setdefault(key, set()).add(match_id)
+
+            new_matches.setdefault(key, []).append(match_info_record(info, match_id))
+            new_deliveries.setdefault(key, []).append(table.drop(columns=PARTITION_COLUMNS, errors='ignore'))
+            manifest[match_id] = {
+                'file_path': str(state.file_path),
+                'file_size': state.file_size,
+                'file_mtime': state.file_mtime,
+                'content_hash': state.content_hash,
+                'revision': (meta or {}).get('revision'),
+                'partition': list(key),
+            }
+
+        touched = set(drops) | set(new_matches)
+        for key in sorted(touched):
+            match_frames = [pd.DataFrame(new_matches[key], columns=MATCH_COLUMNS)] if key in new_matches else []
+            self.rewrite_partition('cricket_matches', key, match_schema(), match_frames, drops.get(key, set()))
+            self.rewrite_partition('cricket_deliveries', key, delivery_schema(),
+                                   new_deliveries.get(key, []), drops.get(key, set()))
+
+        self.save_manifest(manifest)
+        summary = {
+            'matches': len(manifest),
+            'changed': len(changed) - len(failed),
+            'removed': len(removed),
+            'failed': len(failed),
+            'partitions_rewritten': len(touched),
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+        print(f"📦 Snapshot {self.snapshot_dir}: {summary['matches']} matches, "
+              f"{summary['changed']} changed, {summary['removed']} removed, "
+              f"{summary['partitions_rewritten']} partitions rewritten in {summary['seconds']}s")
+        return summary
+
+    def connect(self, database=':memory:'):
+        """DuckDB connection with cricket_matches and cricket_deliveries views over the snapshot"""
+        _require_duckdb()
+        con = duckdb.connect(database)
+        for table_name in ('cricket_matches', 'cricket_deliveries'):
+            pattern = (self.snapshot_dir / table_name / '**' / '*.parquet').as_posix()
+            con.execute(f"""
+                CREATE OR REPLACE VIEW {table_name} AS
+                SELECT * FROM read_parquet('{pattern}', hive_partitioning = true,
+                                           hive_types = {{'match_type': VARCHAR, 'season': VARCHAR}})
+            """)
+        return con
+
+
+def build_snapshot(snapshot_dir=SNAPSHOT_DIR, data_dirs=None, workers=1, rebuild=False):
+    return AnalyticsSnapshot(snapshot_dir, data_dirs, workers).build(rebuild=rebuild)
+
+
+def connect_snapshot(snapshot_dir=SNAPSHOT_DIR):
+    return AnalyticsSnapshot(snapshot_dir).connect()
+
+
+def main(argv=None):
+    """Build the snapshot or run a query against it"""
+    parser = argparse.ArgumentParser(description="Parquet + DuckDB analytics snapshot of the match corpus")
+    parser.add_argument('--snapshot-dir', default=str(SNAPSHOT_DIR))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Create or incrementally update the snapshot")
+    build_parser.add_argument('--data-dir', action='append', default=None,
+                              help="Directory with match JSON files, repeatable (default: Nepal ODI/ODM/T20)")
+    build_parser.add_argument('--workers', type=int, default=1)
+    build_parser.add_argument('--rebuild', action='store_true', help="Ignore the manifest and rewrite everything")
+
+    query_parser = subparsers.add_parser('query', help="Run SQL against cricket_matches / cricket_deliveries")
+    query_parser.add_argument('sql')
+
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        build_snapshot(args.snapshot_dir, args.data_dir, args.workers, args.rebuild)
+    else:
+        con = connect_snapshot(args.snapshot_dir)
+        started = time.perf_counter()
+        result = con.sql(args.sql)
+        print(result)
+        print(f"⏱️  {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+except ImportError:  # SQLAlchemy's asyncio extension needs greenlet
+    create_async_engine = None
+
+from database_model import (CricketDelivery, CricketMatch, bump_ingest_version, create_schema, engine_options,
+                            get_database_config)
+from corpus import unique_match_files
+from bulk_loader import DELIVERY_COLUMNS, ThroughputReport, insert_deliveries_executemany, table_tuples
+from exploring_json_data_struct import extract_match_data
+from ingest_manifest import ManifestIndex, delete_match_rows, record_manifest, touch_manifest, SKIP, TOUCH, REPLACE
+from player_registry import PlayerRegistry, assign_player_ids, delivery_names, match_people
+from process_nepal_odi import flatten_match_deliveries, match_info_record
+from match_validation import MatchValidationError, QuarantineReport, QUARANTINE_REPORT
+from matchups import add_match_matchups
+from scorecards import refresh_match_scorecards
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CODE_DIR = PROJECT_ROOT / 'code'
+DATA_DIR = PROJECT_ROOT / 'data'
+
+
+'''
+asyncio ingest pipeline: file reads, parsing and database writes overlap instead of taking turns.
+
+    read (threads) --[read queue]--> flatten (process pool) --[write queue]--> write (async DB)
+
+- read: plans each file against the ingest manifest and reads new/changed files off the
+  event loop (asyncio.to_thread). Unchanged files never leave this stage.
+- flatten: json.loads + convert_match_to_df + deliveries_frame_to_rows in a process pool,
+  with one task per worker so the pool is never oversubscribed.
+- write: several writers, each committing a batch of matches per transaction through
+  SQLAlchemy's async engine (asyncpg on PostgreSQL, aiosqlite on SQLite). On asyncpg the
+  deliveries go in with COPY (copy_records_to_table); elsewhere with executemany.
+  If a batch fails it is retried match by match so one bad file only fails itself.
+- Both queues are bounded, so a slow stage makes the one before it wait (backpressure)
+  and at most queue_size files per queue are held in memory.
+- The run ends with a report of per-stage busy time, time starved waiting for input,
+  time blocked on a full output queue, and the depth of each output queue.
+
+Use case
+python main.py ingest-async --database-url postgresql://user:pw@db-host/cricket_nepal --writers 4
+'''
+
+DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+DONE = object()  # end-of-stream marker passed through the queues
+
+
+def async_database_url(database_url):
+    """postgresql:// -> postgresql+asyncpg://, sqlite:// -> sqlite+aiosqlite:// (async URLs are kept)"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if url.get_driver_name() in ('asyncpg', 'aiosqlite', 'psycopg_async'):
+        return url
+    if backend not in DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r}")
+    return url.set(drivername=DRIVERS[backend])
+
+
+def flatten_match_bytes(file_path, raw, validate=False):
+    """Executor task: parse one file's bytes and return (meta, info, deliveries table)"""
+    match_id = Path(file_path).stem
+    match_data = extract_match_data(str(file_path), data=json.loads(raw))
+    table = flatten_match_deliveries(match_data, match_id, validate)
+    return match_data.data.get('meta'), match_data.data['info'], table
+
+
+def plan_and_read(manifest, file_path, match_id):
+    """Thread task: manifest plan for a file, plus its bytes when it has to be loaded"""
+    action, state = manifest.plan(file_path, match_id)
+    if action in (SKIP, TOUCH):
+        return action, state, None
+    with open(file_path, 'rb') as f:
+        return action, state, f.read()
+
+
+class StageStats:
+    """Time split and output-queue depth of one pipeline stage (summed over its tasks)"""
+    def __init__(self, name, tasks):
+        self.name = name
+        self.tasks = tasks
+        self.items = 0
+        self.busy = 0.0      # doing the stage's own work
+        self.starved = 0.0   # waiting for input
+        self.blocked = 0.0   # waiting for room in the output queue
+        self.depth_total = 0
+        self.depth_samples = 0
+        self.depth_max = 0
+
+    async def get(self, q):
+        started = time.perf_counter()
+        item = await q.get()
+        self.starved += time.perf_counter() - started
+        return item
+
+    async def put(self, q, item):
+        depth = q.qsize()
+        self.depth_total += depth
+        self.depth_samples += 1
+        self.depth_max = max(self.depth_max, depth)
+        started = time.perf_counter()
+        await q.put(item)
+        self.blocked += time.perf_counter() - started
+
+    def row(self, capacity):
+        avg_depth = self.depth_total / self.depth_samples if self.depth_samples else 0.0
+        depth = f"{avg_depth:4.1f} / {self.depth_max} of {capacity}" if capacity else "-"
+        return (f"  {self.name:<8} {self.tasks:>5} {self.items:>6} {self.busy:>8.2f} "
+                f"{self.starved:>9.2f} {self.blocked:>9.2f}   {depth}")
+
+
+class AsyncIngestPipeline:
+    def __init__(self, database_url=None, data_dir=None, flatten_workers=None, writers=2,
+                 batch_size=8, queue_size=16, scorecards=True, matchups=True,
+                 validate=True, quarantine=None):
+        """
+        Args:
+            database_url: Sync or async connection string (defaults to get_database_config())
+            data_dir: Directory (or list of directories) with match JSON files
+                      (defaults to data/Nepal/ODI)
+            flatten_workers: Processes flattening files (defaults to the CPU count)
+            writers: Concurrent writer tasks, each with its own connection
+                     (SQLite allows one writer at a time, so it is capped at 1)
+            batch_size: Matches committed per transaction
+            queue_size: Capacity of each queue between stages
+            scorecards: Refresh the scorecard tables in the same transaction
+            matchups: Add the matches to the matchup index in the same transaction
+            validate: Check each flattened match in the parser processes; files with errors
+                      go to the quarantine report instead of the write queue
+            quarantine: QuarantineReport for rejected files (defaults to data/quarantine/quarantine.jsonl)
+        """
+        if create_async_engine is None:
+            raise ImportError("async ingest needs SQLAlchemy's asyncio extension: uv sync --extra async")
+        if data_dir is None:
+            self.data_dirs = [DATA_DIR / "Nepal" / "ODI"]
+        elif isinstance(data_dir, (list, tuple)):
+            self.data_dirs = [Path(d) for d in data_dir]
+        else:
+            self.data_dirs = [Path(data_dir)]
+        self.url = async_database_url(database_url or get_database_config())
+        self.flatten_workers = flatten_workers or os.cpu_count() or 1
+        self.writers = 1 if self.url.get_backend_name() == 'sqlite' else writers
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.scorecards = scorecards
+        self.matchups = matchups
+        self.validate = validate
+        self.quarantine = quarantine or QuarantineReport()
+        self.use_copy = self.url.get_driver_name() == 'asyncpg'
+        self.throughput = ThroughputReport('async')
+        self.manifest = None
+        self.players = None
+        self.counts = {'successful': 0, 'failed': 0, 'skipped': 0, 'quarantined': 0}
+        self.stats = {
+            'read': StageStats('read', 1),
+            'flatten': StageStats('flatten', self.flatten_workers),
+            'write': StageStats('write', self.writers),
+        }
+
+    def get_all_files(self):
+        json_files = []
+        for data_dir in self.data_dirs:
+            json_files.extend(sorted(data_dir.glob("*.json")))
+        # First directory wins for a match in several of them (see NepalODIProcessor.get_all_odi_files)
+        unique_files = unique_match_files(json_files, self.data_dirs)
+        duplicates = len(json_files) - len(unique_files)
+        print(f"Found {len(unique_files)} match files"
+              + (f" ({duplicates} copies in later directories ignored)" if duplicates else ''))
+        return unique_files
+
+    # --- Stages ---------------------------------------------------------------------
+
+    async def read_stage(self, json_files, read_q, write_q):
+        stats = self.stats['read']
+        queued = set()
+        for file_path in json_files:
+            match_id = file_path.stem
+            started = time.perf_counter()
+            try:
+                action, state, raw = await asyncio.to_thread(plan_and_read, self.manifest, file_path, match_id)
+            except Exception as e:
+                print(f"  ❌ Error processing {match_id}: {e}")
+                self.counts['failed'] += 1
+                continue
+            finally:
+                stats.busy += time.perf_counter() - started
+            stats.items += 1
+
+            if action == SKIP or match_id in queued:
+                self.counts['skipped'] += 1
+            elif action == TOUCH:
+                # Nothing to parse; the writer only refreshes the manifest row
+                await stats.put(write_q, (match_id, action, state, None, None, None, None))
+            else:
+                queued.add(match_id)
+                await stats.put(read_q, (match_id, action, state, file_path, raw))
+
+        for _ in range(self.flatten_workers):
+            await read_q.put(DONE)
+
+    async def flatten_stage(self, pool, read_q, write_q):
+        stats = self.stats['flatten']
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await stats.get(read_q)
+            if item is DONE:
+                return
+            match_id, action, state, file_path, raw = item
+            started = time.perf_counter()
+            try:
+                meta, info, table = await loop.run_in_executor(pool, flatten_match_bytes, str(file_path), raw,
+                                                               self.validate)
+                result = (match_id, action, state, meta, info, table, None)
+            except MatchValidationError as e:
+                # Rejected before it reaches the write queue
+                self.quarantine.add(match_id, file_path, e.issues)
+                self.counts['quarantined'] += 1
+                result = None
+            except Exception as e:
+                result = (match_id, action, state, None, None, None, str(e))
+            stats.busy += time.perf_counter() - started
+            stats.items += 1
+            if result is not None:
+                await stats.put(write_q, result)
+
+    async def write_stage(self, Session, write_q):
+        stats = self.stats['write']
+        finished = False
+        while not finished:
+            batch = []
+            item = await stats.get(write_q)
+            while item is not DONE:
+                batch.append(item)
+                if len(batch) >= self.batch_size or write_q.empty():
+                    break
+                item = write_q.get_nowait()
+            finished = item is DONE
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            await self.write_batch(Session, batch)
+            stats.busy += time.perf_counter() - started
+            stats.items += len(batch)
+
+    # --- Writing --------------------------------------------------------------------
+
+    async def write_batch(self, Session, batch):
+        """Commit a batch in one transaction; on failure retry its matches one by one"""
+        failed = [item for item in batch if item[6] is not None]
+        for match_id, *_, error in failed:
+            print(f"  ❌ Error processing {match_id}: {error}")
+            self.counts['failed'] += 1
+        batch = [item for item in batch if item[6] is None]
+        if not batch:
+            return
+
+        try:
+            await self.commit_matches(Session, batch)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                print(f"  ❌ Error processing {batch[0][0]}: {e}")
+                self.counts['failed'] += 1
+                return
+        for item in batch:
+            try:
+                await self.commit_matches(Session, [item])
+            except Exception as e:
+                print(f"  ❌ Error processing {item[0]}: {e}")
+                self.counts['failed'] += 1
+
+    async def commit_matches(self, Session, batch):
+        async with Session() as session:
+            rows, write_seconds, new_players = await session.run_sync(self.write_match_rows, batch)
+            if self.use_copy:
+                started = time.perf_counter()
+                rows += await self.copy_deliveries(session, batch)
+                write_seconds += time.perf_counter() - started
+            started = time.perf_counter()
+            await session.run_sync(self.finish_matches, batch)
+            await session.commit()
+            commit_seconds = time.perf_counter() - started
+        for pending in new_players:
+            self.players.remember(pending)
+
+        for match_id, action, state, meta, *_ in batch:
+            if action == TOUCH:
+                self.manifest.mark_loaded(state, self.manifest.previous_revision(match_id))
+                print(f"  ⏭️  Match {match_id} unchanged, skipping...")
+            else:
+                self.manifest.mark_loaded(state, (meta or {}).get('revision'))
+                print(f"Processing match: {match_id}")
+            self.counts['successful'] += 1
+        loaded = [item for item in batch if item[1] != TOUCH]
+        if loaded:
+            self.throughput.record(rows, write_seconds, commit_seconds, matches=len(loaded))
+
+    def write_match_rows(self, session, batch):
+        """
+        Sync part 1 (run_sync): replace old rows, add matches, resolve players and, without COPY,
+        insert deliveries. Returns (rows, seconds inserting them, players to remember after the commit).
+        """
+        rows, write_seconds, new_players = 0, 0.0, []
+        for match_id, action, state, meta, info, table, _ in batch:
+            if action == TOUCH:
+                touch_manifest(session, state)
+                continue
+            if action == REPLACE:
+                previous = self.manifest.previous_revision(match_id)
+                print(f"  🔄 Match {match_id} changed (revision {previous} -> {(meta or {}).get('revision')}), "
+                      f"replacing rows...")
+                delete_match_rows(session, match_id)
+            session.add(CricketMatch(**match_info_record(info, match_id)))
+            player_ids, pending = self.players.resolve(session, match_people(info, delivery_names(table)))
+            assign_player_ids(table, player_ids)
+            new_players.append(pending)
+        session.flush()
+        if not self.use_copy:
+            started = time.perf_counter()
+            for match_id, action, state, meta, info, table, _ in batch:
+                if action != TOUCH and not table.empty:
+                    rows += insert_deliveries_executemany(session.connection(), table)
+            write_seconds = time.perf_counter() - started
+        return rows, write_seconds, new_players
+
+    async def copy_deliveries(self, session, batch):
+        """asyncpg COPY of every delivery table in the batch, inside the session's transaction"""
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+        rows = 0
+        for match_id, action, state, meta, info, table, _ in batch:
+            if action == TOUCH or table.empty:
+                continue
+            await raw.driver_connection.copy_records_to_table(
+                CricketDelivery.__tablename__, records=table_tuples(table), columns=DELIVERY_COLUMNS)
+            rows += len(table)
+        return rows
+
+    def finish_matches(self, session, batch):
+        """Sync part 2 (run_sync): scorecards, matchups, manifest rows and the ingest version"""
+        changed = False
+        for match_id, action, state, meta, *_ in batch:
+            if action == TOUCH:
+                continue
+            if self.scorecards:
+                refresh_match_scorecards(session, match_id)
+            if self.matchups:
+                add_match_matchups(session, match_id)
+            record_manifest(session, state, meta)
+            changed = True
+        if changed:
+            bump_ingest_version(session)
+
+    # --- Run ------------------------------------------------------------------------
+
+    async def run_async(self):
+        json_files = self.get_all_files()
+        if not json_files:
+            print("No JSON files found")
+            return False
+
+        engine = create_async_engine(self.url, **engine_options(self.url, 'bulk-ingest'))
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(create_schema)
+            print("✅ Database connected successfully!")
+            Session = async_sessionmaker(engine, expire_on_commit=False)
+            async with Session() as session:
+                self.manifest = await session.run_sync(ManifestIndex.load)
+                self.players = await session.run_sync(PlayerRegistry.load)
+
+            read_q = asyncio.Queue(maxsize=self.queue_size)
+            write_q = asyncio.Queue(maxsize=self.queue_size)
+            started = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=self.flatten_workers) as pool:
+                writers = [asyncio.create_task(self.write_stage(Session, write_q)) for _ in range(self.writers)]
+                flatteners = [asyncio.create_task(self.flatten_stage(pool, read_q, write_q))
+                              for _ in range(self.flatten_workers)]
+                await self.read_stage(json_files, read_q, write_q)
+                await asyncio.gather(*flatteners)
+                for _ in writers:
+                    await write_q.put(DONE)
+                await asyncio.gather(*writers)
+            elapsed = time.perf_counter() - started
+        finally:
+            await engine.dispose()
+
+        self.print_report(len(json_files), elapsed)
+        return self.counts['successful'] + self.counts['skipped'] > 0
+
+    def run(self):
+        return asyncio.run(self.run_async())
+
+    def print_report(self, total_files, elapsed):
+        print(f"\n📊 Processing Complete:")
+        print(f"✅ Successful: {self.counts['successful'] + self.counts['skipped']}")
+        print(f"❌ Failed: {self.counts['failed']}")
+        print(self.quarantine.summary())
+        print(f"📁 Total files: {total_files}")
+        print(self.throughput.summary())
+        print(f"\n⏱️  Pipeline stages ({elapsed:.2f}s wall):")
+        print(f"  {'stage':<8} {'tasks':>5} {'items':>6} {'busy s':>8} {'starved s':>9} {'blocked s':>9}   out-queue avg / max")
+        print(self.stats['read'].row(self.queue_size))
+        print(self.stats['flatten'].row(self.queue_size))
+        print(self.stats['write'].row(None))
+
+
+def main(argv=None):
+    """Run the asyncio ingest pipeline"""
+    parser = argparse.ArgumentParser(description="Load match JSON files with overlapping read / parse / write stages")
+    parser.add_argument('--database-url', default=None, help="Defaults to the DB_* environment variables")
+    parser.add_argument('--data-dir', action='append', default=None,
+                        help="Directory with match JSON files, repeatable (default: data/Nepal/ODI)")
+    parser.add_argument('--flatten-workers', type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument('--writers', type=int, default=2, help="Concurrent database writers (1 on SQLite)")
+    parser.add_argument('--batch-size', type=int, default=8, help="Matches per transaction")
+    parser.add_argument('--queue-size', type=int, default=16, help="Capacity of each queue between stages")
+    parser.add_argument('--no-scorecards', dest='scorecards', action='store_false',
+                        help="Skip refreshing the scorecard tables")
+    parser.add_argument('--no-matchups', dest='matchups', action='store_false',
+                        help="Skip the matchup index")
+    parser.add_argument('--no-validate', dest='validate', action='store_false',
+                        help="Skip the pre-ingest checks of each flattened match")
+    parser.add_argument('--quarantine-report', default=str(QUARANTINE_REPORT),
+                        help="JSON lines file listing the files that failed validation")
+    args = parser.parse_args(argv)
+
+    print("🏏 Nepal Data Processor (async)")
+    print("=" * 40)
+    pipeline = AsyncIngestPipeline(args.database_url, args.data_dir, args.flatten_workers, args.writers,
+                                   args.batch_size, args.queue_size, args.scorecards, args.matchups,
+                                   args.validate, QuarantineReport(args.quarantine_report))
+    if pipeline.run():
+        print("\n🎉 Data processing completed successfully!")
+    else:
+        print("\n💥 Data processing failed!")
+
+
+if __name__ == "__main__":
+    main()
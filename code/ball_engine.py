@@ -0,0 +1,559 @@
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from corpus import DEFAULT_DATA_DIRS, match_files
+from exploring_json_data_struct import extract_match_data
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CODE_DIR = PROJECT_ROOT / 'code'
+DATA_DIR = PROJECT_ROOT / 'data'
+
+ENGINE_DIR = DATA_DIR / 'engine'
+
+
+'''
+In-memory ball-by-ball engine for interactive analysis.
+- The whole corpus lives in flat NumPy columns, one element per delivery, in file order
+  (match by match, innings by innings), built from convert_match_to_df.
+- Player, team, match type and dismissal names are interned to small integer IDs
+  (-1 means "none"), so a ball row is ~50 bytes instead of a row of Python strings.
+- Offset tables give the ball range of every match and every innings:
+      balls of match m      -> match_offsets[m]:match_offsets[m + 1]
+      innings of match m    -> match_innings[m]:match_innings[m + 1]
+      balls of innings i    -> innings_offsets[i]:innings_offsets[i + 1]
+- Scorecards and player totals are bincount / reduceat over those arrays (no Python loop over balls).
+- save() writes one .npy per column plus names.json; load(mmap=True) maps the columns
+  read-only, so several processes share one copy through the page cache.
+  The engine also pickles as plain arrays.
+
+Use case
+engine = build_engine()                       # or BallEngine.load("data/engine")
+engine.batting_scorecard("1154649", 0)
+engine.batting_totals(engine.mask(match_type="ODI")).head(10)
+engine.balls_frame(engine.mask(batter="S Lamichhane", bowler="Rashid Khan"))
+'''
+
+# Per-ball columns and their storage types
+BALL_COLUMNS = {
+    'match': np.int32,          # index into the match table
+    'innings': np.int32,        # index into the innings table
+    'over': np.int16,
+    'ball': np.int16,
+    'batter': np.int32,
+    'non_striker': np.int32,
+    'bowler': np.int32,
+    'runs_batter': np.int16,
+    'runs_extras': np.int16,
+    'runs_total': np.int16,
+    'wides': np.int16,
+    'legbyes': np.int16,
+    'noballs': np.int16,
+    'byes': np.int16,
+    'penalty': np.int16,
+    'wickets': np.int8,
+    'player_out': np.int32,
+    'wicket_kind': np.int16,
+    'fielder': np.int32,
+}
+# Per-innings columns
+INNINGS_COLUMNS = {
+    'innings_match': np.int32,
+    'innings_number': np.int8,
+    'innings_team': np.int32,
+    'innings_super_over': np.bool_,
+}
+# Per-match columns (match_ids is a fixed-width unicode array)
+MATCH_COLUMNS = {
+    'match_type': np.int16,
+    'match_team1': np.int32,
+    'match_team2': np.int32,
+    'match_date': 'datetime64[D]',
+}
+OFFSET_COLUMNS = ['match_offsets', 'match_innings', 'innings_offsets']
+NAME_TABLES = ['players', 'teams', 'match_types', 'wicket_kinds']
+
+# Source columns of convert_match_to_df -> ball column
+SOURCE_COLUMNS = {
+    'overs': 'over', 'balls': 'ball',
+    'runs.batter': 'runs_batter', 'runs.extras': 'runs_extras', 'runs.total': 'runs_total',
+    'extras.wides': 'wides', 'extras.legbyes': 'legbyes', 'extras.noballs': 'noballs',
+    'extras.byes': 'byes', 'extras.penalty': 'penalty', 'wicket_count': 'wickets',
+}
+
+NAMES_FILE = 'names.json'
+
+
+class NameTable:
+    """Intern strings to dense integer IDs (None / NaN -> -1)"""
+    def __init__(self, names=None):
+        self.names = list(names or [])
+        self.ids = {name: i for i, name in enumerate(self.names)}
+
+    def intern(self, name):
+        if name is None or (isinstance(name, float) and np.isnan(name)):
+            return -1
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+        return self.ids[name]
+
+    def encode(self, values):
+        """Vectorised intern of a column: factorize once, intern only the distinct values"""
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        if len(uniques) == 0:
+            return np.full(len(codes), -1, dtype=np.int32)
+        lookup = np.array([self.intern(name) for name in uniques], dtype=np.int32)
+        return np.where(codes >= 0, lookup[codes], -1).astype(np.int32)
+
+    def get(self, name):
+        """ID of a name, None when it was never interned (never the -1 "none" code)"""
+        return self.ids.get(name)
+
+    def equals(self, ids, name):
+        """ids == the name's ID; all False for a name that was never interned"""
+        code = self.get(name)
+        if code is None:
+            return np.zeros(len(ids), dtype=bool)
+        return ids == code
+
+    def decode(self, ids):
+        """Integer IDs -> object array of names (None for -1)"""
+        table = np.array(self.names + [None], dtype=object)
+        ids = np.asarray(ids)
+        return table[np.where(ids >= 0, ids, len(self.names))]
+
+    def __len__(self):
+        return len(self.names)
+
+
+def flatten_engine_batch(file_paths, streaming=False, archive_path=None):
+    """
+    Worker task: (match_id, info, convert_match_to_df frame, error) for each file
+    (archive members when archive_path is given)
+    """
+    archive = None
+    if archive_path is not None:
+        from match_archive import open_archive
+        archive = open_archive(archive_path)
+    results = []
+    for file_path in file_paths:
+        match_id = Path(file_path).stem
+        try:
+            match_data = extract_match_data(str(file_path), streaming=streaming, archive=archive)
+            results.append((match_id, match_data.data['info'], match_data.convert_match_to_df(), None))
+        except Exception as e:
+            results.append((match_id, None, None, str(e)))
+    return results
+
+
+class EngineBuilder:
+    """Accumulates flattened matches and produces a BallEngine"""
+    def __init__(self):
+        self.names = {name: NameTable() for name in NAME_TABLES}
+        self.ball_parts = {col: [] for col in BALL_COLUMNS}
+        self.innings_rows = []
+        self.match_rows = []
+        self.match_ids = []
+        self.ball_count = 0
+
+    def add_match(self, match_id, info, df):
+        players, teams = self.names['players'], self.names['teams']
+        match_index = len(self.match_ids)
+        first_innings = len(self.innings_rows)
+        n = len(df)
+
+        innings_number = df['innings_number'].to_numpy(dtype=np.int64)
+        # Deliveries come innings by innings, so each innings is one contiguous run
+        starts = np.flatnonzero(np.r_[True, innings_number[1:] != innings_number[:-1]]) if n else np.array([], int)
+        innings_index = np.cumsum(np.r_[0, (innings_number[1:] != innings_number[:-1])]) + first_innings if n else []
+        for start in starts:
+            self.innings_rows.append((match_index, int(innings_number[start]),
+                                      teams.intern(df['team'].iat[start]),
+                                      bool(df['super_over'].iat[start]), self.ball_count + int(start)))
+
+        parts = self.ball_parts
+        parts['match'].append(np.full(n, match_index, dtype=np.int32))
+        parts['innings'].append(np.asarray(innings_index, dtype=np.int32))
+        for source, column in SOURCE_COLUMNS.items():
+            parts[column].append(np.nan_to_num(df[source].to_numpy(dtype=float)).astype(BALL_COLUMNS[column]))
+        for column in ('batter', 'non_striker', 'bowler'):
+            parts[column].append(players.encode(df[column].to_numpy()))
+        parts['player_out'].append(players.encode(df['wicket_player_out'].to_numpy()))
+        parts['fielder'].append(players.encode(df['wicket_fielder'].to_numpy()))
+        parts['wicket_kind'].append(self.names['wicket_kinds'].encode(df['wicket_kind'].to_numpy()).astype(np.int16))
+
+        match_teams = info.get('teams', [])
+        dates = info.get('dates', [])
+        self.match_rows.append((
+            self.names['match_types'].intern(info.get('match_type')),
+            teams.intern(match_teams[0] if len(match_teams) > 0 else None),
+            teams.intern(match_teams[1] if len(match_teams) > 1 else None),
+            np.datetime64(str(dates[0]), 'D') if dates else np.datetime64('NaT', 'D'),
+            first_innings,
+        ))
+        self.match_ids.append(match_id)
+        self.ball_count += n
+
+    def build(self):
+        columns = {}
+        for column, dtype in BALL_COLUMNS.items():
+            parts = self.ball_parts[column]
+            columns[column] = np.concatenate(parts).astype(dtype) if parts else np.empty(0, dtype=dtype)
+
+        innings = list(zip(*self.innings_rows)) if self.innings_rows else [()] * 5
+        for (column, dtype), values in zip(INNINGS_COLUMNS.items(), innings):
+            columns[column] = np.array(values, dtype=dtype)
+        columns['innings_offsets'] = np.array(list(innings[4]) + [self.ball_count], dtype=np.int64)
+
+        matches = list(zip(*self.match_rows)) if self.match_rows else [()] * 5
+        for (column, dtype), values in zip(MATCH_COLUMNS.items(), matches):
+            columns[column] = np.array(values, dtype=dtype)
+        columns['match_innings'] = np.array(list(matches[4]) + [len(self.innings_rows)], dtype=np.int64)
+        match_offsets = columns['innings_offsets'][columns['match_innings']]
+        columns['match_offsets'] = match_offsets.astype(np.int64)
+        columns['match_ids'] = np.array(self.match_ids, dtype=str)
+
+        return BallEngine(columns, {name: table.names for name, table in self.names.items()})
+
+
+class BallEngine:
+    def __init__(self, columns, names):
+        """
+        Args:
+            columns: Column name -> NumPy array (ball, innings, match and offset columns)
+            names: Name table -> list of names (players, teams, match_types, wicket_kinds)
+        """
+        self.columns = columns
+        self.names = {name: NameTable(values) for name, values in names.items()}
+        self._match_index = None
+
+    # --- Construction and persistence -------------------------------------------------
+
+    @classmethod
+    def from_files(cls, file_paths, workers=1, batch_size=16, archive_path=None):
+        """
+        Flatten match files (in a process pool when workers > 1) and build the engine.
+        With archive_path, file_paths are members of that match archive.
+        """
+        builder = EngineBuilder()
+        file_paths = [str(path) for path in file_paths]
+        batches = [file_paths[i:i + batch_size] for i in range(0, len(file_paths), batch_size)]
+        archive_path = str(archive_path) if archive_path is not None else None
+        if workers > 1 and len(batches) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(flatten_engine_batch, batches, repeat(False), repeat(archive_path))
+                cls._add_results(builder, results)
+        else:
+            cls._add_results(builder, (flatten_engine_batch(batch, False, archive_path) for batch in batches))
+        return builder.build()
+
+    @staticmethod
+    def _add_results(builder, batch_results):
+        for results in batch_results:
+            for match_id, info, df, error in results:
+                if error is not None:
+                    print(f"  ❌ Error processing {match_id}: {error}")
+                    continue
+                builder.add_match(match_id, info, df)
+
+    def save(self, directory):
+        """Write one .npy per column and the name tables to a directory"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for column, values in self.columns.items():
+            np.save(directory / f"{column}.npy", values, allow_pickle=False)
+        with open(directory / NAMES_FILE, 'w') as f:
+            json.dump({name: table.names for name, table in self.names.items()}, f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Load a saved engine; with mmap=True columns are read-only memory maps"""
+        directory = Path(directory)
+        with open(directory / NAMES_FILE, 'r') as f:
+            names = json.load(f)
+        mmap_mode = 'r' if mmap else None
+        columns = {path.stem: np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+                   for path in directory.glob('*.npy')}
+        return cls(columns, names)
+
+    def __getstate__(self):
+        # Memory maps pickle as plain arrays; the match_id lookup is rebuilt on demand
+        return {'columns': {column: np.asarray(values) for column, values in self.columns.items()},
+                'names': {name: table.names for name, table in self.names.items()}}
+
+    def __setstate__(self, state):
+        self.__init__(state['columns'], state['names'])
+
+    # --- Lookups --------------------------------------------------------------------
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def __len__(self):
+        return len(self.columns['match'])
+
+    @property
+    def n_matches(self):
+        return len(self.columns['match_ids'])
+
+    def match_index(self, match_id):
+        if self._match_index is None:
+            self._match_index = {str(m): i for i, m in enumerate(self.columns['match_ids'])}
+        if str(match_id) not in self._match_index:
+            raise KeyError(f"Unknown match_id {match_id!r}")
+        return self._match_index[str(match_id)]
+
+    def match_slice(self, match_id):
+        """Ball range of a match"""
+        m = self.match_index(match_id)
+        offsets = self.columns['match_offsets']
+        return slice(int(offsets[m]), int(offsets[m + 1]))
+
+    def innings_slice(self, match_id, innings_number):
+        """Ball range of one innings of a match"""
+        m = self.match_index(match_id)
+        first, last = self.columns['match_innings'][m], self.columns['match_innings'][m + 1]
+        numbers = self.columns['innings_number'][first:last]
+        hits = np.flatnonzero(numbers == innings_number)
+        if len(hits) == 0:
+            raise KeyError(f"Match {match_id} has no innings {innings_number}")
+        i = first + hits[0]
+        offsets = self.columns['innings_offsets']
+        return slice(int(offsets[i]), int(offsets[i + 1]))
+
+    def player_id(self, name):
+        """Engine ID of a player name, None when the player has no balls"""
+        return self.names['players'].get(name)
+
+    def mask(self, batter=None, bowler=None, match_type=None, team=None, player_out=None):
+        """Boolean mask over all balls; every given filter must hold (an unknown name matches nothing)"""
+        c = self.columns
+        names = self.names
+        mask = np.ones(len(self), dtype=bool)
+        if batter is not None:
+            mask &= names['players'].equals(c['batter'], batter)
+        if bowler is not None:
+            mask &= names['players'].equals(c['bowler'], bowler)
+        if player_out is not None:
+            mask &= names['players'].equals(c['player_out'], player_out)
+        if match_type is not None:
+            mask &= names['match_types'].equals(c['match_type'], match_type)[c['match']]
+        if team is not None:
+            mask &= names['teams'].equals(c['innings_team'], team)[c['innings']]
+        return mask
+
+    def balls_frame(self, selection=slice(None)):
+        """Decode a slice, mask or index array back into a readable DataFrame"""
+        c = self.columns
+        players = self.names['players']
+        innings = c['innings'][selection]
+        frame = pd.DataFrame({
+            'match_id': c['match_ids'][c['match'][selection]],
+            'innings_number': c['innings_number'][innings],
+            'team': self.names['teams'].decode(c['innings_team'][innings]),
+            'overs': c['over'][selection],
+            'balls': c['ball'][selection],
+            'batter': players.decode(c['batter'][selection]),
+            'non_striker': players.decode(c['non_striker'][selection]),
+            'bowler': players.decode(c['bowler'][selection]),
+            'runs_batter': c['runs_batter'][selection],
+            'runs_extras': c['runs_extras'][selection],
+            'runs_total': c['runs_total'][selection],
+            'wicket_player_out': players.decode(c['player_out'][selection]),
+            'wicket_kind': self.names['wicket_kinds'].decode(c['wicket_kind'][selection]),
+        })
+        return frame
+
+    # --- Vectorised aggregates --------------------------------------------------------
+
+    def _bowler_wicket(self, kinds):
+        from scorecards import NOT_BOWLER_WICKETS  # keeps SQLAlchemy out of engine-only sessions
+        excluded = [self.names['wicket_kinds'].ids[kind] for kind in NOT_BOWLER_WICKETS
+                    if kind in self.names['wicket_kinds'].ids]
+        return (kinds >= 0) & ~np.isin(kinds, excluded)
+
+    def _retired(self, kinds):
+        """Retirements that are no team wicket and leave the batter not out (match_state.NOT_TEAM_WICKETS)"""
+        from match_state import NOT_TEAM_WICKETS
+        retired = [self.names['wicket_kinds'].ids[kind] for kind in NOT_TEAM_WICKETS
+                   if kind in self.names['wicket_kinds'].ids]
+        return (kinds >= 0) & np.isin(kinds, retired)
+
+    def _batting(self, selection, keys):
+        """Batting figures grouped by the integer ids in keys (same length as the selection)"""
+        c = self.columns
+        size = len(self.names['players'])
+        runs = c['runs_batter'][selection]
+        faced = c['wides'][selection] == 0
+        return pd.DataFrame({
+            'runs': np.bincount(keys, weights=runs, minlength=size),
+            'balls': np.bincount(keys, weights=faced, minlength=size),
+            'fours': np.bincount(keys, weights=runs == 4, minlength=size),
+            'sixes': np.bincount(keys, weights=runs == 6, minlength=size),
+        }).astype(np.int64)
+
+    def _bowling(self, selection, keys):
+        c = self.columns
+        size = len(self.names['players'])
+        legal = (c['wides'][selection] == 0) & (c['noballs'][selection] == 0)
+        conceded = (c['runs_total'][selection] - c['byes'][selection]
+                    - c['legbyes'][selection] - c['penalty'][selection])
+        wickets = self._bowler_wicket(c['wicket_kind'][selection])
+        frame = pd.DataFrame({
+            'balls': np.bincount(keys, weights=legal, minlength=size),
+            'runs': np.bincount(keys, weights=conceded, minlength=size),
+            'wickets': np.bincount(keys, weights=wickets, minlength=size),
+            'wides': np.bincount(keys, weights=c['wides'][selection], minlength=size),
+            'noballs': np.bincount(keys, weights=c['noballs'][selection], minlength=size),
+        }).astype(np.int64)
+        frame.insert(1, 'overs', frame['balls'] // 6 + (frame['balls'] % 6) / 10)
+        return frame
+
+    def batting_scorecard(self, match_id, innings_number):
+        """Batting card of one innings, in batting order"""
+        sl = self.innings_slice(match_id, innings_number)
+        c = self.columns
+        figures = self._batting(sl, c['batter'][sl])
+
+        # Batting order = order of first appearance at either end
+        appearances = np.column_stack([c['batter'][sl], c['non_striker'][sl]]).ravel()
+        order = pd.unique(appearances)
+        card = figures.iloc[order].copy()
+        card.insert(0, 'batter', self.names['players'].decode(order))
+        out = c['player_out'][sl]
+        kinds = c['wicket_kind'][sl]
+        dismissal = dict(zip(out[out >= 0], self.names['wicket_kinds'].decode(kinds[out >= 0])))
+        card['dismissal'] = [dismissal.get(player, 'not out') for player in order]
+        card['strike_rate'] = (100 * card['runs'] / card['balls'].where(card['balls'] > 0)).round(2)
+        return card.reset_index(drop=True)
+
+    def bowling_scorecard(self, match_id, innings_number):
+        """Bowling card of one innings, in order of first over bowled"""
+        sl = self.innings_slice(match_id, innings_number)
+        bowlers = self.columns['bowler'][sl]
+        order = pd.unique(bowlers)
+        card = self._bowling(sl, bowlers).iloc[order].copy()
+        card.insert(0, 'bowler', self.names['players'].decode(order))
+        card['economy'] = (6 * card['runs'] / card['balls'].where(card['balls'] > 0)).round(2)
+        return card.reset_index(drop=True)
+
+    def innings_totals(self):
+        """Runs / wickets / legal balls for every innings (np.add.reduceat over the offsets)"""
+        c = self.columns
+        offsets = c['innings_offsets']
+        non_empty = offsets[:-1] < offsets[1:]
+        starts = offsets[:-1][non_empty]
+        legal = ((c['wides'] == 0) & (c['noballs'] == 0)).astype(np.int64)
+        frame = pd.DataFrame({
+            'match_id': c['match_ids'][c['innings_match']],
+            'innings_number': c['innings_number'],
+            'team': self.names['teams'].decode(c['innings_team']),
+            'super_over': c['innings_super_over'],
+        })
+        wickets = c['wickets'].astype(np.int64) - self._retired(c['wicket_kind'])
+        for column, values in (('runs', c['runs_total']), ('wickets', wickets), ('balls', legal)):
+            totals = np.zeros(len(frame), dtype=np.int64)
+            if len(starts):
+                totals[non_empty] = np.add.reduceat(values.astype(np.int64), starts)
+            frame[column] = totals
+        return frame
+
+    def batting_totals(self, mask=None):
+        """Corpus-wide batting figures per player (optionally over a mask)"""
+        selection = slice(None) if mask is None else mask
+        c = self.columns
+        figures = self._batting(selection, c['batter'][selection])
+        figures['innings'] = self._count_innings(c['batter'][selection], c['innings'][selection])
+        player_out = c['player_out'][selection]
+        dismissed = (player_out >= 0) & ~self._retired(c['wicket_kind'][selection])
+        figures['outs'] = np.bincount(player_out[dismissed], minlength=len(figures))
+        figures.insert(0, 'batter', self.names['players'].names)
+        figures = figures[figures['innings'] > 0]
+        figures['average'] = (figures['runs'] / figures['outs'].where(figures['outs'] > 0)).round(2)
+        figures['strike_rate'] = (100 * figures['runs'] / figures['balls'].where(figures['balls'] > 0)).round(2)
+        return figures.sort_values('runs', ascending=False).reset_index(drop=True)
+
+    def bowling_totals(self, mask=None):
+        """Corpus-wide bowling figures per player (optionally over a mask)"""
+        selection = slice(None) if mask is None else mask
+        bowlers = self.columns['bowler'][selection]
+        figures = self._bowling(selection, bowlers)
+        figures['innings'] = self._count_innings(bowlers, self.columns['innings'][selection])
+        figures.insert(0, 'bowler', self.names['players'].names)
+        figures = figures[figures['innings'] > 0]
+        figures['economy'] = (6 * figures['runs'] / figures['balls'].where(figures['balls'] > 0)).round(2)
+        return figures.sort_values(['wickets', 'runs'], ascending=[False, True]).reset_index(drop=True)
+
+    def _count_innings(self, players, innings):
+        """Number of distinct innings each player id appears in"""
+        pairs = np.unique(players.astype(np.int64) * (len(self.columns['innings_match']) + 1) + innings)
+        ids = pairs // (len(self.columns['innings_match']) + 1)
+        return np.bincount(ids, minlength=len(self.names['players']))
+
+    def memory_usage(self):
+        """Bytes held by the column arrays"""
+        return sum(values.nbytes for values in self.columns.values())
+
+
+def build_engine(data_dirs=None, workers=1, archive_path=None):
+    """Engine over the match files of data_dirs, read from the directories or from a match archive"""
+    if archive_path is None:
+        return BallEngine.from_files(list(match_files(data_dirs).values()), workers=workers)
+    from match_archive import open_archive
+    members = open_archive(str(archive_path)).match_files(data_dirs or DEFAULT_DATA_DIRS)
+    return BallEngine.from_files(list(members.values()), workers=workers, archive_path=archive_path)
+
+
+def main(argv=None):
+    """Build and save the engine, or print a scorecard from a saved one"""
+    parser = argparse.ArgumentParser(description="Array-backed in-memory ball-by-ball engine")
+    parser.add_argument('--engine-dir', default=str(ENGINE_DIR))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Flatten the corpus and save the engine arrays")
+    build_parser.add_argument('--data-dir', action='append', default=None,
+                              help="Directory with match JSON files, repeatable (default: Nepal ODI/ODM/T20)")
+    build_parser.add_argument('--workers', type=int, default=1)
+    build_parser.add_argument('--archive', default=None,
+                              help="Read the matches from this match archive (see match_archive.py) instead of the files")
+
+    scorecard_parser = subparsers.add_parser('scorecard', help="Batting and bowling cards of a match")
+    scorecard_parser.add_argument('match_id')
+
+    top_parser = subparsers.add_parser('top', help="Top run scorers and wicket takers")
+    top_parser.add_argument('--match-type', default=None)
+    top_parser.add_argument('--limit', type=int, default=10)
+
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        started = time.perf_counter()
+        engine = build_engine(args.data_dir, args.workers, args.archive)
+        engine.save(args.engine_dir)
+        print(f"🧮 Engine {args.engine_dir}: {len(engine)} balls, {engine.n_matches} matches, "
+              f"{len(engine.names['players'])} players, {engine.memory_usage() / 1e6:.1f} MB "
+              f"in {time.perf_counter() - started:.2f}s")
+        return
+
+    engine = BallEngine.load(args.engine_dir)
+    if args.command == 'scorecard':
+        m = engine.match_index(args.match_id)
+        c = engine.columns
+        for i in range(c['match_innings'][m], c['match_innings'][m + 1]):
+            innings_number = int(c['innings_number'][i])
+            team = engine.names['teams'].decode([c['innings_team'][i]])[0]
+            print(f"\n🏏 {team} (innings {innings_number})")
+            print(engine.batting_scorecard(args.match_id, innings_number).to_string(index=False))
+            print(engine.bowling_scorecard(args.match_id, innings_number).to_string(index=False))
+    else:
+        mask = engine.mask(match_type=args.match_type) if args.match_type else None
+        print(engine.batting_totals(mask).head(args.limit).to_string(index=False))
+        print(engine.bowling_totals(mask).head(args.limit).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
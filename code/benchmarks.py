@@ -0,0 +1,376 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DATA_DIR = PROJECT_ROOT / 'data'
+HISTORY_FILE = DATA_DIR / 'benchmarks' / 'history.jsonl'
+DEFAULT_CORPUS = DATA_DIR / 'Nepal' / 'ODI'
+
+GROUPS = ('parse', 'flatten', 'insert', 'query')
+
+
+'''
+Benchmark suite for parsing, flattening, database writes and the common queries.
+- parse:    json.load of every file, and the header-only read used by the catalog
+- flatten:  convert_match_to_df (loaded, streaming, with the match state), convert_json_to_df,
+            the ORM objects of process_deliveries and the bulk rows of flatten_match_deliveries
+- insert:   a full ingest (with scorecards) into a fresh database, ORM vs bulk write mode
+- query:    the queries checked by `schema_migrations.py explain`, plus the scorecard reads
+Every benchmark runs --repeat times. Its median / min seconds and items per second are appended,
+with the git commit, to data/benchmarks/history.jsonl (one JSON line per run), and `compare`
+lines a run up against an earlier one of the same corpus.
+The corpus is data/Nepal/ODI, or a synthetic one (synthetic_corpus.py) with --scale.
+Inserts go to a temporary SQLite file; with --database-url the tables of that database are
+DROPPED before every repeat, so only point it at a scratch database.
+
+Use case
+python main.py bench run
+python main.py bench run --scale 10 --only parse --only flatten
+python main.py bench compare
+python main.py bench compare --against 3eb5c1b
+'''
+
+
+def git_revision():
+    """(short commit, dirty) of the working tree, or (None, None) outside git"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=PROJECT_ROOT, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                                text=True, cwd=PROJECT_ROOT, check=True).stdout
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def summarize(times, items):
+    median = statistics.median(times)
+    return {'median_s': round(median, 6), 'min_s': round(min(times), 6), 'runs': len(times),
+            'items': items, 'items_per_s': round(items / median, 1) if median else None}
+
+
+def measure(fn, repeat, setup=None):
+    """Run fn() `repeat` times (setup() untimed before each); fn returns the number of items handled"""
+    times, items = [], 0
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        started = time.perf_counter()
+        items = fn(*args)
+        times.append(time.perf_counter() - started)
+    return summarize(times, items)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the per-match progress output of the code being timed"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+class BenchmarkSuite:
+    def __init__(self, data_dir=DEFAULT_CORPUS, repeat=3, database_url=None, query_runs=20):
+        self.data_dir = Path(data_dir)
+        self.files = sorted(self.data_dir.glob("*.json"))
+        self.repeat = repeat
+        self.database_url = database_url
+        self.query_runs = query_runs
+        self.results = {}
+        self.deliveries = None
+        self._tmp = tempfile.TemporaryDirectory(prefix='cricket_bench_')
+        self._loaded_url = None  # Database left behind by the last insert run, reused for queries
+
+    def record(self, name, result):
+        self.results[name] = result
+        rate = f"{result['items_per_s']:>12,.0f} items/s" if result['items_per_s'] else ''
+        print(f"  {name:<34} median {result['median_s'] * 1000:10.1f} ms  min {result['min_s'] * 1000:10.1f} ms"
+              f"  {rate}")
+
+    # --- parse ----------------------------------------------------------------------
+
+    def bench_parse(self):
+        from match_stream import read_match_header
+
+        def json_load():
+            for file_path in self.files:
+                with open(file_path) as f:
+                    json.load(f)
+            return len(self.files)
+
+        def header_only():
+            for file_path in self.files:
+                read_match_header(file_path)
+            return len(self.files)
+
+        self.record('parse.json_load', measure(json_load, self.repeat))
+        self.record('parse.header_only', measure(header_only, self.repeat))
+
+    # --- flatten --------------------------------------------------------------------
+
+    def _timed_per_file(self, name, work):
+        """Time work(match_id, document) per file with the file already loaded (loading isn't timed)"""
+        times, items = [], 0
+        for _ in range(self.repeat):
+            elapsed, items = 0.0, 0
+            for file_path in self.files:
+                with open(file_path) as f:
+                    document = json.load(f)
+                started = time.perf_counter()
+                items += work(file_path.stem, document, file_path)
+                elapsed += time.perf_counter() - started
+            times.append(elapsed)
+        self.record(name, summarize(times, items))
+        return items
+
+    def bench_flatten(self):
+        from exploring_json_data_struct import extract_match_data
+        from process_nepal_odi import NepalODIProcessor, flatten_match_deliveries
+
+        processor = NepalODIProcessor(database_url='sqlite://')
+
+        def match_df(match_id, document, file_path):
+            return len(extract_match_data(str(file_path), data=document).convert_match_to_df())
+
+        def match_df_state(match_id, document, file_path):
+            return len(extract_match_data(str(file_path), data=document).convert_match_to_df(with_state=True))
+
+        def innings_df(match_id, document, file_path):
+            match_data = extract_match_data(str(file_path), data=document)
+            return sum(len(match_data.convert_json_to_df(innings)) for innings in range(len(document['innings'])))
+
+        def orm_objects(match_id, document, file_path):
+            with quiet():
+                return len(processor.process_deliveries(extract_match_data(str(file_path), data=document), match_id))
+
+        def bulk_rows(match_id, document, file_path):
+            return len(flatten_match_deliveries(extract_match_data(str(file_path), data=document), match_id))
+
+        def streaming():
+            return sum(len(extract_match_data(str(file_path), streaming=True).convert_match_to_df())
+                       for file_path in self.files)
+
+        self.deliveries = self._timed_per_file('flatten.match_df', match_df)
+        self._timed_per_file('flatten.match_df_state', match_df_state)
+        self._timed_per_file('flatten.innings_df', innings_df)
+        self.record('flatten.match_df_streaming', measure(streaming, self.repeat))
+        self._timed_per_file('flatten.orm_objects', orm_objects)
+        self._timed_per_file('flatten.bulk_rows', bulk_rows)
+
+    # --- insert ---------------------------------------------------------------------
+
+    def fresh_database(self, label):
+        """URL of an empty database for one insert run"""
+        if self.database_url is None:
+            db_path = Path(self._tmp.name) / f"{label}.db"
+            db_path.unlink(missing_ok=True)
+            return f"sqlite:///{db_path}"
+        from database_model import Base, dispose_engine, get_engine
+        Base.metadata.drop_all(get_engine(self.database_url))
+        dispose_engine(self.database_url)
+        return self.database_url
+
+    def load(self, database_url, write_mode):
+        from process_nepal_odi import NepalODIProcessor
+        from sqlalchemy import create_engine, text
+
+        with quiet():
+            NepalODIProcessor(database_url=database_url, write_mode=write_mode,
+                              data_dir=self.data_dir).process_all_matches()
+        engine = create_engine(database_url)
+        try:
+            with engine.connect() as conn:
+                return conn.execute(text("SELECT COUNT(*) FROM cricket_deliveries")).scalar()
+        finally:
+            engine.dispose()
+
+    def bench_insert(self):
+        for write_mode in ('orm', 'bulk'):
+            result = measure(lambda url: self.load(url, write_mode), self.repeat,
+                             setup=lambda: (self.fresh_database(write_mode),))
+            self.record(f'insert.{write_mode}', result)
+        self._loaded_url = self.database_url or f"sqlite:///{Path(self._tmp.name) / 'bulk.db'}"
+
+    # --- query ----------------------------------------------------------------------
+
+    def bench_query(self):
+        from sqlalchemy import text
+        from database_model import get_engine, dispose_engine
+        from schema_migrations import EXPLAIN_QUERIES, sample_params
+        from scorecards import get_batting_scorecard, get_bowling_scorecard, get_innings_scorecard
+        from sqlalchemy.orm import Session
+
+        if self._loaded_url is None:
+            self._loaded_url = self.fresh_database('bulk')
+            self.load(self._loaded_url, 'bulk')
+
+        engine = get_engine(self._loaded_url, 'interactive-analytics')
+        try:
+            with engine.connect() as conn:
+                params = sample_params(conn)
+
+                for name, sql, _, _ in EXPLAIN_QUERIES:
+                    statement = text(sql)
+
+                    def run_query():
+                        for _ in range(self.query_runs):
+                            conn.execute(statement, params).fetchall()
+                        return self.query_runs
+                    self.record(f"query.{name.replace(' ', '_')}", measure(run_query, self.repeat))
+
+            with Session(engine) as session:
+                def scorecard(cached):
+                    for _ in range(self.query_runs):
+                        for getter in (get_innings_scorecard, get_batting_scorecard, get_bowling_scorecard):
+                            (getter if cached else getter.uncached)(session, params['match_id'])
+                    return self.query_runs
+                self.record('query.scorecard_of_a_match', measure(lambda: scorecard(False), self.repeat))
+                # Hits of the query-result cache (one ingest-version lookup per call)
+                self.record('query.scorecard_cached', measure(lambda: scorecard(True), self.repeat))
+        finally:
+            dispose_engine(self._loaded_url, 'interactive-analytics')
+
+    def run(self, groups=GROUPS):
+        print(f"🏁 {len(self.files)} files from {self.data_dir}, {self.repeat} repeats")
+        for group in GROUPS:
+            if group in groups:
+                getattr(self, f'bench_{group}')()
+        self._tmp.cleanup()
+        return self.results
+
+
+def corpus_label(data_dir):
+    data_dir = Path(data_dir).resolve()
+    try:
+        return str(data_dir.relative_to(DATA_DIR.resolve()))
+    except ValueError:
+        return str(data_dir)
+
+
+def append_history(entry, history_file=HISTORY_FILE):
+    history_file = Path(history_file)
+    history_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(history_file, 'a') as f:
+        f.write(json.dumps(entry) + '\n')
+
+
+def load_history(history_file=HISTORY_FILE):
+    history_file = Path(history_file)
+    if not history_file.exists():
+        return []
+    with open(history_file) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare_runs(baseline, current, threshold=0.10, min_delta_s=0.001):
+    """
+    Rows of (name, baseline median, current median, relative change, regressed) for shared benchmarks.
+    A slowdown counts as a regression when it is over `threshold` and over `min_delta_s`, so
+    sub-millisecond jitter on the fast queries isn't reported.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if not before or not before['median_s']:
+            continue
+        change = result['median_s'] / before['median_s'] - 1
+        regressed = change > threshold and result['median_s'] - before['median_s'] > min_delta_s
+        rows.append((name, before['median_s'], result['median_s'], change, regressed))
+    return rows
+
+
+def _run_label(entry):
+    dirty = '+dirty' if entry.get('dirty') else ''
+    return f"{entry.get('commit') or '?'}{dirty} ({entry['recorded_at']})"
+
+
+def run_command(args):
+    if args.scale:
+        from synthetic_corpus import generate_corpus
+        data_dir = generate_corpus(args.scale)
+    else:
+        data_dir = Path(args.data_dir)
+
+    suite = BenchmarkSuite(data_dir, repeat=args.repeat, database_url=args.database_url,
+                           query_runs=args.query_runs)
+    results = suite.run(tuple(args.only or GROUPS))
+
+    commit, dirty = git_revision()
+    entry = {'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+             'commit': commit, 'dirty': dirty,
+             'python': sys.version.split()[0], 'platform': platform.platform(),
+             'corpus': corpus_label(data_dir), 'files': len(suite.files), 'deliveries': suite.deliveries,
+             'repeat': args.repeat, 'results': results}
+    if args.record:
+        append_history(entry, args.history)
+        print(f"📝 Recorded in {args.history}")
+    return True
+
+
+def compare_command(args):
+    history = load_history(args.history)
+    if not history:
+        print(f"❌ No benchmark history in {args.history}")
+        return False
+    current = history[-1]
+    same_corpus = [entry for entry in history[:-1] if entry['corpus'] == current['corpus']]
+    if args.against:
+        same_corpus = [entry for entry in same_corpus if (entry.get('commit') or '').startswith(args.against)]
+    if not same_corpus:
+        print(f"❌ No earlier run of {current['corpus']} to compare with")
+        return False
+    baseline = same_corpus[-1]
+
+    print(f"📊 {current['corpus']}: {_run_label(baseline)} -> {_run_label(current)}")
+    rows = compare_runs(baseline, current, args.threshold, args.min_delta_ms / 1000)
+    for name, before, after, change, regressed in rows:
+        status = '⚠️ ' if regressed else '  '
+        print(f"{status} {name:<34} {before * 1000:10.1f} ms -> {after * 1000:10.1f} ms  {change:+7.1%}")
+    regressions = [row for row in rows if row[4]]
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmarks slower by more than {args.threshold:.0%}")
+        return False
+    print(f"\n✅ No benchmark slower by more than {args.threshold:.0%}")
+    return True
+
+
+def main(argv=None):
+    """Run the benchmark suite or compare recorded runs"""
+    parser = argparse.ArgumentParser(description="Benchmarks for parsing, flattening, inserts and queries")
+    parser.add_argument('--history', default=str(HISTORY_FILE), help="JSON lines file with recorded runs")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Run the benchmarks and record the result")
+    run_parser.add_argument('--data-dir', default=str(DEFAULT_CORPUS))
+    run_parser.add_argument('--scale', type=int, default=None,
+                            help="Use the synthetic corpus at this scale instead (generated if missing)")
+    run_parser.add_argument('--only', action='append', choices=GROUPS, default=None, help="Repeatable")
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--query-runs', type=int, default=20, help="Executions per query benchmark")
+    run_parser.add_argument('--database-url', default=None,
+                            help="Scratch database for inserts (its tables are dropped); default temporary SQLite")
+    run_parser.add_argument('--no-record', dest='record', action='store_false')
+
+    compare_parser = subparsers.add_parser('compare', help="Compare the latest run with an earlier one")
+    compare_parser.add_argument('--against', default=None, help="Commit (prefix) of the baseline run")
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help="Relative slowdown reported as a regression (default 0.10)")
+    compare_parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                                help="Ignore slowdowns smaller than this (default 1 ms)")
+    args = parser.parse_args(argv)
+
+    ok = run_command(args) if args.command == 'run' else compare_command(args)
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import csv
+import io
+import time
+import pandas as pd
+from database_model import CricketDelivery
+from match_state import STATE_COLUMNS, STATE_FLOAT_COLUMNS, STATE_INT_COLUMNS, STATE_NULLABLE_INT_COLUMNS
+from player_registry import PLAYER_ID_COLUMNS, PLAYER_NAME_COLUMNS
+
+
+'''
+Bulk write path for cricket_deliveries.
+- The ORM path builds one CricketDelivery object per ball, which is slow for big reloads.
+- Here a flattened innings DataFrame is turned into plain rows in one vectorized pass.
+- PostgreSQL gets the rows through COPY FROM STDIN (one round trip per match).
+- Any other database (e.g. SQLite) falls back to an executemany INSERT in batches.
+'''
+
+# Table columns written by the bulk path, in COPY order (id is left to the database)
+DELIVERY_COLUMNS = [
+    'match_id', 'match_type', 'innings_number', 'batting_side', 'overs', 'balls',
+    'runs_batter', 'runs_extras', 'runs_total',
+    'extras_wides', 'extras_legbyes', 'extras_noballs', 'extras_byes',
+    'description', 'ball_areas',
+    'is_wicket', 'wicket_kind',
+    'is_drs', 'is_umpires_call',
+] + STATE_COLUMNS + PLAYER_ID_COLUMNS
+# Columns of a table-shaped frame: the player names ride along to be resolved into the
+# ID columns (player_registry.assign_player_ids) but are not written
+FRAME_COLUMNS = DELIVERY_COLUMNS + PLAYER_NAME_COLUMNS
+
+# DataFrame column (from convert_match_to_df) -> table column
+FRAME_TO_TABLE = {
+    'overs': 'overs',
+    'balls': 'balls',
+    'batter': 'batter',
+    'non_striker': 'non_striker',
+    'bowler': 'bowler',
+    'runs.batter': 'runs_batter',
+    'runs.extras': 'runs_extras',
+    'runs.total': 'runs_total',
+    'extras.wides': 'extras_wides',
+    'extras.legbyes': 'extras_legbyes',
+    'extras.noballs': 'extras_noballs',
+    'extras.byes': 'extras_byes',
+    'description': 'description',
+    'ball_areas': 'ball_areas',
+    'is_wicket': 'is_wicket',
+    'wicket_player_out': 'wicket_player_out',
+    'wicket_kind': 'wicket_kind',
+    'wicket_fielder': 'wicket_fielder',
+    'is_drs': 'is_drs',
+    'is_umpires_call': 'is_umpires_call',
+    **{col: col for col in STATE_COLUMNS + PLAYER_ID_COLUMNS},
+}
+
+INT_COLUMNS = ['innings_number', 'overs', 'balls', 'runs_batter', 'runs_extras', 'runs_total', 'is_wicket']
+# Match-state columns stay null when the frame has none (per-innings frames);
+# player IDs are filled by the writer (player_registry.assign_player_ids)
+NULLABLE_INT_COLUMNS = (['batting_side', 'extras_wides', 'extras_legbyes', 'extras_noballs', 'extras_byes']
+                        + STATE_INT_COLUMNS + STATE_NULLABLE_INT_COLUMNS + PLAYER_ID_COLUMNS)
+FLOAT_COLUMNS = STATE_FLOAT_COLUMNS
+TEXT_COLUMNS = ['description', 'ball_areas', 'is_drs', 'is_umpires_call']
+
+INSERT_BATCH_SIZE = 5000
+
+
+def batting_sides(batting_teams, teams):
+    """1 / 2 for balls where info.teams[0] / [1] is batting (None when it is neither)"""
+    sides = {team: side for side, team in enumerate(teams or [], start=1) if side <= 2}
+    return pd.array([sides.get(team) for team in batting_teams], dtype='Int64')
+
+
+def deliveries_frame_to_rows(df, match_id, innings_num=None, match_type=None, teams=None):
+    """
+    Convert a flattened DataFrame to a table-shaped DataFrame (same values as the ORM path).
+    
+    innings_num is only used when df has no innings_number column (per-innings frames).
+    teams (info.teams) turns the frame's batting team into batting_side.
+    """
+    table = pd.DataFrame(index=df.index)
+    for frame_col, table_col in FRAME_TO_TABLE.items():
+        table[table_col] = df[frame_col] if frame_col in df.columns else None
+    table['match_id'] = match_id
+    table['match_type'] = match_type
+    if 'innings_number' in df.columns:
+        table['innings_number'] = df['innings_number']
+    else:
+        table['innings_number'] = innings_num
+    table['batting_side'] = batting_sides(df['team'], teams) if 'team' in df.columns else None
+
+    for col in INT_COLUMNS:
+        table[col] = pd.to_numeric(table[col], errors='coerce').fillna(0).astype('int64')
+    for col in NULLABLE_INT_COLUMNS:
+        table[col] = pd.to_numeric(table[col], errors='coerce').astype('Int64')
+    for col in FLOAT_COLUMNS:
+        table[col] = pd.to_numeric(table[col], errors='coerce').astype('float64')
+    for col in TEXT_COLUMNS:
+        table[col] = table[col].fillna('')
+
+    return table[FRAME_COLUMNS]
+
+
+def _iter_records(table):
+    """Yield plain Python tuples in DELIVERY_COLUMNS order, with None for missing values"""
+    table = table[DELIVERY_COLUMNS]
+    as_object = table.astype(object).where(table.notna(), None)
+    return as_object.itertuples(index=False, name=None)
+
+
+def table_tuples(table):
+    """Return rows as tuples in DELIVERY_COLUMNS order (for COPY-style drivers such as asyncpg)"""
+    return list(_iter_records(table))
+
+
+def table_records(table):
+    """Return rows as dicts keyed by table column, ready for CricketDelivery(**record) or executemany"""
+    return [dict(zip(DELIVERY_COLUMNS, row)) for row in _iter_records(table)]
+
+
+def copy_deliveries_postgres(connection, table):
+    """Stream rows into cricket_deliveries using COPY FROM STDIN (psycopg2)"""
+    buffer = io.StringIO()
+    # QUOTE_STRINGS keeps '' (empty text) apart from an unquoted empty field (NULL)
+    writer = csv.writer(buffer, quoting=csv.QUOTE_STRINGS, lineterminator='\n')
+    writer.writerows(_iter_records(table))
+    buffer.seek(0)
+
+    columns = ', '.join(DELIVERY_COLUMNS)
+    sql = f"COPY {CricketDelivery.__tablename__} ({columns}) FROM STDIN WITH (FORMAT csv)"
+
+    raw_connection = connection.connection
+    cursor = raw_connection.cursor()
+    try:
+        cursor.copy_expert(sql, buffer)
+    finally:
+        cursor.close()
+    return len(table)
+
+
+def insert_deliveries_executemany(connection, table, batch_size=INSERT_BATCH_SIZE):
+    """Insert rows with executemany batches (SQLite and other non-PostgreSQL backends)"""
+    records = table_records(table)
+    insert_stmt = CricketDelivery.__table__.insert()
+    for start in range(0, len(records), batch_size):
+        connection.execute(insert_stmt, records[start:start + batch_size])
+    return len(records)
+
+
+def bulk_write_deliveries(connection, table):
+    """Write a table-shaped DataFrame on the given connection, picking COPY when possible"""
+    if table.empty:
+        return 0
+    if connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2':
+        return copy_deliveries_postgres(connection, table)
+    return insert_deliveries_executemany(connection, table)
+
+
+class ThroughputReport:
+    """
+    Accumulate rows written and the time spent inserting them (the 'write' stage only: no
+    match row, object building, scorecards or COMMIT), with commit time reported separately
+    """
+    def __init__(self, mode):
+        self.mode = mode
+        self.rows = 0
+        self.matches = 0
+        self.seconds = 0.0
+        self.commit_seconds = 0.0
+
+    def record(self, rows, seconds, commit_seconds=0.0, matches=1):
+        """Add written matches: delivery insert seconds, and seconds from then to COMMIT"""
+        self.rows += rows
+        self.seconds += seconds
+        self.commit_seconds += commit_seconds
+        self.matches += matches
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self):
+        return (f"🚀 Throughput ({self.mode}): {self.rows} rows from {self.matches} matches "
+                f"inserted in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/sec), "
+                f"commits {self.commit_seconds:.2f}s")
@@ -0,0 +1,48 @@
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CODE_DIR = PROJECT_ROOT / 'code'
+DATA_DIR = PROJECT_ROOT / 'data'
+
+DEFAULT_DATA_DIRS = [DATA_DIR / 'Nepal' / 'ODI', DATA_DIR / 'Nepal' / 'ODM', DATA_DIR / 'Nepal' / 'T20']
+
+
+'''
+Locating match files (standard library only, so it is cheap to import).
+- A match is identified by its file name: data/Nepal/ODI/1154649.json -> '1154649'.
+- The same match can sit in several directories (data/Nepal_json repeats the others);
+  the first directory that has it wins.
+'''
+
+
+def match_files(data_dirs=None):
+    """match_id -> file path across the data directories (first directory wins)"""
+    files = {}
+    for data_dir in data_dirs or DEFAULT_DATA_DIRS:
+        for file_path in sorted(Path(data_dir).glob("*.json")):
+            files.setdefault(file_path.stem, file_path)
+    return files
+
+
+def unique_match_files(file_paths, data_dirs=None):
+    """
+    One path per match ID out of file_paths: the one from the first of data_dirs that has it
+    (files outside data_dirs rank last). Paths keep the order their match first appears in.
+    """
+    rank = {Path(data_dir).resolve(): i for i, data_dir in enumerate(data_dirs or DEFAULT_DATA_DIRS)}
+    last = len(rank)
+    chosen = {}
+    for file_path in map(Path, file_paths):
+        current = chosen.get(file_path.stem)
+        if current is None or rank.get(file_path.parent.resolve(), last) < rank.get(current.parent.resolve(), last):
+            chosen[file_path.stem] = file_path
+    return list(chosen.values())
+
+
+def find_match_file(match_id, data_dirs=None):
+    """Path of one match file, or None"""
+    for data_dir in data_dirs or DEFAULT_DATA_DIRS:
+        file_path = Path(data_dir) / f"{match_id}.json"
+        if file_path.exists():
+            return file_path
+    return None
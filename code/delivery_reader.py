@@ -0,0 +1,257 @@
+import argparse
+import resource
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from sqlalchemy import or_, select
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: uv sync --extra analytics
+    pa = None
+    pq = None
+
+from database_model import CricketDelivery, DatabaseManager, get_database_config, named_deliveries
+from bulk_loader import FRAME_COLUMNS, FLOAT_COLUMNS, INT_COLUMNS, NULLABLE_INT_COLUMNS
+from player_registry import PLAYER_NAME_COLUMNS
+
+
+'''
+Chunked, streaming reads of cricket_deliveries.
+- pd.read_sql on the table materialises every row at once, with object string columns.
+  Here the rows come through a server-side cursor (yield_per: a named cursor on PostgreSQL)
+  and only one chunk of chunk_size rows is held at a time, however big the table gets.
+  The cursor lives in the session's transaction (psycopg2 has no named cursors under
+  AUTOCOMMIT), so the session must not be on an AUTOCOMMIT connection.
+- Each chunk is decoded column by column straight into typed arrays: int64 for the ball key
+  and runs, nullable Int64 for the optional counts and player IDs, float64 for the rates,
+  and category for every string column (match IDs and player names repeat on every ball).
+- iter_delivery_batches yields Arrow record batches instead, with dictionary-encoded strings
+  and one schema for every batch (so they can go straight to a Parquet writer).
+- Filters on match, innings, player and match type become the WHERE clause, so they use the
+  uq_deliveries_ball / ix_deliveries_*_id / ix_deliveries_match_type indexes. Rows come back
+  in ball order (match_id, innings_number, overs, balls).
+- Player names (batter, bowler, ...) are joined from players only when asked for
+  (database_model.named_deliveries), so an ID-only read stays on cricket_deliveries alone.
+- read_deliveries concatenates the chunks (categories unioned) for reads that fit in memory.
+
+Use case
+db = DatabaseManager(get_database_config('read-replica'), profile='read-replica')
+db.connect()
+for chunk in db.stream_deliveries(match_types=['ODI'], chunk_size=10000):
+    ...
+python main.py deliveries --match-type ODI --output odi_deliveries.parquet
+'''
+
+DEFAULT_CHUNK_SIZE = 10000
+OUTPUT_SUFFIXES = ['.csv', '.parquet']
+BALL_ORDER = ['match_id', 'innings_number', 'overs', 'balls']
+# Roles a player filter matches on (any of them)
+PLAYER_ROLES = {'batter': 'batter_id', 'non_striker': 'non_striker_id', 'bowler': 'bowler_id',
+                'player_out': 'player_out_id', 'fielder': 'fielder_id'}
+DEFAULT_ROLES = ['batter', 'non_striker', 'bowler']
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for Arrow record batches: uv sync --extra analytics")
+
+
+def column_kind(col):
+    """'int', 'nullable_int', 'float' or 'category'"""
+    if col in INT_COLUMNS:
+        return 'int'
+    if col in NULLABLE_INT_COLUMNS:
+        return 'nullable_int'
+    if col in FLOAT_COLUMNS:
+        return 'float'
+    return 'category'
+
+
+def deliveries_query(columns=None, match_ids=None, innings=None, player_ids=None, match_types=None,
+                     roles=DEFAULT_ROLES):
+    """SELECT of the given delivery columns (default: FRAME_COLUMNS) in ball order, filtered in SQL"""
+    columns = list(columns or FRAME_COLUMNS)
+    unknown = [col for col in columns if col not in FRAME_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown delivery columns: {unknown}")
+    names = [col for col in columns if col in PLAYER_NAME_COLUMNS]
+    table = named_deliveries(names).subquery() if names else CricketDelivery.__table__
+    stmt = select(*(table.c[col] for col in columns))
+    if match_ids:
+        stmt = stmt.where(table.c.match_id.in_([str(match_id) for match_id in match_ids]))
+    if innings is not None:
+        stmt = stmt.where(table.c.innings_number.in_(list(innings)))
+    if player_ids:
+        stmt = stmt.where(or_(*(table.c[PLAYER_ROLES[role]].in_(list(player_ids)) for role in roles)))
+    if match_types:
+        stmt = stmt.where(table.c.match_type.in_(list(match_types)))
+    return stmt.order_by(*(table.c[col] for col in BALL_ORDER))
+
+
+def _iter_row_chunks(session, stmt, chunk_size):
+    """Lists of up to chunk_size rows, fetched through a server-side cursor in the session's transaction"""
+    connection = session.connection()  # begins the session's transaction
+    if connection.get_isolation_level() == 'AUTOCOMMIT':
+        raise ValueError("streamed reads need a transaction; use a profile without AUTOCOMMIT")
+    result = session.execute(stmt, execution_options={'yield_per': chunk_size})
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+def rows_to_frame(rows, columns):
+    """Typed DataFrame of a chunk of rows (one tuple per row, in columns order)"""
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    data = {}
+    for col, col_values in zip(columns, values):
+        kind = column_kind(col)
+        if kind == 'int':
+            try:
+                data[col] = np.array(col_values, dtype=np.int64)
+            except TypeError:  # nulls from rows written before the column had a default
+                data[col] = pd.array(col_values, dtype='Int64')
+        elif kind == 'nullable_int':
+            data[col] = pd.array(col_values, dtype='Int64')
+        elif kind == 'float':
+            data[col] = np.array(col_values, dtype=np.float64)
+        else:
+            data[col] = pd.Categorical(col_values)
+    return pd.DataFrame(data, columns=columns)
+
+
+def arrow_schema(columns):
+    """Arrow schema of the record batches (strings dictionary-encoded)"""
+    _require_pyarrow()
+    types = {'int': pa.int64(), 'nullable_int': pa.int64(), 'float': pa.float64(),
+             'category': pa.dictionary(pa.int32(), pa.string())}
+    return pa.schema([(col, types[column_kind(col)]) for col in columns])
+
+
+def rows_to_batch(rows, columns, schema=None):
+    """Arrow record batch of a chunk of rows"""
+    schema = schema or arrow_schema(columns)
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    arrays = []
+    for field, col_values in zip(schema, values):
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(col_values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(col_values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def iter_deliveries(session, chunk_size=DEFAULT_CHUNK_SIZE, columns=None, match_ids=None, innings=None,
+                    player_ids=None, match_types=None, roles=DEFAULT_ROLES):
+    """
+    Stream cricket_deliveries as typed DataFrames of up to chunk_size rows.
+
+    player_ids keeps the balls where any of the players had one of the roles
+    (batter, non-striker or bowler by default; see PLAYER_ROLES).
+    """
+    columns = list(columns or FRAME_COLUMNS)
+    stmt = deliveries_query(columns, match_ids, innings, player_ids, match_types, roles)
+    for rows in _iter_row_chunks(session, stmt, chunk_size):
+        yield rows_to_frame(rows, columns)
+
+
+def iter_delivery_batches(session, chunk_size=DEFAULT_CHUNK_SIZE, columns=None, match_ids=None, innings=None,
+                          player_ids=None, match_types=None, roles=DEFAULT_ROLES):
+    """Stream cricket_deliveries as Arrow record batches (same filters as iter_deliveries)"""
+    columns = list(columns or FRAME_COLUMNS)
+    schema = arrow_schema(columns)
+    stmt = deliveries_query(columns, match_ids, innings, player_ids, match_types, roles)
+    for rows in _iter_row_chunks(session, stmt, chunk_size):
+        yield rows_to_batch(rows, columns, schema)
+
+
+def concat_chunks(chunks, columns=None):
+    """One DataFrame from streamed chunks, keeping the category columns categorical"""
+    chunks = list(chunks)
+    if not chunks:
+        return rows_to_frame([], list(columns or FRAME_COLUMNS))
+    if len(chunks) == 1:
+        return chunks[0]
+    data = {}
+    for col in chunks[0].columns:
+        if isinstance(chunks[0][col].dtype, pd.CategoricalDtype):
+            data[col] = union_categoricals([chunk[col] for chunk in chunks])
+        else:
+            data[col] = pd.concat([chunk[col] for chunk in chunks], ignore_index=True)
+    return pd.DataFrame(data, columns=chunks[0].columns)
+
+
+def read_deliveries(session, chunk_size=DEFAULT_CHUNK_SIZE, **filters):
+    """Every matching delivery in one typed DataFrame (for reads that fit in memory)"""
+    return concat_chunks(iter_deliveries(session, chunk_size, **filters), filters.get('columns'))
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far (MB)"""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, in KB on Linux
+    return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+
+
+def main(argv=None):
+    """Stream deliveries out of the database, to a file or just counted"""
+    parser = argparse.ArgumentParser(description="Chunked streaming reads of cricket_deliveries")
+    parser.add_argument('--database-url', default=None, help="Defaults to the DB_* (read replica) environment variables")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--match', action='append', default=None, help="Match ID (repeatable)")
+    parser.add_argument('--innings', type=int, action='append', default=None, help="Innings number (repeatable)")
+    parser.add_argument('--player', action='append', default=None, help="Name (any alias) or players.id (repeatable)")
+    parser.add_argument('--role', action='append', choices=sorted(PLAYER_ROLES), default=None,
+                        help="Roles --player matches on (default: batter, non_striker, bowler)")
+    parser.add_argument('--match-type', action='append', default=None, help="e.g. ODI (repeatable)")
+    parser.add_argument('--column', action='append', default=None, help="Only these columns (repeatable)")
+    parser.add_argument('--output', default=None, help="Write the deliveries to a .csv or .parquet file")
+    args = parser.parse_args(argv)
+    output = Path(args.output) if args.output else None
+    if output is not None and output.suffix not in OUTPUT_SUFFIXES:
+        parser.error(f"--output must end in {' or '.join(OUTPUT_SUFFIXES)}, got {output.name}")
+
+    db = DatabaseManager(args.database_url or get_database_config('read-replica'), profile='read-replica')
+    if not db.connect():
+        return
+    session = db.get_session()
+    writer = None
+    try:
+        player_ids = None
+        if args.player:
+            from matchups import resolve_player
+            player_ids = [resolve_player(session, name) for name in args.player]
+        filters = {'columns': args.column, 'match_ids': args.match, 'innings': args.innings,
+                   'player_ids': player_ids, 'match_types': args.match_type, 'roles': args.role or DEFAULT_ROLES}
+        start = time.perf_counter()
+        rows = chunks = 0
+        if output is not None and output.suffix == '.parquet':
+            for batch in iter_delivery_batches(session, args.chunk_size, **filters):
+                writer = writer or pq.ParquetWriter(output, batch.schema)
+                writer.write_batch(batch)
+                rows, chunks = rows + batch.num_rows, chunks + 1
+        else:
+            for chunk in iter_deliveries(session, args.chunk_size, **filters):
+                if output is not None:
+                    chunk.to_csv(output, mode='w' if chunks == 0 else 'a', header=chunks == 0, index=False)
+                rows, chunks = rows + len(chunk), chunks + 1
+        elapsed = time.perf_counter() - start
+        print(f"📤 {rows} deliveries in {chunks} chunks of up to {args.chunk_size} in {elapsed:.2f}s"
+              + (f" -> {output}" if output is not None and rows else '')
+              + f" (peak RSS {peak_rss_mb():.0f} MB)")
+    except Exception as e:
+        print(f"❌ Reading deliveries failed: {e}")
+    finally:
+        if writer is not None:
+            writer.close()
+        session.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
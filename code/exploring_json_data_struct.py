@@ -1,7 +1,11 @@
+import numpy as np
 import pandas as pd
 import json
 from pathlib import Path
 import os
+from match_stream import MatchStream
+from ingest_metrics import NULL_METRICS
+from match_state import add_match_state
 
 
 '''
@@ -22,6 +26,119 @@ DATA_DIR = PROJECT_ROOT / 'data'
 
 sample_json = f"{DATA_DIR}/Nepal/ODI/1154649.json"
 
+NAN = float('nan')
+
+EXTRAS_KINDS = ['wides', 'legbyes', 'noballs', 'byes', 'penalty']
+REVIEW_FIELDS = ['by', 'umpire', 'batter', 'decision', 'type', 'umpires_call']
+REPLACEMENT_FIELDS = ['in', 'out', 'reason', 'role']
+FUTURE_COLUMNS = ['description', 'ball_areas', 'is_drs', 'is_umpires_call']
+
+# Per-innings layout returned by convert_json_to_df
+INNINGS_COLUMNS = ['overs', 'balls', 'batter', 'non_striker', 'bowler', 'runs.batter', 'description',
+                   'runs.extras', 'runs.total',
+                   'extras.wides', 'extras.legbyes', 'extras.noballs', 'ball_areas', 'is_wicket',
+                   'wicket_player_out', 'wicket_kind',
+                   'wicket_fielder', 'is_drs', 'is_umpires_call']
+
+# Whole-match layout returned by convert_match_to_df
+MATCH_COLUMNS = (['innings_number', 'team', 'super_over']
+                 + INNINGS_COLUMNS
+                 + ['extras.byes', 'extras.penalty', 'wicket_count']
+                 + [f'review.{field}' for field in REVIEW_FIELDS]
+                 + [f'replacement.{field}' for field in REPLACEMENT_FIELDS])
+
+INT_COLUMNS = ['innings_number', 'overs', 'balls', 'runs.batter', 'runs.extras', 'runs.total', 'wicket_count']
+FLOAT_COLUMNS = [f'extras.{extra}' for extra in EXTRAS_KINDS]
+# Order of the values collected per delivery by convert_match_to_df
+WALKED_COLUMNS = (['innings_number', 'overs', 'balls',
+                   'batter', 'non_striker', 'bowler',
+                   'runs.batter', 'runs.extras', 'runs.total']
+                  + FLOAT_COLUMNS
+                  + ['wicket_count', 'wicket_player_out', 'wicket_kind', 'wicket_fielder']
+                  + [f'review.{field}' for field in REVIEW_FIELDS]
+                  + [f'replacement.{field}' for field in REPLACEMENT_FIELDS])
+
+EMPTY = {}
+NO_WICKET = (0, None, None, None)
+NO_REVIEW = (None,) * len(REVIEW_FIELDS)
+NO_REPLACEMENT = (None,) * len(REPLACEMENT_FIELDS)
+
+
+def flatten_overs(over_iter, innings_headers):
+    """
+    Flatten (innings_num, over) pairs into one DataFrame with MATCH_COLUMNS.
+    
+    innings_headers maps innings_num to the innings dict (or its non-'overs' fields);
+    it only needs to be complete once over_iter is exhausted.
+    """
+    rows = []
+    append = rows.append
+    
+    current_innings = None
+    over_num = 0
+    
+    for innings_num, over in over_iter:
+        if innings_num != current_innings:
+            current_innings = innings_num
+            over_num = 0
+        over_num += 1  # 1-based overs
+        
+        for ball_num, delivery in enumerate(over['deliveries'], start=1):  # 1-based balls
+            runs = delivery.get('runs') or EMPTY
+            extras = delivery.get('extras') or EMPTY
+            wickets = delivery.get('wickets') or ()
+            review = delivery.get('review') or EMPTY
+            replacements = delivery.get('replacements')
+            
+            # First wicket goes in the wicket_* columns, wicket_count keeps the rest visible
+            if wickets:
+                first_wicket = wickets[0]
+                fielders = first_wicket.get('fielders')
+                wicket = (len(wickets), first_wicket.get('player_out'), first_wicket.get('kind'),
+                          fielders[0].get('name') if fielders else None)
+            else:
+                wicket = NO_WICKET
+            
+            # Replacement shown as the first role/match change on the ball
+            if replacements:
+                replacement = (replacements.get('role') or replacements.get('match') or [EMPTY])[0]
+                replacement = tuple(replacement.get(field) for field in REPLACEMENT_FIELDS)
+            else:
+                replacement = NO_REPLACEMENT
+            
+            append((innings_num, over_num, ball_num,
+                    delivery.get('batter'), delivery.get('non_striker'), delivery.get('bowler'),
+                    runs.get('batter', 0), runs.get('extras', 0), runs.get('total', 0),
+                    extras.get('wides', NAN), extras.get('legbyes', NAN), extras.get('noballs', NAN),
+                    extras.get('byes', NAN), extras.get('penalty', NAN))
+                   + wicket
+                   + (tuple(review.get(field) for field in REVIEW_FIELDS) if review else NO_REVIEW)
+                   + replacement)
+    
+    columns = list(zip(*rows)) if rows else [()] * len(WALKED_COLUMNS)
+    data = {}
+    for col, values in zip(WALKED_COLUMNS, columns):
+        if col in INT_COLUMNS:
+            data[col] = np.array(values, dtype=np.int64)
+        elif col in FLOAT_COLUMNS:
+            data[col] = np.array(values, dtype=np.float64)
+        else:
+            data[col] = values
+    
+    # Innings-level fields ('super_over' comes after 'overs' in the files, so fill them last)
+    innings_numbers = data['innings_number']
+    teams = {num: header.get('team') for num, header in innings_headers.items()}
+    super_overs = [num for num, header in innings_headers.items() if header.get('super_over')]
+    data['team'] = [teams.get(num) for num in innings_numbers.tolist()]
+    data['super_over'] = np.isin(innings_numbers, super_overs)
+    
+    # Empty columns for future use
+    for col in FUTURE_COLUMNS:
+        data[col] = [""] * len(rows)
+    data['is_wicket'] = (data['wicket_count'] > 0).astype(np.int64)
+    
+    return pd.DataFrame(data, columns=MATCH_COLUMNS)
+
 
 ''' Use case
 match = extract_match_data(sample_json)
@@ -34,13 +151,44 @@ print(match_info)
 # Create an instance of the class
 
 class extract_match_data:
-    def __init__(self, json_file_path):
+    def __init__(self, json_file_path, streaming=False, data=None, metrics=NULL_METRICS, archive=None):
+        """
+        Args:
+            json_file_path: Path to a Cricsheet match JSON file
+                            (with archive: the match ID or archive member, e.g. Nepal/ODI/1154649.json)
+            streaming: Only keep meta/info in self.data and read the innings
+                       incrementally from the file when flattening
+            data: Already-parsed match document (the file is then not read again)
+            metrics: IngestMetrics recording the read / decode / flatten stages (off by default)
+            archive: match_archive.MatchArchive to read the match from instead of the file system
+        """
         self.json_file_path = json_file_path
-        self.data = self.load_data()
+        self.metrics = metrics
+        self.archive = archive
+        opener = (lambda: archive.open(json_file_path)) if archive is not None else None
+        self.stream = MatchStream(json_file_path, opener) if streaming and data is None else None
+        self.data = data if data is not None else self.load_data()
+        self._match_df = None  # convert_match_to_df result, flattened once per instance
+        self._state_df = None  # the same with the match-state columns (with_state=True)
+        self._innings_headers = None
     
     def load_data(self):
-        with open(self.json_file_path, 'r') as f:
-            return json.load(f)
+        if self.stream is not None:
+            with self.metrics.stage('decode'):
+                meta, info = self.stream.read_header()
+            self.metrics.add_bytes(self.archive.stored_size(self.json_file_path) if self.archive is not None
+                                   else os.path.getsize(self.json_file_path))
+            return {'meta': meta, 'info': info}
+        with self.metrics.stage('read'):
+            if self.archive is not None:
+                raw = self.archive.read_bytes(self.json_file_path)
+            else:
+                with open(self.json_file_path, 'rb') as f:
+                    raw = f.read()
+        self.metrics.add_bytes(self.archive.stored_size(self.json_file_path) if self.archive is not None
+                               else len(raw))
+        with self.metrics.stage('decode'):
+            return json.loads(raw)
     
     def get_match_info(self):
         """Extract match information and return as DataFrame"""
@@ -58,71 +206,54 @@ class extract_match_data:
             # print(type(over_struct))
     
     def convert_json_to_df(self, innings=0):
-        """Convert the JSON data to a DataFrame"""
-        
-        # flatten the overs and deliveries
-        all_deliveries = []
-        inns_overs = self.data['innings'][innings]['overs']
-        
-        for over_num, over in enumerate(inns_overs):
-            for delivery_num, delivery in enumerate(over['deliveries']):
-                # Add over and ball information as separate columns
-                delivery['overs'] = over_num + 1  # +1 for 1-based indexing
-                delivery['balls'] = delivery_num + 1  # +1 for 1-based indexing
-                all_deliveries.append(delivery)
-                
-        innings_1_df = pd.json_normalize(all_deliveries)
-
-        # Add empty columns for future use
-        innings_1_df['description'] = ""
-        innings_1_df['ball_areas'] = ""
-        innings_1_df['is_wicket'] = ""
-        innings_1_df['is_drs'] = ""
-        innings_1_df['is_umpires_call'] = ""
-
-        # flatten wickets column - handle NaN values (only if wickets column exists)
-        if 'wickets' in innings_1_df.columns:
-            innings_1_df['wicket_player_out'] = innings_1_df['wickets'].apply(lambda x: x[0]['player_out'] if isinstance(x, list) and len(x) > 0 else None)
-            innings_1_df['wicket_kind'] = innings_1_df['wickets'].apply(lambda x: x[0]['kind'] if isinstance(x, list) and len(x) > 0 else None)
-            innings_1_df['wicket_fielder'] = innings_1_df['wickets'].apply(lambda x: x[0]['fielders'][0]['name'] if isinstance(x, list) and len(x) > 0 and 'fielders' in x[0] and x[0]['fielders'] else None)
-            # Drop the original wickets column
-            innings_1_df.drop('wickets', axis=1, inplace=True)
+        """Convert the JSON data for one innings to a DataFrame (a slice of the cached whole-match frame)"""
+        match_df = self.convert_match_to_df()
+        # Rows are in innings order, so an innings is one contiguous block
+        start, stop = np.searchsorted(match_df['innings_number'].to_numpy(), [innings, innings + 1])
         
-        # Create missing extras columns if they don't exist
-        extras_columns = ['extras.wides', 'extras.legbyes', 'extras.noballs', 'extras.byes']
-        for col in extras_columns:
-            if col not in innings_1_df.columns:
-                innings_1_df[col] = None
-        
-        # Create missing runs columns if they don't exist
-        runs_columns = ['runs.batter', 'runs.extras', 'runs.total']
-        for col in runs_columns:
-            if col not in innings_1_df.columns:
-                innings_1_df[col] = 0  # Default to 0 for runs
-        
-        # Create missing wicket columns if they don't exist
-        wicket_columns = ['wicket_player_out', 'wicket_kind', 'wicket_fielder']
-        for col in wicket_columns:
-            if col not in innings_1_df.columns:
-                innings_1_df[col] = None
-        
-        # Arrange columns in the specified order
-        base_columns = ['overs', 'balls', 'batter', 'non_striker', 'bowler','runs.batter',  'description',
-                        'runs.extras', 'runs.total',
-                         'extras.wides','extras.legbyes','extras.noballs','ball_areas', 'is_wicket',
-                         'wicket_player_out', 'wicket_kind',
-                         'wicket_fielder','is_drs', 'is_umpires_call']
-        
-        # Only include columns that actually exist in the dataframe
-        existing_columns = [col for col in base_columns if col in innings_1_df.columns]
+        # Keep the original per-innings column layout (a copy, so the cached frame is never modified)
+        innings_df = match_df.iloc[start:stop, match_df.columns.get_indexer(INNINGS_COLUMNS)].copy()
+        innings_df.index = pd.RangeIndex(stop - start)
+        return innings_df
+    
+    def convert_match_to_df(self, with_state=False):
+        """
+        Flatten every innings of the match into one DataFrame in a single pass.
         
-        # Reorder the DataFrame columns
-        innings_1_df = innings_1_df[existing_columns]
+        Deliveries are walked once and each one becomes a tuple of WALKED_COLUMNS;
+        the tuples are then transposed into typed column arrays. The loaded JSON is
+        never modified, and the result always has MATCH_COLUMNS, whatever fields the
+        file happens to contain. with_state=True appends match_state.STATE_COLUMNS
+        (what the ingest stores); they cost more than the flatten itself, so only the
+        callers that use them ask for them.
         
-        # Populate is_wicket column based on wicket_player_out
-        innings_1_df = self.populate_wicket_flag(innings_1_df)
+        With streaming=True the overs are read straight from the file, one at a time.
+        Both frames are built once and cached on the instance, so later calls (and every
+        convert_json_to_df innings) reuse them; copy one before modifying it in place.
+        """
+        if with_state:
+            if self._state_df is None:
+                df = self.convert_match_to_df()
+                with self.metrics.stage('flatten'):
+                    self._state_df = add_match_state(df, self.data.get('info') or {}, self._innings_headers,
+                                                     Path(self.json_file_path).stem)
+            return self._state_df
+        if self._match_df is not None:
+            return self._match_df
+        if self.stream is not None:
+            over_iter = self.stream.iter_overs()
+            innings_headers = self.stream.innings_headers
+        else:
+            innings_list = self.data.get('innings', [])
+            over_iter = ((innings_num, over)
+                         for innings_num, inns in enumerate(innings_list)
+                         for over in inns.get('overs', []))
+            innings_headers = dict(enumerate(innings_list))
         
-        return innings_1_df
+        with self.metrics.stage('flatten'):
+            self._match_df = flatten_overs(over_iter, innings_headers)
+        self._innings_headers = innings_headers
+        return self._match_df
     
     def populate_wicket_flag(self, df):
         """Populate is_wicket column based on wicket_player_out"""
@@ -130,8 +261,6 @@ class extract_match_data:
         df['is_wicket'] = df['wicket_player_out'].notna().astype(int)
         return df
     
-match = extract_match_data(sample_json)
-print('done')
 # x = match.convert_json_to_df(1)
 # print(x.head())
 
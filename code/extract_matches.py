@@ -1,33 +1,29 @@
-import json
-import glob
+import argparse
 import csv
+from match_catalog import list_matches
 
-output = []
 
-# Adjust this if your JSON files are not in the current directory
-for file in glob.glob("/Users/saral/Documents/cricket/cricsheet/all_json/nepal/*.json"):
-    try:
-        with open(file, "r") as f:
-            data = json.load(f)
-            print(f"Processing {file}...")
-            # Ensure it's a list or make it iterable
-            records = data if isinstance(data, list) else [data]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write match_type_output.csv for the ODI/ODM matches")
+    parser.add_argument('--data-dir', action='append', default=None,
+                        help="Directory with match JSON files, repeatable (default: Nepal ODI/ODM/T20)")
+    parser.add_argument('--output', default="match_type_output.csv")
+    args = parser.parse_args(argv)
 
-            for record in records:
-                mt = record.get("match_type")
-                if mt in ["ODM", "ODI"]:
-                    match_type_number = record.get("match_type_type_number")
-                    output.append({
-                        "filename": file,
-                        "match_type": mt,
-                        "match_type_number": match_type_number
-                    })
+    # Headers come from the catalog (match_catalog.py); only new or changed files are read
+    output = [{
+        "filename": row['file_path'],
+        "match_type": row['match_type'],
+        "match_type_number": row['match_type_number']
+    } for row in list_matches(args.data_dir, match_type=["ODM", "ODI"])]
+    print(f"Found {len(output)} ODI/ODM matches")
 
-    except Exception as e:
-        print(f"Error processing {file}: {e}")
+    # Write to CSV
+    with open(args.output, "w", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=["filename", "match_type", "match_type_number"])
+        writer.writeheader()
+        writer.writerows(output)
 
-# Write to CSV
-with open("match_type_output.csv", "w", newline="") as csvfile:
-    writer = csv.DictWriter(csvfile, fieldnames=["filename", "match_type", "match_type_number"])
-    writer.writeheader()
-    writer.writerows(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from database_model import CricketDelivery, CricketMatch, IngestManifest
+from matchups import retract_match_matchups
+from scorecards import delete_match_scorecards
+
+
+'''
+Change-aware ingestion.
+- ingest_manifest keeps path, size, mtime, sha256 and meta.revision for every loaded match.
+- The manifest (and the set of loaded match IDs) is read once per run.
+- Same path, size and mtime as the manifest -> skip without opening the file. Paths are stored
+  absolute, and a match found in several data directories is only read from the first one
+  (corpus.unique_match_files), so an unchanged corpus is skipped whole on every run.
+- Different stat but same content hash -> only the manifest row is refreshed.
+- Anything else is (re)loaded; a changed match has its rows replaced in one transaction.
+- Matches loaded before the manifest existed have no entry, so they are reloaded once.
+'''
+
+SKIP = 'skip'        # unchanged, nothing to do
+TOUCH = 'touch'      # same content, new path/mtime: refresh the manifest row only
+LOAD = 'load'        # new match
+REPLACE = 'replace'  # match already in the database with different content
+
+
+class FileState:
+    """Stat and content hash of one match file"""
+    def __init__(self, file_path, match_id):
+        # Absolute, so the manifest path doesn't depend on the directory the ingest ran from
+        self.file_path = Path(file_path).resolve()
+        self.match_id = match_id
+        stat = os.stat(self.file_path)
+        self.file_size = stat.st_size
+        self.file_mtime = stat.st_mtime
+        self.content_hash = None
+
+    def compute_hash(self):
+        with open(self.file_path, 'rb') as f:
+            self.content_hash = hashlib.file_digest(f, 'sha256').hexdigest()
+        return self.content_hash
+
+
+class ManifestIndex:
+    """In-memory copy of ingest_manifest and the loaded match IDs for one run"""
+    def __init__(self, entries, loaded_ids):
+        self.entries = entries        # match_id -> (file_path, file_size, file_mtime, content_hash, revision)
+        self.loaded_ids = loaded_ids  # match_ids present in cricket_matches
+
+    @classmethod
+    def load(cls, session):
+        """Read the whole manifest and the loaded match IDs (two queries per run)"""
+        entries = {
+            row.match_id: (row.file_path, row.file_size, row.file_mtime, row.content_hash, row.revision)
+            for row in session.query(IngestManifest.match_id, IngestManifest.file_path,
+                                     IngestManifest.file_size, IngestManifest.file_mtime,
+                                     IngestManifest.content_hash, IngestManifest.revision)
+        }
+        loaded_ids = {match_id for (match_id,) in session.query(CricketMatch.match_id)}
+        return cls(entries, loaded_ids)
+
+    def plan(self, file_path, match_id):
+        """Return (action, FileState) for a match file"""
+        state = FileState(file_path, match_id)
+        entry = self.entries.get(match_id)
+
+        if entry is not None and match_id in self.loaded_ids:
+            path, size, mtime, content_hash, _ = entry
+            if path == str(state.file_path) and size == state.file_size and mtime == state.file_mtime:
+                return SKIP, state
+            if state.compute_hash() == content_hash:
+                return TOUCH, state
+            return REPLACE, state
+
+        state.compute_hash()
+        if match_id in self.loaded_ids:
+            return REPLACE, state
+        return LOAD, state
+
+    def previous_revision(self, match_id):
+        entry = self.entries.get(match_id)
+        return entry[4] if entry else None
+
+    def mark_loaded(self, state, revision):
+        """Keep the in-memory copy current after a commit"""
+        self.entries[state.match_id] = (str(state.file_path), state.file_size, state.file_mtime,
+                                        state.content_hash, revision)
+        self.loaded_ids.add(state.match_id)
+
+
+def delete_match_rows(session, match_id):
+    """Remove a match, its deliveries, scorecards and matchup counts (inside the caller's transaction)"""
+    delete_match_scorecards(session, match_id)
+    retract_match_matchups(session, match_id)
+    session.query(CricketDelivery).filter_by(match_id=match_id).delete(synchronize_session=False)
+    session.query(CricketMatch).filter_by(match_id=match_id).delete(synchronize_session=False)
+
+
+def record_manifest(session, state, meta):
+    """Insert or replace the manifest row for a match (inside the caller's transaction)"""
+    meta = meta or {}
+    session.query(IngestManifest).filter_by(match_id=state.match_id).delete(synchronize_session=False)
+    session.add(IngestManifest(
+        match_id=state.match_id,
+        file_path=str(state.file_path),
+        file_size=state.file_size,
+        file_mtime=state.file_mtime,
+        content_hash=state.content_hash,
+        revision=meta.get('revision'),
+        data_version=meta.get('data_version'),
+        ingested_at=datetime.now(timezone.utc),
+    ))
+
+
+def touch_manifest(session, state):
+    """Refresh path/size/mtime for a file whose content hash did not change"""
+    session.query(IngestManifest).filter_by(match_id=state.match_id).update({
+        'file_path': str(state.file_path),
+        'file_size': state.file_size,
+        'file_mtime': state.file_mtime,
+    }, synchronize_session=False)
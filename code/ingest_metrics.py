@@ -0,0 +1,299 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+'''
+Structured timings for the ingest (extract_match_data + NepalODIProcessor).
+- Every match gets a span; the stages run for it add their wall time to the span and to the run totals:
+    read        reading the file's bytes
+    decode      json.loads (or, when streaming, the header)
+    flatten     convert_match_to_df (when streaming this includes reading the innings)
+    validate    match_validation.validate_frame on the flattened frame
+    build       ORM objects / bulk rows from the flattened frame
+    flush       ORM flush of the match and its deliveries
+    write       bulk COPY / executemany of the deliveries
+    scorecards  refresh_match_scorecards
+    matchups    add_match_matchups
+    commit      the match's COMMIT
+- Counters: rows, bytes_read, matches by status (loaded / skipped / quarantined / failed), rollbacks, retries.
+- Export: one JSON line per match span plus a run summary line (--metrics-jsonl), and a
+  Prometheus text-format file for node_exporter's textfile collector (--metrics-prom).
+- Off by default: NULL_METRICS hands out one shared no-op context manager, so the
+  instrumented code pays a method call per stage and nothing per ball.
+
+Use case
+python main.py ingest --metrics-jsonl data/metrics/ingest.jsonl --metrics-prom data/metrics/ingest.prom
+'''
+
+STAGES = ('read', 'decode', 'flatten', 'validate', 'build', 'flush', 'write', 'scorecards', 'matchups', 'commit')
+MATCH_SECONDS_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_PREFIX = 'cricket_ingest'
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class NullMetrics:
+    """Instrumentation switched off"""
+    enabled = False
+
+    def stage(self, name):
+        return _NULL_STAGE
+
+    def span(self, match_id):
+        return _NULL_STAGE
+
+    def add_stages(self, stages):
+        pass
+
+    def count(self, name, value=1):
+        pass
+
+    def add_rows(self, rows):
+        pass
+
+    def add_bytes(self, size):
+        pass
+
+    def mark(self, status):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class _Stage:
+    __slots__ = ('metrics', 'name', 'started')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_stage(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class MatchSpan:
+    """Timings and counts of one match"""
+
+    def __init__(self, match_id):
+        self.match_id = match_id
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+        self.stages = defaultdict(float)
+        self.rows = 0
+        self.bytes_read = 0
+        self.status = 'loaded'
+        self.retries = 0
+        self.seconds = 0.0
+
+    def to_dict(self):
+        return {'type': 'match', 'match_id': self.match_id, 'started_at': self.started_at,
+                'status': self.status, 'seconds': round(self.seconds, 6),
+                'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+                'rows': self.rows, 'bytes_read': self.bytes_read, 'retries': self.retries,
+                'rows_per_s': round(self.rows / self.seconds, 1) if self.rows and self.seconds else None}
+
+
+class _Span:
+    __slots__ = ('metrics', 'span', 'started')
+
+    def __init__(self, metrics, match_id):
+        self.metrics = metrics
+        self.span = MatchSpan(match_id)
+
+    def __enter__(self):
+        self.metrics._local.span = self.span
+        self.started = time.perf_counter()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.seconds = time.perf_counter() - self.started
+        if exc_type is not None:
+            self.span.status = 'failed'
+        self.metrics._local.span = None
+        self.metrics.finish_span(self.span)
+        return False
+
+
+class IngestMetrics:
+    """Per-stage timings, counters and per-match spans of one ingest run (thread-safe)"""
+    enabled = True
+
+    def __init__(self, jsonl_path=None, prom_path=None):
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+        self.prom_path = Path(prom_path) if prom_path else None
+        self.started = time.perf_counter()
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.stage_seconds = defaultdict(float)
+        self.stage_calls = Counter()
+        self.counters = Counter()
+        self.match_buckets = Counter()
+        self.match_seconds_sum = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._jsonl = None
+        if self.jsonl_path:
+            self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+            self._jsonl = open(self.jsonl_path, 'a')
+
+    @property
+    def current_span(self):
+        return getattr(self._local, 'span', None)
+
+    # --- Recording ------------------------------------------------------------------
+
+    def stage(self, name):
+        """Context manager timing one stage of the current match"""
+        return _Stage(self, name)
+
+    def span(self, match_id):
+        """Context manager for one match; stages, rows and bytes recorded inside belong to it"""
+        return _Span(self, match_id)
+
+    def add_stage(self, name, seconds):
+        span = self.current_span
+        if span is not None:
+            span.stages[name] += seconds
+        with self._lock:
+            self.stage_seconds[name] += seconds
+            self.stage_calls[name] += 1
+
+    def add_stages(self, stages):
+        """Merge timings measured elsewhere (e.g. by a worker process) into the current match"""
+        for name, seconds in stages.items():
+            if name == 'bytes_read':
+                self.add_bytes(seconds)
+            else:
+                self.add_stage(name, seconds)
+
+    def count(self, name, value=1):
+        span = self.current_span
+        if span is not None and name == 'retries':
+            span.retries += value
+        with self._lock:
+            self.counters[name] += value
+
+    def add_rows(self, rows):
+        span = self.current_span
+        if span is not None:
+            span.rows += rows
+        self.count('rows', rows)
+
+    def add_bytes(self, size):
+        span = self.current_span
+        if span is not None:
+            span.bytes_read += size
+        self.count('bytes_read', size)
+
+    def mark(self, status):
+        """Status of the current match: 'loaded', 'skipped', 'quarantined' or 'failed'"""
+        span = self.current_span
+        if span is not None:
+            span.status = status
+
+    def finish_span(self, span):
+        bucket = next((bound for bound in MATCH_SECONDS_BUCKETS if span.seconds <= bound), '+Inf')
+        with self._lock:
+            self.counters[f'matches_{span.status}'] += 1
+            self.match_buckets[bucket] += 1
+            self.match_seconds_sum += span.seconds
+            if self._jsonl:
+                self._jsonl.write(json.dumps(span.to_dict()) + '\n')
+
+    # --- Export ---------------------------------------------------------------------
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        rows = self.counters['rows']
+        return {'type': 'run', 'started_at': self.started_at, 'seconds': round(elapsed, 6),
+                'stages': {name: {'seconds': round(self.stage_seconds[name], 6), 'calls': self.stage_calls[name]}
+                           for name in STAGES if name in self.stage_calls},
+                'counters': dict(self.counters),
+                'rows_per_s': round(rows / elapsed, 1) if elapsed else None}
+
+    def prometheus_text(self):
+        summary = self.summary()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {value}" if label_text
+                             else f"{METRIC_PREFIX}_{name} {value}")
+
+        metric('stage_seconds_total', 'counter', "Wall time spent in each ingest stage",
+               [({'stage': name}, round(self.stage_seconds[name], 6)) for name in STAGES if name in self.stage_calls])
+        metric('stage_calls_total', 'counter', "Times each ingest stage ran",
+               [({'stage': name}, self.stage_calls[name]) for name in STAGES if name in self.stage_calls])
+        metric('matches_total', 'counter', "Matches by outcome",
+               [({'status': status}, self.counters[f'matches_{status}']) for status in ('loaded', 'skipped', 'quarantined', 'failed')])
+        metric('rows_total', 'counter', "Delivery rows written", [({}, self.counters['rows'])])
+        metric('bytes_read_total', 'counter', "Bytes of match JSON read", [({}, self.counters['bytes_read'])])
+        metric('rollbacks_total', 'counter', "Match transactions rolled back", [({}, self.counters['rollbacks'])])
+        metric('retries_total', 'counter', "Match transactions retried after a transient database error",
+               [({}, self.counters['retries'])])
+        metric('rows_per_second', 'gauge', "Delivery rows per second over the run",
+               [({}, summary['rows_per_s'] or 0)])
+        metric('run_seconds', 'gauge', "Wall time of the run", [({}, summary['seconds'])])
+
+        cumulative, samples = 0, []
+        for bound in MATCH_SECONDS_BUCKETS:
+            cumulative += self.match_buckets[bound]
+            samples.append(({'le': bound}, cumulative))
+        cumulative += self.match_buckets['+Inf']
+        samples.append(({'le': '+Inf'}, cumulative))
+        metric('match_seconds', 'histogram', "Wall time per match", [])
+        name = f"{METRIC_PREFIX}_match_seconds"
+        lines.extend(f'{name}_bucket{{le="{labels["le"]}"}} {value}' for labels, value in samples)
+        lines.append(f"{name}_sum {round(self.match_seconds_sum, 6)}")
+        lines.append(f"{name}_count {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Write atomically so a textfile collector never reads half a file"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def close(self):
+        """Write the run summary line and the Prometheus file"""
+        if self._jsonl:
+            self._jsonl.write(json.dumps(self.summary()) + '\n')
+            self._jsonl.close()
+            self._jsonl = None
+        if self.prom_path:
+            self.write_prometheus(self.prom_path)
+
+
+def create_metrics(jsonl_path=None, prom_path=None):
+    """IngestMetrics when an export path is given, otherwise NULL_METRICS"""
+    if jsonl_path or prom_path:
+        return IngestMetrics(jsonl_path, prom_path)
+    return NULL_METRICS
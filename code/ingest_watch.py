@@ -0,0 +1,474 @@
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import signal
+import statistics
+import struct
+import sys
+import time
+from pathlib import Path
+from corpus import DEFAULT_DATA_DIRS, find_match_file
+
+
+'''
+Watch mode: ingest new or changed match files as they land in the data directories.
+- On Linux the directories are watched with inotify (through libc, no extra package) for
+  IN_CLOSE_WRITE and IN_MOVED_TO, so a file is picked up once its writer closed it or it was
+  renamed into place. Elsewhere, or with --poll, the directories are stat-scanned every
+  --poll-interval seconds and a file is taken once its size and mtime held still for one scan.
+- Events are collected into micro-batches: a batch closes after --debounce seconds without a
+  new event, after --max-wait seconds at most, or at --max-batch files. A file that lands
+  several times within a batch is loaded once.
+- Each file of a batch goes through NepalODIProcessor.process_single_match, i.e. the same
+  per-match transaction as `ingest` (manifest check, players, scorecards, ingest version bump).
+  The processor lives for the whole session, so the manifest and the players are read once.
+  Files are validated and bad ones quarantined as with `ingest` (--no-validate, --quarantine-report).
+- After every batch the derived stores that exist are brought up to date: the match catalog,
+  the Parquet snapshot (when it was built from the watched directories) and, with
+  --engine-dir, the ball engine (a full rebuild, so it is opt-in).
+- Latency is measured from the moment a file landed (the inotify event, or its mtime when
+  polling) to the commit of its match ("queryable") and to the end of the derived refresh,
+  for the files that were loaded or replaced (unchanged and failed files are left out).
+  Every batch prints p50 / max, batches over --latency-budget are flagged, and --latency-log
+  appends one JSON line per batch.
+- Files already in the directories are caught up first (unchanged ones are skipped through
+  the manifest), after the watches are in place, so nothing landing meanwhile is missed.
+
+Use case
+python main.py watch --data-dir data/Nepal/ODI --data-dir data/Nepal/T20
+python main.py watch --poll --poll-interval 1 --latency-log data/benchmarks/watch_latency.jsonl
+'''
+
+DEBOUNCE = 0.3        # Seconds without a new event that close a batch
+MAX_WAIT = 2.0        # Seconds a batch may stay open after its first event
+MAX_BATCH = 64        # Files per batch
+POLL_INTERVAL = 0.5   # Seconds between two directory scans when polling
+LATENCY_BUDGET = 3.0  # Seconds from landing to queryable before a batch is flagged
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len (then len bytes of name)
+EVENT_BUFFER = 64 * 1024
+
+
+def is_match_file(name):
+    """*.json, leaving out hidden and temporary files of writers that rename into place"""
+    return name.endswith('.json') and not name.startswith('.')
+
+
+def scan_dirs(data_dirs):
+    """path -> (size, mtime_ns) of the match files in the directories"""
+    files = {}
+    for data_dir in data_dirs:
+        for entry in os.scandir(data_dir):
+            if entry.is_file() and is_match_file(entry.name):
+                stat = entry.stat()
+                files[Path(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+class InotifyWatcher:
+    """Linux inotify on the data directories (not recursive)"""
+    mode = 'inotify'
+
+    def __init__(self, data_dirs):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_init1: {os.strerror(error)}")
+        self.data_dirs = [Path(d) for d in data_dirs]
+        self.watches = {}
+        for data_dir in self.data_dirs:
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(data_dir), IN_CLOSE_WRITE | IN_MOVED_TO)
+            if wd < 0:
+                error = ctypes.get_errno()
+                self.close()
+                raise OSError(error, f"inotify_add_watch {data_dir}: {os.strerror(error)}")
+            self.watches[wd] = data_dir
+
+    def poll(self, timeout):
+        """{path: landed_at} of the files completed within timeout seconds (None blocks)"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return {}
+        landed_at = time.time()
+        try:
+            buffer = os.read(self.fd, EVENT_BUFFER)
+        except BlockingIOError:
+            return {}
+        landed, offset = {}, 0
+        while offset < len(buffer):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+            start = offset + EVENT_HEADER.size
+            name = os.fsdecode(buffer[start:start + length].rstrip(b'\0'))
+            offset = start + length
+            if mask & IN_Q_OVERFLOW:
+                # The kernel queue overflowed and events were lost: take every file, the
+                # manifest skips the unchanged ones
+                print("  ⚠️  inotify queue overflowed, rescanning the directories")
+                landed.update((path, landed_at) for path in scan_dirs(self.data_dirs))
+            elif mask & IN_IGNORED:
+                print(f"  ⚠️  Stopped watching {self.watches.pop(wd, wd)} (removed or unmounted)")
+            elif wd in self.watches and is_match_file(name):
+                landed[self.watches[wd] / name] = landed_at
+        return landed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """Stat scan of the data directories every interval seconds"""
+    mode = 'polling'
+
+    def __init__(self, data_dirs, interval=POLL_INTERVAL):
+        self.data_dirs = [Path(d) for d in data_dirs]
+        self.interval = interval
+        self.known = scan_dirs(self.data_dirs)  # files already there are left to the catch-up pass
+        self.pending = {}                       # path -> ((size, mtime_ns), landed_at)
+        self.scanned_at = time.time()
+        self.next_scan = time.monotonic() + interval
+
+    def poll(self, timeout):
+        """{path: landed_at} of the files whose size and mtime held still since the last scan"""
+        wait = max(self.next_scan - time.monotonic(), 0)
+        if timeout is not None and wait > timeout:
+            time.sleep(timeout)
+            return {}
+        time.sleep(wait)
+        previous_scan, self.scanned_at = self.scanned_at, time.time()
+        self.next_scan = time.monotonic() + self.interval
+
+        current = scan_dirs(self.data_dirs)
+        ready = {}
+        for path, key in current.items():
+            if self.known.get(path) == key:
+                continue
+            pending = self.pending.get(path)
+            if pending and pending[0] == key:
+                ready[path] = pending[1]
+                self.known[path] = key
+                del self.pending[path]
+            else:
+                # It landed after the previous scan, and not before its mtime
+                landed_at = pending[1] if pending else max(key[1] / 1e9, previous_scan)
+                self.pending[path] = (key, landed_at)
+        for path in set(self.known) - current.keys():
+            del self.known[path]
+        for path in set(self.pending) - current.keys():
+            del self.pending[path]
+        return ready
+
+    def close(self):
+        pass
+
+
+def create_watcher(data_dirs, mode='auto', poll_interval=POLL_INTERVAL):
+    """inotify on Linux unless mode='poll', falling back to polling when it can't be set up"""
+    if mode != 'poll' and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(data_dirs)
+        except OSError as e:
+            if mode == 'inotify':
+                raise
+            print(f"⚠️  inotify unavailable ({e}), polling every {poll_interval}s instead")
+    elif mode == 'inotify':
+        raise OSError(f"inotify needs Linux, this is {sys.platform}")
+    return PollingWatcher(data_dirs, poll_interval)
+
+
+def snapshot_covers(snapshot_dir, data_dirs):
+    """True when every file of an existing snapshot comes from the watched directories"""
+    from analytics_snapshot import MANIFEST_FILE
+    manifest_path = Path(snapshot_dir) / MANIFEST_FILE
+    if not manifest_path.exists():
+        return False
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+    dirs = {Path(d).resolve() for d in data_dirs}
+    return all(Path(entry['file_path']).parent.resolve() in dirs for entry in manifest.values())
+
+
+def derived_refreshers(data_dirs, catalog_path=None, snapshot_dir=None, engine_dir=None):
+    """
+    [(name, refresh())] for the derived stores to update after a batch: the catalog and the
+    snapshot when they exist, the ball engine when engine_dir is given.
+    """
+    refreshers = []
+    if catalog_path and Path(catalog_path).exists():
+        def refresh_catalog_rows():
+            from match_catalog import connect_catalog, refresh_catalog
+            conn = connect_catalog(catalog_path)
+            try:
+                refresh_catalog(conn, data_dirs)
+            finally:
+                conn.close()
+        refreshers.append(('catalog', refresh_catalog_rows))
+
+    if snapshot_dir and Path(snapshot_dir).exists():
+        if snapshot_covers(snapshot_dir, data_dirs):
+            def refresh_snapshot():
+                from analytics_snapshot import AnalyticsSnapshot
+                AnalyticsSnapshot(snapshot_dir, data_dirs).build()
+            refreshers.append(('snapshot', refresh_snapshot))
+        else:
+            print(f"⚠️  Snapshot {snapshot_dir} was built from other directories, not refreshing it")
+
+    if engine_dir:
+        def rebuild_engine():
+            from ball_engine import build_engine
+            build_engine(data_dirs).save(engine_dir)
+        refreshers.append(('engine', rebuild_engine))
+    return refreshers
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class IngestWatcher:
+    """Micro-batches landed files into a long-lived NepalODIProcessor"""
+
+    def __init__(self, processor, watcher, debounce=DEBOUNCE, max_wait=MAX_WAIT, max_batch=MAX_BATCH,
+                 refreshers=(), latency_budget=LATENCY_BUDGET, latency_log=None):
+        """
+        Args:
+            processor: NepalODIProcessor whose per-match path loads the files
+            watcher: InotifyWatcher or PollingWatcher on the processor's data directories
+            debounce: Seconds without a new event that close a batch
+            max_wait: Seconds a batch may stay open after its first event
+            max_batch: Files per batch
+            refreshers: [(name, refresh())] run after every batch (see derived_refreshers)
+            latency_budget: Seconds from landing to queryable before a batch is flagged
+            latency_log: JSON lines file that gets one record per batch
+        """
+        self.processor = processor
+        self.watcher = watcher
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.refreshers = list(refreshers)
+        self.latency_budget = latency_budget
+        self.latency_log = Path(latency_log) if latency_log else None
+        self.stopping = False
+        self.batches = 0
+        self.queryable = []  # landing -> commit seconds of every file
+        self.refreshed = []  # landing -> derived refresh done seconds of every file
+
+    def stop(self, *_):
+        self.stopping = True
+
+    def collect(self):
+        """{path: landed_at} of the next micro-batch (empty when stopping)"""
+        landed = {}
+        while not self.stopping and not landed:
+            landed = self.watcher.poll(1.0)
+        first_event = time.monotonic()
+        while landed and len(landed) < self.max_batch and not self.stopping:
+            remaining = self.max_wait - (time.monotonic() - first_event)
+            if remaining <= 0:
+                break
+            more = self.watcher.poll(min(self.debounce, remaining))
+            if not more:
+                break
+            for path, landed_at in more.items():
+                landed.setdefault(path, landed_at)  # latency counts from the first landing
+        return landed
+
+    def ingest(self, landed, session):
+        """
+        Load a batch file by file (oldest first); returns [(path, action, committed_at)] with the
+        manifest action of each file (False when it failed or was quarantined)
+        """
+        results = []
+        for file_path in sorted(landed, key=landed.get):
+            if not file_path.exists():
+                print(f"  ⚠️  {file_path.name} is gone, skipping")
+                continue
+            primary = find_match_file(file_path.stem, self.processor.data_dirs)
+            if primary is not None and primary.resolve() != file_path.resolve():
+                print(f"  ⏭️  {file_path} is a copy of {primary}, skipping")
+                continue
+            action = self.processor.process_single_match(file_path, session)
+            results.append((file_path, action, time.time()))
+        return results
+
+    def refresh_derived(self):
+        """Run the refreshers; returns name -> seconds"""
+        timings = {}
+        for name, refresh in self.refreshers:
+            started = time.perf_counter()
+            try:
+                refresh()
+            except Exception as e:
+                print(f"  ❌ Error refreshing the {name}: {e}")
+            timings[name] = round(time.perf_counter() - started, 3)
+        return timings
+
+    def process_batch(self, landed):
+        from ingest_manifest import LOAD, REPLACE, SKIP, TOUCH
+        quarantined_before = self.processor.quarantine.count
+        session = self.processor.db_manager.get_session()
+        try:
+            results = self.ingest(landed, session)
+        finally:
+            session.close()
+        timings = self.refresh_derived()
+        refreshed_at = time.time()
+        self.batches += 1
+
+        # Latency only covers files whose rows were written (unchanged files were never waiting)
+        loaded = [(file_path, committed_at) for file_path, action, committed_at in results
+                  if action in (LOAD, REPLACE)]
+        unchanged = sum(1 for _, action, _ in results if action in (SKIP, TOUCH))
+        failed = sum(1 for _, action, _ in results if not action)
+        quarantined = self.processor.quarantine.count - quarantined_before
+        queryable = [committed_at - landed[file_path] for file_path, committed_at in loaded]
+        refreshed = [refreshed_at - landed[file_path] for file_path, _ in loaded]
+        self.queryable.extend(queryable)
+        self.refreshed.extend(refreshed)
+        record = {
+            'batch': self.batches,
+            'files': len(results),
+            'loaded': len(loaded),
+            'unchanged': unchanged,
+            'failed': failed - quarantined,
+            'quarantined': quarantined,
+            'queryable_p50': round(statistics.median(queryable), 3) if queryable else None,
+            'queryable_max': round(max(queryable), 3) if queryable else None,
+            'refreshed_max': round(max(refreshed), 3) if refreshed else None,
+            'refresh_seconds': timings,
+        }
+        if queryable:
+            refreshes = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+            print(f"⚡ Batch {self.batches}: {len(loaded)} files queryable {record['queryable_p50']:.2f}s "
+                  f"(p50) / {record['queryable_max']:.2f}s (max) after landing, derived stores refreshed at "
+                  f"{record['refreshed_max']:.2f}s{f' ({refreshes})' if refreshes else ''}")
+            if record['queryable_max'] > self.latency_budget:
+                print(f"  ⚠️  Over the {self.latency_budget}s latency budget")
+        if record['failed']:
+            print(f"  ❌ {record['failed']} files failed, they are retried when they land again")
+        if quarantined:
+            print(f"  🚧 {quarantined} files failed validation, see {self.processor.quarantine.path}")
+        if self.latency_log:
+            self.latency_log.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.latency_log, 'a') as f:
+                f.write(json.dumps({'recorded_at': round(time.time(), 3), 'mode': self.watcher.mode,
+                                    **record}) + '\n')
+        return record
+
+    def catch_up(self):
+        """Load the files already in the directories (unchanged ones are skipped)"""
+        session = self.processor.db_manager.get_session()
+        try:
+            for file_path in self.processor.get_all_odi_files():
+                self.processor.process_single_match(file_path, session)
+        finally:
+            session.close()
+        self.refresh_derived()
+
+    def run(self, catch_up=True, max_batches=None):
+        """Watch until stopped (SIGINT / SIGTERM) or after max_batches batches"""
+        processor = self.processor
+        if not processor.db_manager.connect():
+            print("Failed to connect to database")
+            return False
+        processor.db_manager.create_schema()
+        processor.manifest = None
+        processor.players = None
+        try:
+            if catch_up:
+                self.catch_up()
+            dirs = ', '.join(str(d) for d in processor.data_dirs)
+            print(f"👀 Watching {dirs} ({self.watcher.mode}), Ctrl+C to stop")
+            while not self.stopping and (max_batches is None or self.batches < max_batches):
+                landed = self.collect()
+                if landed:
+                    self.process_batch(landed)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.watcher.close()
+            processor.db_manager.close()
+            processor.metrics.close()
+        print(self.summary())
+        if processor.quarantine.count:
+            print(processor.quarantine.summary())
+        return True
+
+    def summary(self):
+        if not self.queryable:
+            return f"\n📊 {self.batches} batches, no files loaded"
+        return (f"\n📊 {self.batches} batches, {len(self.queryable)} files: landing -> queryable "
+                f"p50 {statistics.median(self.queryable):.2f}s, p95 {_percentile(self.queryable, 0.95):.2f}s, "
+                f"max {max(self.queryable):.2f}s; landing -> derived refreshed max {max(self.refreshed):.2f}s")
+
+
+def main(argv=None):
+    """Watch the data directories and ingest files as they land"""
+    from analytics_snapshot import SNAPSHOT_DIR
+    from ingest_metrics import create_metrics
+    from match_catalog import CATALOG_PATH
+    from match_validation import QUARANTINE_REPORT, QuarantineReport
+    from process_nepal_odi import WRITE_MODES, NepalODIProcessor
+
+    parser = argparse.ArgumentParser(description="Ingest new Cricsheet files as they land")
+    parser.add_argument('--database-url', default=None, help="Defaults to the DB_* environment variables")
+    parser.add_argument('--data-dir', action='append', default=None,
+                        help="Directory to watch, repeatable (default: Nepal ODI/ODM/T20)")
+    parser.add_argument('--write-mode', choices=WRITE_MODES, default='bulk')
+    parser.add_argument('--poll', action='store_true', help="Poll the directories instead of using inotify")
+    parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL, help="Seconds between scans")
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE,
+                        help="Seconds without a new file that close a batch")
+    parser.add_argument('--max-wait', type=float, default=MAX_WAIT,
+                        help="Seconds a batch may stay open after its first file")
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help="Files per batch")
+    parser.add_argument('--no-catch-up', dest='catch_up', action='store_false',
+                        help="Don't load the files already in the directories first")
+    parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many batches")
+    parser.add_argument('--catalog', default=str(CATALOG_PATH), help="Match catalog to refresh (if it exists)")
+    parser.add_argument('--snapshot-dir', default=str(SNAPSHOT_DIR), help="Parquet snapshot to refresh (if it exists)")
+    parser.add_argument('--engine-dir', default=None, help="Rebuild the ball engine here after every batch")
+    parser.add_argument('--latency-budget', type=float, default=LATENCY_BUDGET,
+                        help="Flag batches slower than this from landing to queryable (seconds)")
+    parser.add_argument('--latency-log', default=None, help="Append one JSON line per batch to this file")
+    parser.add_argument('--metrics-jsonl', default=None,
+                        help="Append per-match stage timings to this JSON lines file")
+    parser.add_argument('--no-validate', dest='validate', action='store_false',
+                        help="Skip the pre-ingest checks of each flattened match (match_validation.py)")
+    parser.add_argument('--quarantine-report', default=str(QUARANTINE_REPORT),
+                        help="JSON lines file listing the files that failed validation, with their issues")
+    args = parser.parse_args(argv)
+
+    data_dirs = [Path(d) for d in (args.data_dir or DEFAULT_DATA_DIRS)]
+    missing = [str(d) for d in data_dirs if not d.is_dir()]
+    if missing:
+        raise SystemExit(f"❌ Not a directory: {', '.join(missing)}")
+
+    processor = NepalODIProcessor(database_url=args.database_url, write_mode=args.write_mode,
+                                  data_dir=data_dirs, metrics=create_metrics(args.metrics_jsonl, None),
+                                  validate=args.validate, quarantine=QuarantineReport(args.quarantine_report))
+    watcher = create_watcher(data_dirs, 'poll' if args.poll else 'auto', args.poll_interval)
+    refreshers = derived_refreshers(data_dirs, args.catalog, args.snapshot_dir, args.engine_dir)
+    ingest_watcher = IngestWatcher(processor, watcher, debounce=args.debounce, max_wait=args.max_wait,
+                                   max_batch=args.max_batch, refreshers=refreshers,
+                                   latency_budget=args.latency_budget, latency_log=args.latency_log)
+    signal.signal(signal.SIGTERM, ingest_watcher.stop)
+    if refreshers:
+        print(f"🔄 Refreshing after every batch: {', '.join(name for name, _ in refreshers)}")
+    ingest_watcher.run(catch_up=args.catch_up, max_batches=args.max_batches)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+import argparse
+import hashlib
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from corpus import DATA_DIR, DEFAULT_DATA_DIRS
+
+try:
+    import zstandard
+except ImportError:  # Optional: uv sync --extra archive
+    zstandard = None
+
+ARCHIVE_FILE = DATA_DIR / 'archive' / 'corpus.zar'
+PACK_DIRS = DEFAULT_DATA_DIRS + [DATA_DIR / 'Nepal' / 'Nepal_json']
+
+
+'''
+Content-addressed, compressed archive of the match JSON corpus (zstandard).
+- Layout: a 40-byte header (magic, offset and size of the dictionary, offset and size of the
+  index), the zstd dictionary, one independent zstd frame per distinct file content, the index.
+- Files are deduplicated by the sha256 of their bytes (the ingest manifest's content hash), so a
+  match that sits in data/Nepal/Nepal_json and in data/Nepal/ODI is stored once. A frame
+  decompresses to the file's exact bytes.
+- Every frame is compressed on its own with a dictionary trained on the corpus (the files share
+  their keys, team and player names), so any match is read without touching the others.
+  --dict-size 0 (or fewer than MIN_DICT_SAMPLES files) packs without a dictionary.
+- The index (zstd-compressed JSON, read once when the archive is opened) maps each member, the
+  file's path relative to data/ (Nepal/ODI/1154649.json; the absolute path for a directory
+  outside data/), to its blob, and each blob to its
+  offset, size and sha256. A match ID resolves to its first member in pack order, like
+  corpus.match_files ("first directory wins").
+- MatchArchive memory-maps the file: reading a match is one slice of the map and one decompress
+  call. With mmap=False it is one seek and one read.
+- extract_match_data(match_id, archive=...) loads a match from an archive (streaming included),
+  and `engine build --archive` scans the corpus from one.
+- Needs the zstandard package (uv sync --extra archive).
+
+Use case
+python main.py archive pack                          # data/Nepal/*/ -> data/archive/corpus.zar
+python main.py archive ls --data-dir data/Nepal/ODI
+python main.py archive cat 1154649 | head
+python main.py archive verify                        # every member against the files it was packed from
+python main.py archive bench                         # cold-cache scan of the files vs the archive
+'''
+
+MAGIC = b'CRKZAR01'
+HEADER = struct.Struct('<8sQQQQ')
+FORMAT_VERSION = 1
+LEVEL = 19
+DICT_SIZE = 112 * 1024
+MIN_DICT_SAMPLES = 8  # zstd can't train a dictionary on fewer files
+
+
+def require_zstandard():
+    if zstandard is None:
+        raise ImportError("the match archive needs zstandard: uv sync --extra archive")
+
+
+def _member_path(path, root):
+    """POSIX path relative to root, or the absolute path for anything outside it"""
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(Path(root).resolve()).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def member_name(file_path, root=DATA_DIR):
+    """Archive member of a file: its POSIX path relative to root (absolute outside root)"""
+    return _member_path(file_path, root)
+
+
+def member_prefix(data_dir, root=DATA_DIR):
+    """Member prefix of a data directory ('' for root itself)"""
+    prefix = _member_path(data_dir, root)
+    return '' if prefix == '.' else prefix + '/'
+
+
+def pack_archive(output=ARCHIVE_FILE, data_dirs=None, root=DATA_DIR, level=LEVEL, dict_size=DICT_SIZE):
+    """Pack the *.json files of data_dirs (in order) into an archive; returns its statistics"""
+    require_zstandard()
+    members, blobs = {}, {}
+    raw_bytes = 0
+    for data_dir in data_dirs or PACK_DIRS:
+        for file_path in sorted(Path(data_dir).glob("*.json")):
+            content = file_path.read_bytes()
+            raw_bytes += len(content)
+            digest = hashlib.sha256(content).hexdigest()
+            blobs.setdefault(digest, content)
+            members[member_name(file_path, root)] = digest
+    if not members:
+        raise ValueError("no match files to pack")
+
+    contents = list(blobs.values())
+    dictionary = (zstandard.train_dictionary(dict_size, contents)
+                  if dict_size > 0 and len(contents) >= MIN_DICT_SAMPLES else None)
+    compressor = zstandard.ZstdCompressor(level=level, dict_data=dictionary, write_content_size=True)
+    dictionary_bytes = dictionary.as_bytes() if dictionary is not None else b''
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    partial = output.with_name(output.name + '.partial')
+    index = {'version': FORMAT_VERSION, 'level': level, 'blobs': [], 'members': {}}
+    blob_ids = {}
+    with open(partial, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, 0, 0, 0, 0))
+        dictionary_offset = f.tell()
+        f.write(dictionary_bytes)
+        for digest, content in blobs.items():
+            frame = compressor.compress(content)
+            blob_ids[digest] = len(index['blobs'])
+            index['blobs'].append([f.tell(), len(frame), len(content), digest])
+            f.write(frame)
+        index['members'] = {member: blob_ids[digest] for member, digest in members.items()}
+        index_bytes = zstandard.ZstdCompressor(level=level).compress(json.dumps(index).encode())
+        index_offset = f.tell()
+        f.write(index_bytes)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, dictionary_offset, len(dictionary_bytes), index_offset, len(index_bytes)))
+    os.replace(partial, output)
+    return {'members': len(members), 'blobs': len(blobs), 'raw_bytes': raw_bytes,
+            'unique_bytes': sum(map(len, contents)), 'archive_bytes': output.stat().st_size,
+            'dictionary_bytes': len(dictionary_bytes)}
+
+
+class MatchArchive:
+    """Read-only view of an archive; match IDs and member paths both work as keys"""
+
+    def __init__(self, path=ARCHIVE_FILE, mmap=True, root=DATA_DIR):
+        require_zstandard()
+        self.path = Path(path)
+        self.use_mmap = mmap
+        self.root = root
+        self._file = open(self.path, 'rb')
+        self._map = _map_file(self._file) if mmap else None
+        magic, dictionary_offset, dictionary_size, index_offset, index_size = HEADER.unpack(self._read(0, HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a match archive")
+        dictionary = self._read(dictionary_offset, dictionary_size)
+        self.dictionary = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        index = json.loads(zstandard.ZstdDecompressor().decompress(self._read(index_offset, index_size)))
+        self.blobs = index['blobs']
+        self.members = index['members']
+        self.matches = {}
+        for member, blob in self.members.items():
+            self.matches.setdefault(Path(member).stem, blob)
+        self._local = threading.local()
+
+    def _read(self, offset, size):
+        if self._map is not None:
+            return self._map[offset:offset + size]
+        self._file.seek(offset)
+        return self._file.read(size)
+
+    @property
+    def _decompressor(self):
+        # zstd contexts aren't thread-safe: one per thread
+        decompressor = getattr(self._local, 'decompressor', None)
+        if decompressor is None:
+            decompressor = self._local.decompressor = zstandard.ZstdDecompressor(dict_data=self.dictionary)
+        return decompressor
+
+    def blob(self, key):
+        """[offset, size, raw size, sha256] of a match ID or member path"""
+        key = str(key)
+        blob = self.members.get(key)
+        if blob is None:
+            blob = self.matches.get(Path(key).stem if key.endswith('.json') else key)
+        if blob is None:
+            raise KeyError(f"{key} is not in {self.path}")
+        return self.blobs[blob]
+
+    def __contains__(self, key):
+        try:
+            self.blob(key)
+            return True
+        except KeyError:
+            return False
+
+    def __len__(self):
+        return len(self.matches)
+
+    def read_bytes(self, key):
+        """The file's original bytes"""
+        offset, size, raw_size, _ = self.blob(key)
+        return self._decompressor.decompress(self._read(offset, size), max_output_size=raw_size)
+
+    def open(self, key):
+        """Binary file object decompressing the match as it is read (for match_stream.MatchStream)"""
+        offset, size, _, _ = self.blob(key)
+        if self._map is not None:
+            return self._decompressor.stream_reader(memoryview(self._map)[offset:offset + size])
+        return io.BytesIO(self.read_bytes(key))
+
+    def load(self, key):
+        """The parsed match document"""
+        return json.loads(self.read_bytes(key))
+
+    def content_hash(self, key):
+        return self.blob(key)[3]
+
+    def stored_size(self, key):
+        return self.blob(key)[1]
+
+    def match_files(self, data_dirs=None):
+        """match_id -> member across the data directories (first directory wins), like corpus.match_files"""
+        files = {}
+        if data_dirs is None:
+            for member in self.members:
+                files.setdefault(Path(member).stem, member)
+            return files
+        for data_dir in data_dirs:
+            prefix = member_prefix(data_dir, self.root)
+            for member in sorted(self.members):
+                if member.startswith(prefix) and '/' not in member[len(prefix):]:
+                    files.setdefault(Path(member).stem, member)
+        return files
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __getstate__(self):
+        # Pickled as its path, so process pools reopen it
+        return {'path': self.path, 'mmap': self.use_mmap, 'root': self.root}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['mmap'], state['root'])
+
+
+def _map_file(f):
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@lru_cache(maxsize=4)
+def open_archive(path, mmap=True):
+    """Archive opened once per process (worker tasks receive the path)"""
+    return MatchArchive(path, mmap=mmap)
+
+
+# --- Benchmark --------------------------------------------------------------------------
+
+def evict(paths):
+    """Drop the files' pages from the page cache (clean pages only), for a cold-cache read"""
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def read_files(paths):
+    contents = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            contents.append(f.read())
+    return contents
+
+
+def read_archive(path, members, mmap=True):
+    with MatchArchive(path, mmap=mmap) as archive:
+        return [archive.read_bytes(member) for member in members]
+
+
+def bench_scan(archive_path, data_dirs=None, repeat=3):
+    """
+    Seconds to get every match's bytes into memory from the files and from the archive, with a
+    cold and a warm page cache, plus the json.loads time that a full parse adds to either.
+    """
+    members = list(MatchArchive(archive_path).match_files(data_dirs).values())
+    files = [DATA_DIR / member for member in members]
+    results = {'matches': len(members)}
+    for name, paths, read in (('files', files, lambda: read_files(files)),
+                              ('archive', [archive_path], lambda: read_archive(archive_path, members)),
+                              ('archive_no_mmap', [archive_path],
+                               lambda: read_archive(archive_path, members, mmap=False))):
+        cold, warm = [], []
+        for _ in range(repeat):
+            evict(paths)
+            started = time.perf_counter()
+            read()
+            cold.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            contents = read()
+            warm.append(time.perf_counter() - started)
+        results[name] = {'cold_s': round(min(cold), 4), 'warm_s': round(min(warm), 4),
+                         'bytes': sum(os.path.getsize(path) for path in paths)}
+    started = time.perf_counter()
+    for content in contents:
+        json.loads(content)
+    results['parse_s'] = round(time.perf_counter() - started, 4)
+    return results
+
+
+def main(argv=None):
+    """Pack, list, read, verify or benchmark the match archive"""
+    parser = argparse.ArgumentParser(description="Content-addressed zstd archive of the match JSON files")
+    parser.add_argument('--archive', default=str(ARCHIVE_FILE), help="Archive file")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    pack_parser = subparsers.add_parser('pack', help="Pack the match files into the archive")
+    pack_parser.add_argument('--data-dir', action='append', default=None,
+                             help="Directory with match JSON files, repeatable (default: every data/Nepal directory)")
+    pack_parser.add_argument('--level', type=int, default=LEVEL, help="zstd level")
+    pack_parser.add_argument('--dict-size', type=int, default=DICT_SIZE, help="Dictionary bytes (0: none)")
+    ls_parser = subparsers.add_parser('ls', help="List the matches (first directory wins)")
+    ls_parser.add_argument('--data-dir', action='append', default=None)
+    cat_parser = subparsers.add_parser('cat', help="Write a match's JSON to stdout")
+    cat_parser.add_argument('match', help="Match ID or member path (Nepal/ODI/1154649.json)")
+    subparsers.add_parser('verify', help="Check every member against its sha256 and the file it was packed from")
+    bench_parser = subparsers.add_parser('bench', help="Time a scan of the corpus from the files and from the archive")
+    bench_parser.add_argument('--data-dir', action='append', default=None)
+    bench_parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.command == 'pack':
+        started = time.perf_counter()
+        stats = pack_archive(args.archive, args.data_dir, level=args.level, dict_size=args.dict_size)
+        print(f"📦 {args.archive}: {stats['members']} files, {stats['blobs']} distinct, "
+              f"{stats['raw_bytes'] / 1e6:.1f} MB -> {stats['archive_bytes'] / 1e6:.2f} MB "
+              f"({stats['raw_bytes'] / stats['archive_bytes']:.0f}x, dictionary {stats['dictionary_bytes'] / 1024:.0f} KB) "
+              f"in {time.perf_counter() - started:.1f}s")
+        return
+
+    with MatchArchive(args.archive) as archive:
+        if args.command == 'ls':
+            for match_id, member in archive.match_files(args.data_dir).items():
+                offset, size, raw_size, digest = archive.blob(member)
+                print(f"{match_id:>10}  {member:<40} {raw_size:>9,} -> {size:>7,}  {digest[:12]}")
+        elif args.command == 'cat':
+            sys.stdout.buffer.write(archive.read_bytes(args.match))
+        elif args.command == 'verify':
+            bad = 0
+            for member in archive.members:
+                content = archive.read_bytes(member)
+                source = DATA_DIR / member
+                problem = ('sha256 mismatch' if hashlib.sha256(content).hexdigest() != archive.content_hash(member)
+                           else 'differs from the file on disk' if source.exists() and source.read_bytes() != content
+                           else None)
+                if problem:
+                    bad += 1
+                    print(f"  ❌ {member}: {problem}")
+            print(f"{'✅' if not bad else '❌'} {len(archive.members) - bad} of {len(archive.members)} members verified")
+            if bad:
+                raise SystemExit(1)
+    if args.command == 'bench':
+        results = bench_scan(args.archive, args.data_dir, args.repeat)
+        files = results['files']
+        print(f"⏱️  Reading {results['matches']} matches into memory (best of {args.repeat}):")
+        for name in ('files', 'archive', 'archive_no_mmap'):
+            result = results[name]
+            print(f"  {name:<16} {result['bytes'] / 1e6:8.2f} MB on disk  cold {result['cold_s']:7.3f}s "
+                  f"({files['cold_s'] / result['cold_s']:4.1f}x)  warm {result['warm_s']:7.3f}s")
+        print(f"  json.loads of all of them adds {results['parse_s']:.3f}s either way")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import argparse
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from corpus import DATA_DIR, DEFAULT_DATA_DIRS
+from match_stream import read_match_header
+
+
+'''
+Persistent match catalog built from the file headers only.
+- Each file is read up to the end of 'info' (see match_stream.py); innings are never parsed.
+- Headers are kept in a SQLite file (data/catalog.sqlite, standard library sqlite3), one row per
+  file with size and mtime. A refresh stats every file and only re-reads new or changed ones;
+  rows of deleted files are dropped.
+- Rows are looked up by match_id. The same match can sit in several directories
+  (data/Nepal/Nepal_json repeats the others), so a query covers the requested directories
+  and the first directory that has a match wins, as in corpus.match_files.
+- Lookups by match type, date, team, opponent and event go through indexes, so
+  "Nepal T20s vs UAE since 2019" doesn't touch the corpus at all.
+- Only the standard library and ijson are imported, so listing starts almost instantly.
+
+Use case
+python main.py catalog --match-type ODI --team Nepal
+python main.py catalog --match-type T20 --match-type IT20 --team Nepal --opponent "United Arab Emirates" --since 2019-01-01
+'''
+
+CATALOG_PATH = DATA_DIR / 'catalog.sqlite'
+CATALOG_VERSION = 1
+CATALOG_FIELDS = ['match_id', 'date', 'match_type', 'team1', 'team2', 'venue', 'winner']
+
+# Columns of catalog_files filled from the header
+HEADER_COLUMNS = ['match_id', 'match_type', 'match_type_number', 'gender', 'team_type', 'date', 'season',
+                  'team1', 'team2', 'venue', 'city', 'event', 'event_match_number', 'winner',
+                  'toss_winner', 'toss_decision', 'revision', 'data_version']
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS catalog_files (
+        file_path TEXT PRIMARY KEY,
+        data_dir TEXT NOT NULL,
+        file_size INTEGER NOT NULL,
+        file_mtime_ns INTEGER NOT NULL,
+        scanned_at TEXT NOT NULL,
+        match_id TEXT NOT NULL,
+        match_type TEXT,
+        match_type_number INTEGER,
+        gender TEXT,
+        team_type TEXT,
+        date TEXT,
+        season TEXT,
+        team1 TEXT,
+        team2 TEXT,
+        venue TEXT,
+        city TEXT,
+        event TEXT,
+        event_match_number INTEGER,
+        winner TEXT,
+        toss_winner TEXT,
+        toss_decision TEXT,
+        revision INTEGER,
+        data_version TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_catalog_match_id ON catalog_files (match_id)",
+    "CREATE INDEX IF NOT EXISTS ix_catalog_type_date ON catalog_files (match_type, date)",
+    "CREATE INDEX IF NOT EXISTS ix_catalog_date ON catalog_files (date)",
+    "CREATE INDEX IF NOT EXISTS ix_catalog_event ON catalog_files (event)",
+    "CREATE INDEX IF NOT EXISTS ix_catalog_data_dir ON catalog_files (data_dir)",
+    """CREATE TABLE IF NOT EXISTS catalog_teams (
+        team TEXT NOT NULL,
+        file_path TEXT NOT NULL REFERENCES catalog_files (file_path) ON DELETE CASCADE,
+        PRIMARY KEY (team, file_path)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_catalog_teams_file ON catalog_teams (file_path)",
+]
+
+
+def header_record(match_id, info, meta=None):
+    """Catalog row for the 'meta' / 'info' sections of a match file"""
+    teams = info.get('teams', [])
+    dates = info.get('dates', [])
+    event = info.get('event') or {}
+    toss = info.get('toss') or {}
+    meta = meta or {}
+    return {
+        'match_id': match_id,
+        'date': str(dates[0]) if dates else None,
+        'match_type': info.get('match_type'),
+        'match_type_number': info.get('match_type_number'),
+        'gender': info.get('gender'),
+        'team_type': info.get('team_type'),
+        'season': str(info['season']) if info.get('season') is not None else None,
+        'team1': teams[0] if len(teams) > 0 else None,
+        'team2': teams[1] if len(teams) > 1 else None,
+        'venue': info.get('venue'),
+        'city': info.get('city'),
+        'event': event.get('name'),
+        'event_match_number': event.get('match_number'),
+        'winner': info.get('outcome', {}).get('winner'),
+        'toss_winner': toss.get('winner'),
+        'toss_decision': toss.get('decision'),
+        'revision': meta.get('revision'),
+        'data_version': meta.get('data_version'),
+    }
+
+
+def connect_catalog(catalog_path=CATALOG_PATH):
+    """Open (and create or upgrade) the catalog database"""
+    catalog_path = Path(catalog_path)
+    catalog_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(catalog_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != CATALOG_VERSION:
+        # The catalog is derived data: rebuild it rather than migrate it
+        conn.execute("DROP TABLE IF EXISTS catalog_teams")
+        conn.execute("DROP TABLE IF EXISTS catalog_files")
+        conn.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+    return conn
+
+
+def _resolved_dirs(data_dirs):
+    return [Path(data_dir).resolve() for data_dir in (data_dirs or DEFAULT_DATA_DIRS)]
+
+
+def refresh_catalog(conn, data_dirs=None):
+    """
+    Bring the catalog rows of the given directories up to date with the files on disk.
+    Returns (new_or_changed, removed, failed) counts.
+    """
+    dirs = _resolved_dirs(data_dirs)
+    dir_names = [str(data_dir) for data_dir in dirs]
+    placeholders = ','.join('?' * len(dir_names))
+    known = {row['file_path']: (row['file_size'], row['file_mtime_ns'])
+             for row in conn.execute(f"SELECT file_path, file_size, file_mtime_ns FROM catalog_files "
+                                     f"WHERE data_dir IN ({placeholders})", dir_names)}
+
+    seen, changed = set(), []
+    for data_dir in dirs:
+        for file_path in sorted(data_dir.glob("*.json")):
+            key = str(file_path)
+            seen.add(key)
+            stat = file_path.stat()
+            if known.get(key) != (stat.st_size, stat.st_mtime_ns):
+                changed.append((file_path, stat))
+
+    scanned_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    rows, teams, failed = [], [], 0
+    for file_path, stat in changed:
+        try:
+            meta, info = read_match_header(file_path)
+        except Exception as e:
+            print(f"  ❌ Error reading {file_path}: {e}")
+            failed += 1
+            continue
+        record = header_record(file_path.stem, info, meta)
+        rows.append([str(file_path), str(file_path.parent), stat.st_size, stat.st_mtime_ns, scanned_at]
+                    + [record[column] for column in HEADER_COLUMNS])
+        teams.extend((team, str(file_path)) for team in info.get('teams', []))
+
+    removed = [(file_path,) for file_path in known.keys() - seen]
+    columns = ['file_path', 'data_dir', 'file_size', 'file_mtime_ns', 'scanned_at'] + HEADER_COLUMNS
+    with conn:
+        conn.executemany("DELETE FROM catalog_files WHERE file_path = ?", removed)
+        conn.executemany("DELETE FROM catalog_teams WHERE file_path = ?", [(row[0],) for row in rows])
+        conn.executemany(f"INSERT OR REPLACE INTO catalog_files ({', '.join(columns)}) "
+                         f"VALUES ({', '.join('?' * len(columns))})", rows)
+        conn.executemany("INSERT OR IGNORE INTO catalog_teams (team, file_path) VALUES (?, ?)", teams)
+    return len(rows), len(removed), failed
+
+
+def query_catalog(conn, data_dirs=None, match_type=None, team=None, opponent=None, since=None, until=None,
+                  event=None, gender=None):
+    """
+    Catalog rows (dicts, plus file_path) matching every given filter, newest first.
+    match_type may be one type or a list; since / until are ISO dates (inclusive).
+    """
+    dirs = [str(data_dir) for data_dir in _resolved_dirs(data_dirs)]
+    joins, join_params = [], []
+    for alias, name in (('t1', team), ('t2', opponent)):
+        if name:
+            joins.append(f"JOIN catalog_teams {alias} ON {alias}.file_path = f.file_path AND {alias}.team = ?")
+            join_params.append(name)
+    where, params = [f"f.data_dir IN ({','.join('?' * len(dirs))})"], join_params + dirs
+    if match_type:
+        types = [match_type] if isinstance(match_type, str) else list(match_type)
+        where.append(f"f.match_type IN ({','.join('?' * len(types))})")
+        params.extend(types)
+    for clause, value in (("f.date >= ?", since), ("f.date <= ?", until), ("f.event = ?", event),
+                          ("f.gender = ?", gender)):
+        if value:
+            where.append(clause)
+            params.append(value)
+
+    sql = f"SELECT f.* FROM catalog_files f {' '.join(joins)} WHERE {' AND '.join(where)}"
+    rank = {data_dir: position for position, data_dir in enumerate(dirs)}
+    rows = {}
+    for row in conn.execute(sql, params):
+        row = dict(row)
+        # First directory wins for a match that sits in several of them
+        current = rows.get(row['match_id'])
+        if current is None or rank[row['data_dir']] < rank[current['data_dir']]:
+            rows[row['match_id']] = row
+    return sorted(rows.values(), key=lambda row: (row['date'] or '', row['match_id']), reverse=True)
+
+
+def list_matches(data_dirs=None, match_type=None, team=None, opponent=None, since=None, until=None,
+                 event=None, gender=None, refresh=True, catalog_path=CATALOG_PATH):
+    """Catalog rows for the matches in data_dirs, refreshing the catalog first unless refresh=False"""
+    conn = connect_catalog(catalog_path)
+    try:
+        if refresh:
+            refresh_catalog(conn, data_dirs)
+        return query_catalog(conn, data_dirs, match_type, team, opponent, since, until, event, gender)
+    finally:
+        conn.close()
+
+
+def select_match_files(data_dirs=None, **filters):
+    """Paths of the match files that pass the catalog filters (see query_catalog)"""
+    return [Path(row['file_path']) for row in list_matches(data_dirs, **filters)]
+
+
+def format_rows(rows, fields=CATALOG_FIELDS):
+    """Plain-text table (no pandas)"""
+    widths = {field: max([len(field)] + [len(str(row[field] or '')) for row in rows]) for field in fields}
+    lines = ['  '.join(field.ljust(widths[field]) for field in fields)]
+    for row in rows:
+        lines.append('  '.join(str(row[field] or '').ljust(widths[field]) for field in fields))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    """List matches from the catalog"""
+    parser = argparse.ArgumentParser(description="List matches without parsing the innings")
+    parser.add_argument('--data-dir', action='append', default=None,
+                        help="Directory with match JSON files, repeatable (default: Nepal ODI/ODM/T20)")
+    parser.add_argument('--match-type', action='append', default=None, help="e.g. ODI, ODM, T20 (repeatable)")
+    parser.add_argument('--team', default=None)
+    parser.add_argument('--opponent', default=None, help="Only matches between --team and this team")
+    parser.add_argument('--since', default=None, help="First date, YYYY-MM-DD")
+    parser.add_argument('--until', default=None, help="Last date, YYYY-MM-DD")
+    parser.add_argument('--event', default=None)
+    parser.add_argument('--gender', default=None)
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--catalog', default=str(CATALOG_PATH), help="Catalog database file")
+    parser.add_argument('--no-refresh', dest='refresh', action='store_false',
+                        help="Don't check the files for changes first")
+    args = parser.parse_args(argv)
+
+    conn = connect_catalog(args.catalog)
+    try:
+        if args.refresh:
+            changed, removed, _ = refresh_catalog(conn, args.data_dir)
+            if changed or removed:
+                print(f"🔄 Catalog updated: {changed} new or changed, {removed} removed")
+        rows = query_catalog(conn, args.data_dir, args.match_type, args.team, args.opponent,
+                             args.since, args.until, args.event, args.gender)
+    finally:
+        conn.close()
+    shown = rows[:args.limit] if args.limit else rows
+    print(format_rows(shown))
+    print(f"\n📋 {len(rows)} matches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+import argparse
+import csv
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from corpus import DATA_DIR, find_match_file
+
+EXPORT_DIR = DATA_DIR / 'export'
+EXPORT_FORMATS = ('csv', 'xlsx', 'parquet')
+
+
+'''
+Export matches to CSV, Excel or Parquet.
+- Deliveries (default): the flattened match (convert_match_to_df), one file per match.
+- Scorecards (--scorecards): batting, bowling and fall-of-wickets cards laid out like
+  data/template/scoreboard_temple.xlsx:
+    Teams                     batters of both teams with their runs per innings
+    <Team>_<n>_innings        score block, FOW row, then the ball log in the template's columns
+    <Team>_Summary            batting card (Batsman, Run, Balls_faced, S/R ...) and the
+                              bowling card against that team, per innings
+  xlsx writes one workbook per match; csv / parquet append every match to one file per
+  card (innings, batting, bowling, fall_of_wickets) under the output directory.
+- Workbooks are written with openpyxl's write-only mode, which streams rows to the file
+  instead of building the sheet in memory. It can't open an existing workbook, so the
+  template's layout is rebuilt rather than copied (its pivot tables and array formulas
+  would not survive a streamed copy anyway); figures are written as values.
+  Needs the openpyxl package (uv sync --extra export).
+- Matches are split into batches over a process pool; each worker parses, computes and
+  writes its own matches, so only results or error messages come back.
+- Matches come from the IDs given, or from the catalog filters (--all, --match-type,
+  --team, --since; see match_catalog.py).
+
+Use case
+python main.py export 1154649 1154650 --format xlsx
+python main.py export --scorecards --all --data-dir data/Nepal/Nepal_json --format xlsx
+python main.py export --scorecards --match-type ODI --team Nepal --format parquet
+'''
+
+SCORECARD_TABLES = ('innings', 'batting', 'bowling', 'fall_of_wickets')
+
+# Ball log columns of the template's innings sheets
+BALL_LOG_COLUMNS = ['Overs', 'Batsman', 'Bowler', 'runs', 'Description', 'ball areas', 'is_wicket', 'is_wide',
+                    'is_no_ball', 'is_drs', 'is_uc', 'is_milestone', 'is_LB', 'is_bye', 'dismissal_type', 'fielder',
+                    'is_caught', 'bowlers_legal']
+BATTING_HEADERS = ['Batsman', 'Run', 'Balls_faced', '4s', '6s', 'S/R', 'Dismissal', 'Bowler', 'Fielder']
+BOWLING_HEADERS = ['Bowler', 'Overs', 'Maidens', 'Runs', 'Wickets', 'Economy', 'Dots', 'Wides', 'No balls']
+ORDINALS = {0: '1st', 1: '2nd', 2: '3rd', 3: '4th'}
+
+# Card columns shown on the <Team>_Summary sheets
+BATTING_FIELDS = ['batter', 'runs', 'balls', 'fours', 'sixes', 'strike_rate', 'dismissal', 'dismissed_by', 'fielder']
+BOWLING_FIELDS = ['bowler', 'overs', 'maidens', 'runs', 'wickets', 'economy', 'dots', 'wides', 'noballs']
+FOW_COLUMNS = [('match_id', 'str'), ('innings_number', 'int'), ('team', 'str'), ('wicket', 'int'),
+               ('runs', 'int'), ('player_out', 'str'), ('over', 'str')]
+
+
+def export_match(match_id, out_dir=EXPORT_DIR, fmt='csv', data_dirs=None, file_path=None):
+    """Write one match's deliveries; returns the output path"""
+    from exploring_json_data_struct import extract_match_data  # pandas is only needed here
+
+    file_path = file_path or find_match_file(match_id, data_dirs)
+    if file_path is None:
+        raise FileNotFoundError(f"No match file for {match_id}")
+    df = extract_match_data(str(file_path)).convert_match_to_df(with_state=True)
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_path = out_dir / f"{match_id}.{fmt}"
+    if fmt == 'csv':
+        df.to_csv(out_path, index=False)
+    elif fmt == 'xlsx':
+        write_workbook(out_path, [('deliveries', [list(df.columns)], df)])
+    else:
+        df.to_parquet(out_path, index=False)
+    return out_path
+
+
+# --- Scorecards -------------------------------------------------------------------------
+
+def card_columns(model):
+    """(column, 'int' / 'float' / 'str') of a scorecard model, in table order"""
+    from sqlalchemy import Float, Integer
+    return [(column.name, 'int' if isinstance(column.type, Integer) else
+             'float' if isinstance(column.type, Float) else 'str')
+            for column in model.__table__.columns if column.name != 'id']
+
+
+def scorecard_columns():
+    """Card name -> its columns (see card_columns)"""
+    from database_model import BattingScorecard, BowlingScorecard, InningsScorecard
+    return {'innings': card_columns(InningsScorecard), 'batting': card_columns(BattingScorecard),
+            'bowling': card_columns(BowlingScorecard), 'fall_of_wickets': FOW_COLUMNS}
+
+
+def fall_of_wickets(df, match_id, teams):
+    """One row per wicket: score and over when it fell (from the match-state columns)"""
+    wickets = df[df['is_wicket'] == 1]
+    return [{'match_id': match_id, 'innings_number': int(innings_number), 'team': teams.get(int(innings_number)),
+             'wicket': int(wicket), 'runs': int(runs), 'player_out': player_out, 'over': f"{overs - 1}.{balls}"}
+            for innings_number, wicket, runs, player_out, overs, balls in zip(
+                wickets['innings_number'], wickets['innings_wickets'], wickets['innings_runs'],
+                wickets['wicket_player_out'], wickets['overs'], wickets['balls'])]
+
+
+def ball_log(df):
+    """Flattened match -> the template's ball log columns (plus innings_number); flags are 1 or blank"""
+    import numpy as np
+    import pandas as pd
+    from scorecards import overs_text
+
+    wides, noballs = df['extras.wides'].fillna(0), df['extras.noballs'].fillna(0)
+    legal = ((wides == 0) & (noballs == 0)).astype('int64')
+    bowler_balls = legal.groupby([df['innings_number'], df['bowler']]).cumsum()
+    flag = lambda mask: np.where(mask.to_numpy(dtype=bool), 1, None)
+    return pd.DataFrame({
+        'innings_number': df['innings_number'],
+        'Overs': (df['overs'] - 1).astype(str) + '.' + df['balls'].astype(str),  # 0.1 = first ball
+        'Batsman': df['batter'],
+        'Bowler': df['bowler'],
+        'runs': df['runs.total'],
+        'Description': df['description'].replace('', None),
+        'ball areas': df['ball_areas'].replace('', None),
+        'is_wicket': flag(df['is_wicket'] == 1),
+        'is_wide': flag(wides > 0),
+        'is_no_ball': flag(noballs > 0),
+        'is_drs': flag(df['review.by'].notna()),
+        'is_uc': flag(df['review.umpires_call'].fillna(False).astype(bool)),
+        'is_milestone': None,
+        'is_LB': flag(df['extras.legbyes'].fillna(0) > 0),
+        'is_bye': flag(df['extras.byes'].fillna(0) > 0),
+        'dismissal_type': df['wicket_kind'],
+        'fielder': df['wicket_fielder'],
+        'is_caught': flag(df['wicket_kind'].isin(['caught', 'caught and bowled'])),
+        'bowlers_legal': bowler_balls.map(overs_text),
+    })
+
+
+def _no_nan(rows):
+    """NaN (missing fielder, bowler, ...) -> None, so it becomes an empty cell / null"""
+    for row in rows:
+        for column, value in row.items():
+            if value != value:
+                row[column] = None
+    return rows
+
+
+def match_scorecards(file_path, with_balls=True):
+    """
+    Parse one match file. Returns a dict with the cards (lists of row dicts, see SCORECARD_TABLES),
+    the ball log (DataFrame, when with_balls), info and the batting team per innings.
+    """
+    from bulk_loader import FRAME_TO_TABLE
+    from exploring_json_data_struct import extract_match_data
+    from scorecards import compute_scorecards, scorecard_fields
+
+    match_id = Path(file_path).stem
+    match_data = extract_match_data(str(file_path))
+    info = match_data.data['info']
+    df = match_data.convert_match_to_df(with_state=True)
+    teams = dict(zip(df['innings_number'].astype(int), df['team']))
+
+    deliveries = scorecard_fields(df.rename(columns=FRAME_TO_TABLE))
+    innings, batting, bowling = compute_scorecards(deliveries, match_id, teams)
+    names = info.get('teams') or []
+    if len(names) == 2:
+        # The bowling side, also when the other team never batted
+        opponents = {names[0]: names[1], names[1]: names[0]}
+        for row in bowling:
+            row['team'] = opponents.get(teams.get(row['innings_number']), row['team'])
+    return {
+        'match_id': match_id, 'info': info, 'teams': teams,
+        'innings': _no_nan(innings), 'batting': _no_nan(batting), 'bowling': _no_nan(bowling),
+        'fall_of_wickets': fall_of_wickets(df, match_id, teams),
+        'balls': ball_log(df) if with_balls else None,
+    }
+
+
+def team_label(team, room):
+    """Team name for a sheet title, as initials when it doesn't fit ('United Arab Emirates' -> 'UAE')"""
+    team = team or 'Innings'
+    if len(team) <= room:
+        return team
+    return ''.join(word[0] for word in team.split()).upper()[:room]
+
+
+def sheet_title(name, used):
+    """Excel-safe, unique sheet name (31 characters at most)"""
+    title = re.sub(r"[\[\]:*?/\\']", '', name.replace(' ', '_'))[:31]
+    base, number = title, 2
+    while title.lower() in used:
+        suffix = f"_{number}"
+        title, number = base[:31 - len(suffix)] + suffix, number + 1
+    used.add(title.lower())
+    return title
+
+
+def require_openpyxl():
+    """openpyxl's Workbook (imported lazily: only xlsx exports need it)"""
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ImportError("xlsx export needs openpyxl: uv sync --extra export") from None
+    return Workbook
+
+
+def write_workbook(out_path, sheets):
+    """
+    Stream sheets into an .xlsx with a write-only workbook.
+    sheets: (title, rows written first, DataFrame appended after them or None) per sheet.
+    """
+    Workbook = require_openpyxl()
+    workbook = Workbook(write_only=True)
+    used = set()
+    for title, head_rows, frame in sheets:
+        sheet = workbook.create_sheet(sheet_title(title, used))
+        for row in head_rows:
+            sheet.append(row)
+        if frame is not None:
+            for row in frame.to_numpy(dtype=object, na_value=None).tolist():
+                sheet.append(row)
+    tmp_path = Path(out_path).with_name(f".{Path(out_path).name}.{os.getpid()}.tmp")
+    workbook.save(tmp_path)
+    os.replace(tmp_path, out_path)
+
+
+def _of_innings(rows, number):
+    return [row for row in rows if row['innings_number'] == number]
+
+
+def scorecard_sheets(cards):
+    """Sheets of one match workbook in the template's layout (see write_workbook)"""
+    info, teams = cards['info'], cards['teams']
+    innings, batting, bowling = cards['innings'], cards['batting'], cards['bowling']
+    team_names = info.get('teams') or list(dict.fromkeys(teams.values()))
+    team_innings = {team: [number for number, name in sorted(teams.items()) if name == team] for team in team_names}
+    totals = {row['innings_number']: row for row in innings}
+
+    # Teams: batters of each team side by side, one column of runs per innings
+    blocks = []
+    for team in team_names:
+        numbers = team_innings[team]
+        runs = {}
+        for number in numbers:
+            for row in _of_innings(batting, number):
+                runs.setdefault(row['batter'], {})[number] = row['runs']
+        block = [[team] + [f"{ORDINALS.get(position, position + 1)} inns" for position in range(len(numbers))]]
+        block += [[batter] + [scores.get(number) for number in numbers] for batter, scores in runs.items()]
+        for label, column in (('Extras', 'extras'), ('Total', 'runs')):
+            block.append([label] + [totals[number][column] for number in numbers])
+        blocks.append(block)
+    width = max([len(block[0]) for block in blocks] + [1]) + 2
+    teams_rows = []
+    for line in range(max([len(block) for block in blocks] + [0])):
+        row = []
+        for block in blocks:
+            cells = block[line] if line < len(block) else []
+            row += cells + [None] * (width - len(cells))
+        teams_rows.append(row)
+    outcome = info.get('outcome') or {}
+    teams_rows += [[], ['Match', cards['match_id']], ['Date', str((info.get('dates') or [''])[0])],
+                   ['Venue', info.get('venue')], ['Result', outcome.get('winner') or outcome.get('result')]]
+    sheets = [('Teams', teams_rows, None)]
+
+    # <Team>_<n>_innings: score block, FOW row, ball log
+    balls, team_count = cards['balls'], {}
+    for row in innings:
+        number, team = row['innings_number'], row['team']
+        team_count[team] = team_count.get(team, 0) + 1
+        ordinal = ORDINALS.get(team_count[team] - 1, str(team_count[team]))
+        head = [
+            ['Innings', ordinal, 'Run rate', row['run_rate']],
+            ['Score', f"{row['runs']}/{row['wickets']}", 'Overs', row['overs']],
+            ['Wickets', row['wickets']],
+            ['NBs', row['extras_noballs'], 'Wides', row['extras_wides']],
+            ['LB', row['extras_legbyes'], 'Byes', row['extras_byes']],
+            ['Total', row['runs']],
+            ['FOW'] + [f"{fall['runs']}-{fall['wicket']} ({fall['player_out']}, {fall['over']})"
+                       for fall in _of_innings(cards['fall_of_wickets'], number)],
+            [],
+            BALL_LOG_COLUMNS,
+        ]
+        log = balls[balls['innings_number'] == number][BALL_LOG_COLUMNS]
+        suffix = f"_{ordinal}_innings"
+        sheets.append((team_label(team, 31 - len(suffix)) + suffix, head, log))
+
+    # <Team>_Summary: batting card and the bowling against it, per innings
+    for team in team_names:
+        rows = []
+        for position, number in enumerate(team_innings[team]):
+            rows += [[f"{ORDINALS.get(position, str(position + 1))} Inns"], BATTING_HEADERS]
+            rows += [[card[column] for column in BATTING_FIELDS] for card in _of_innings(batting, number)]
+            rows += [[], BOWLING_HEADERS]
+            rows += [[card[column] for column in BOWLING_FIELDS] for card in _of_innings(bowling, number)]
+            rows.append([])
+        sheets.append((team_label(team, 31 - len("_Summary")) + "_Summary", rows, None))
+    return sheets
+
+
+def export_scorecard_batch(file_paths, out_dir, fmt):
+    """
+    Worker task for the process pool: scorecards of a batch of match files.
+    xlsx workbooks are written here; for csv / parquet the cards are returned to the caller,
+    which appends them to one file per card. Returns (match_id, cards or None, error) per file.
+    """
+    results = []
+    for file_path in file_paths:
+        match_id = Path(file_path).stem
+        try:
+            cards = match_scorecards(file_path, with_balls=fmt == 'xlsx')
+            if fmt == 'xlsx':
+                write_workbook(Path(out_dir) / f"{match_id}.xlsx", scorecard_sheets(cards))
+                results.append((match_id, None, None))
+            else:
+                results.append((match_id, {name: cards[name] for name in SCORECARD_TABLES}, None))
+        except Exception as e:
+            results.append((match_id, None, str(e)))
+    return results
+
+
+class CardWriter:
+    """Appends the cards of every match to one csv / parquet file per card"""
+
+    def __init__(self, out_dir, fmt):
+        self.out_dir = Path(out_dir)
+        self.fmt = fmt
+        self.columns = scorecard_columns()
+        self.files = {}
+        self.writers = {}
+
+    def paths(self):
+        return [self.out_dir / f"{name}.{self.fmt}" for name in SCORECARD_TABLES if name in self.writers]
+
+    def _open(self, name):
+        """csv.DictWriter or pq.ParquetWriter of a card, created on its first rows"""
+        columns = self.columns[name]
+        out_path = self.out_dir / f"{name}.{self.fmt}"
+        if self.fmt == 'csv':
+            handle = self.files[name] = open(out_path, 'w', newline='')
+            writer = csv.DictWriter(handle, fieldnames=[column for column, _ in columns])
+            writer.writeheader()
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            types = {'int': pa.int64(), 'float': pa.float64(), 'str': pa.string()}
+            self.files[name] = writer = pq.ParquetWriter(
+                out_path, pa.schema([(column, types[kind]) for column, kind in columns]))
+        self.writers[name] = writer
+        return writer
+
+    def append(self, cards):
+        for name in SCORECARD_TABLES:
+            rows = cards[name]
+            if not rows:
+                continue
+            writer = self.writers.get(name) or self._open(name)
+            if self.fmt == 'csv':
+                writer.writerows(rows)
+            else:
+                import pyarrow as pa
+                writer.write_table(pa.Table.from_pylist(rows, schema=writer.schema))
+
+    def close(self):
+        for handle in self.files.values():
+            handle.close()
+
+
+def export_scorecards(file_paths, out_dir=EXPORT_DIR, fmt='xlsx', workers=None):
+    """Export the scorecards of many match files; returns (exported, failed, output paths)"""
+    if fmt == 'xlsx':
+        require_openpyxl()  # fail once here rather than in every worker
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = [str(file_path) for file_path in file_paths]
+    workers = workers or os.cpu_count() or 1
+    writer = CardWriter(out_dir, fmt) if fmt != 'xlsx' else None
+    exported, failed = [], 0
+
+    def collect(results):
+        nonlocal failed
+        for match_id, cards, error in results:
+            if error:
+                print(f"  ❌ Error exporting {match_id}: {error}")
+                failed += 1
+                continue
+            if writer:
+                writer.append(cards)
+            exported.append(out_dir / f"{match_id}.xlsx")
+
+    try:
+        if workers > 1 and len(paths) > 1:
+            chunk = max(1, len(paths) // (workers * 4))
+            batches = [paths[i:i + chunk] for i in range(0, len(paths), chunk)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for results in pool.map(export_scorecard_batch, batches, [out_dir] * len(batches),
+                                        [fmt] * len(batches)):
+                    collect(results)
+        else:
+            collect(export_scorecard_batch(paths, out_dir, fmt))
+    finally:
+        if writer:
+            writer.close()
+    return len(exported), failed, (writer.paths() if writer else exported)
+
+
+def select_files(match_ids, data_dirs=None, **filters):
+    """Files of the given match IDs, or of every catalog match passing the filters"""
+    if match_ids:
+        files = []
+        for match_id in match_ids:
+            file_path = find_match_file(match_id, data_dirs)
+            if file_path is None:
+                print(f"  ❌ No match file for {match_id}")
+            else:
+                files.append(file_path)
+        return files
+    from match_catalog import select_match_files
+    return select_match_files(data_dirs, **{name: value for name, value in filters.items() if value})
+
+
+def main(argv=None):
+    """Export one or more matches"""
+    parser = argparse.ArgumentParser(description="Export flattened matches or scorecards to CSV / Excel / Parquet")
+    parser.add_argument('match_ids', nargs='*')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    parser.add_argument('--out-dir', default=str(EXPORT_DIR))
+    parser.add_argument('--data-dir', action='append', default=None,
+                        help="Directory with match JSON files, repeatable (default: Nepal ODI/ODM/T20)")
+    parser.add_argument('--scorecards', action='store_true',
+                        help="Batting, bowling and fall-of-wickets cards in the template's layout")
+    parser.add_argument('--all', action='store_true', help="Every match in the data directories")
+    parser.add_argument('--match-type', action='append', default=None, help="Catalog filter, e.g. ODI (repeatable)")
+    parser.add_argument('--team', default=None, help="Catalog filter")
+    parser.add_argument('--since', default=None, help="Catalog filter, first date YYYY-MM-DD")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    if not (args.match_ids or args.all or args.match_type or args.team or args.since):
+        parser.error("give match IDs, --all or a catalog filter")
+    files = select_files(args.match_ids, args.data_dir, match_type=args.match_type, team=args.team, since=args.since)
+    if not files:
+        print("No matches to export")
+        return
+
+    started = time.perf_counter()
+    if args.scorecards:
+        exported, failed, paths = export_scorecards(files, args.out_dir, args.format, args.workers)
+        if args.format != 'xlsx':
+            for out_path in paths:
+                print(f"  ✅ {out_path}")
+    else:
+        exported, failed = 0, 0
+        for file_path in files:
+            try:
+                out_path = export_match(file_path.stem, args.out_dir, args.format, file_path=file_path)
+                print(f"  ✅ {file_path.stem} -> {out_path}")
+                exported += 1
+            except Exception as e:
+                print(f"  ❌ Error exporting {file_path.stem}: {e}")
+                failed += 1
+    print(f"📤 Exported {exported} matches to {args.out_dir} ({failed} failed) in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
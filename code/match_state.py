@@ -0,0 +1,272 @@
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+
+
+'''
+Match state at every ball, computed with grouped cumulative sums (no per-ball Python loop).
+- Groups are (match_id, innings_number) runs of rows in ball order; each running figure is one
+  cumsum that restarts at group boundaries, so one call covers a single match
+  (convert_match_to_df) or every delivery in the database at once (backfill).
+- innings_runs / innings_wickets: score after the ball. Penalty runs awarded before the
+  innings count from the first ball, those awarded after it on the last ball. Retired hurt /
+  retired not out don't count as wickets, but they do end the partnership.
+- legal_balls: balls bowled so far, wides and no-balls excluded.
+- balls_remaining: from the innings' limit. A revised (DLS) target's overs win over
+  info.overs; a super over has one over; multi-day matches have no limit (null).
+- target_runs / runs_required: innings.target.runs when the file has it, otherwise the
+  previous innings' total + 1 for the second innings of a limited-overs pair (super overs too).
+- current_run_rate / required_run_rate: runs per over, rounded to 2 places.
+- partnership_runs / partnership_balls: since the last dismissal, including this ball.
+With these on cricket_deliveries a chase question is a filter, e.g.
+  WHERE runs_required > 60 AND balls_remaining <= 36 AND innings_wickets <= 5
+
+Use case
+python code/match_state.py backfill      # fill the columns for deliveries loaded before they existed
+'''
+
+STATE_COLUMNS = ['innings_runs', 'innings_wickets', 'legal_balls', 'balls_remaining', 'target_runs',
+                 'runs_required', 'current_run_rate', 'required_run_rate', 'partnership_runs', 'partnership_balls']
+STATE_INT_COLUMNS = ['innings_runs', 'innings_wickets', 'legal_balls', 'partnership_runs', 'partnership_balls']
+STATE_NULLABLE_INT_COLUMNS = ['balls_remaining', 'target_runs', 'runs_required']
+STATE_FLOAT_COLUMNS = ['current_run_rate', 'required_run_rate']
+
+# Dismissals that end a partnership without costing the batting side a wicket
+NOT_TEAM_WICKETS = ['retired hurt', 'retired not out']
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def overs_to_balls(overs, balls_per_over=6):
+    """Cricket overs notation -> balls (37.3 -> 225)"""
+    whole = int(overs)
+    return whole * balls_per_over + int(round((overs - whole) * 10))
+
+
+def innings_context(info, innings_headers):
+    """
+    innings_number -> (ball limit, target runs, balls per over, penalty runs before, after) for one match.
+    innings_headers is the innings list (or MatchStream.innings_headers); only
+    'super_over', 'target' and 'penalty_runs' are read from it.
+    """
+    balls_per_over = info.get('balls_per_over') or 6
+    overs = info.get('overs')
+    if isinstance(innings_headers, list):
+        innings_headers = dict(enumerate(innings_headers))
+    context = {}
+    for number, header in innings_headers.items():
+        target = header.get('target') or {}
+        penalty = header.get('penalty_runs') or {}
+        if header.get('super_over'):
+            limit = balls_per_over
+        elif target.get('overs') is not None:
+            limit = overs_to_balls(target['overs'], balls_per_over)
+        elif overs:
+            limit = overs * balls_per_over
+        else:
+            limit = None
+        context[number] = (limit, target.get('runs'), balls_per_over, penalty.get('pre', 0), penalty.get('post', 0))
+    return context
+
+
+def _segmented_cumsum(values, starts):
+    """Running total of values that restarts wherever starts is True"""
+    total = np.cumsum(values)
+    before = (total - values)[starts]
+    return total - before[np.cumsum(starts) - 1]
+
+
+def compute_match_state(match_ids, innings_numbers, runs, legal, team_wickets, dismissals, contexts):
+    """
+    Match-state columns for deliveries in ball order within each (match, innings).
+
+    All inputs are per-ball arrays except contexts: {(match_id, innings_number): innings_context value}.
+    Rows of one innings must be contiguous; every running figure is a cumulative sum that
+    restarts at innings (or partnership) boundaries. Returns a DataFrame with STATE_COLUMNS.
+    """
+    match_ids = np.asarray(match_ids, dtype=object)
+    innings_numbers = np.asarray(innings_numbers, dtype=np.int64)
+    runs = np.asarray(runs, dtype=np.int64)
+    legal = np.asarray(legal, dtype=np.int64)
+    dismissals = np.asarray(dismissals, dtype=np.int64)
+    size = len(runs)
+
+    starts = np.ones(size, dtype=bool)
+    starts[1:] = (match_ids[1:] != match_ids[:-1]) | (innings_numbers[1:] != innings_numbers[:-1])
+    first = np.flatnonzero(starts)
+    last = np.r_[first[1:] - 1, size - 1] if size else first
+    innings_index = np.cumsum(starts) - 1
+
+    # One context row per innings (a handful per match, so a plain loop)
+    keys = list(zip(match_ids[first].tolist(), innings_numbers[first].tolist()))
+    context = np.array([contexts.get(key, (None, None, 6, 0, 0)) for key in keys], dtype=float).reshape(-1, 5)
+    limit, target, balls_per_over, penalty_pre, penalty_post = context.T
+
+    scored = runs.copy()
+    np.add.at(scored, first, penalty_pre.astype(np.int64))
+    np.add.at(scored, last, penalty_post.astype(np.int64))
+    score = _segmented_cumsum(scored, starts)
+    wickets = _segmented_cumsum(np.asarray(team_wickets, dtype=np.int64), starts)
+    legal_balls = _segmented_cumsum(legal, starts)
+
+    # A partnership starts with the innings or on the ball after a dismissal
+    partnership_starts = starts.copy()
+    partnership_starts[1:] |= dismissals[:-1] > 0
+    partnership_runs = _segmented_cumsum(runs, partnership_starts)
+    partnership_balls = _segmented_cumsum(legal, partnership_starts)
+
+    # Chase target falls back to the previous innings' total + 1
+    totals = dict(zip(keys, score[last].tolist()))
+    for position, (match_id, number) in enumerate(keys):
+        if np.isnan(target[position]) and not np.isnan(limit[position]) and number % 2 == 1 \
+                and (match_id, number - 1) in totals:
+            target[position] = totals[(match_id, number - 1)] + 1
+
+    limit, target, balls_per_over = limit[innings_index], target[innings_index], balls_per_over[innings_index]
+    balls_remaining = np.clip(limit - legal_balls, 0, None)
+    runs_required = np.clip(target - score, 0, None)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        current_rate = np.where(legal_balls > 0, score * balls_per_over / legal_balls, np.nan)
+        required_rate = np.where(runs_required == 0, 0.0,
+                                 np.where(balls_remaining > 0, runs_required * balls_per_over / balls_remaining,
+                                          np.nan))
+    required_rate = np.where(np.isnan(target), np.nan, required_rate)
+
+    return pd.DataFrame({
+        'innings_runs': score,
+        'innings_wickets': wickets,
+        'legal_balls': legal_balls,
+        'balls_remaining': pd.array(balls_remaining, dtype='Int64'),
+        'target_runs': pd.array(target, dtype='Int64'),
+        'runs_required': pd.array(runs_required, dtype='Int64'),
+        'current_run_rate': np.round(current_rate, 2),
+        'required_run_rate': np.round(required_rate, 2),
+        'partnership_runs': partnership_runs,
+        'partnership_balls': partnership_balls,
+    }, columns=STATE_COLUMNS)
+
+
+def _team_wickets(wicket_counts, wicket_kinds):
+    retirements = pd.Series(wicket_kinds, dtype=object).isin(NOT_TEAM_WICKETS).to_numpy()
+    return np.asarray(wicket_counts, dtype=np.int64) - retirements
+
+
+def add_match_state(df, info, innings_headers, match_id=None):
+    """Append STATE_COLUMNS to a convert_match_to_df frame of one match"""
+    wides = df['extras.wides'].fillna(0).to_numpy()
+    noballs = df['extras.noballs'].fillna(0).to_numpy()
+    contexts = {(match_id, number): value for number, value in innings_context(info, innings_headers).items()}
+    state = compute_match_state(
+        np.full(len(df), match_id, dtype=object), df['innings_number'].to_numpy(), df['runs.total'].to_numpy(),
+        (wides == 0) & (noballs == 0), _team_wickets(df['wicket_count'], df['wicket_kind']),
+        df['wicket_count'].to_numpy() > 0, contexts)
+    state.index = df.index
+    return pd.concat([df, state], axis=1)
+
+
+def deliveries_state(deliveries, contexts):
+    """
+    Match state for cricket_deliveries rows of any number of matches (table column names),
+    sorted by match_id, innings_number, overs, balls. Returns STATE_COLUMNS aligned with the rows.
+    """
+    wides = pd.to_numeric(deliveries['extras_wides']).fillna(0).to_numpy()
+    noballs = pd.to_numeric(deliveries['extras_noballs']).fillna(0).to_numpy()
+    is_wicket = pd.to_numeric(deliveries['is_wicket']).fillna(0).to_numpy()
+    state = compute_match_state(
+        deliveries['match_id'].to_numpy(), deliveries['innings_number'].to_numpy(),
+        pd.to_numeric(deliveries['runs_total']).fillna(0).to_numpy(),
+        (wides == 0) & (noballs == 0), _team_wickets(is_wicket, deliveries['wicket_kind']),
+        is_wicket > 0, contexts)
+    state.index = deliveries.index
+    return state
+
+
+def _source_contexts(session, match_ids):
+    """(match_id, innings_number) -> context, from the files recorded in ingest_manifest"""
+    from database_model import IngestManifest
+
+    contexts, missing = {}, []
+    rows = session.query(IngestManifest.match_id, IngestManifest.file_path).filter(
+        IngestManifest.match_id.in_(match_ids))
+    paths = dict(rows.all())
+    for match_id in match_ids:
+        try:
+            with open(paths[match_id], 'rb') as f:
+                document = json.load(f)
+        except (KeyError, OSError, ValueError):
+            missing.append(match_id)
+            continue
+        for number, value in innings_context(document['info'], document.get('innings', [])).items():
+            contexts[(match_id, number)] = value
+    return contexts, missing
+
+
+def backfill_match_state(session, all_rows=False):
+    """
+    Compute the state columns for every delivery that doesn't have them (or all of them)
+    in one grouped pass and write them back. Returns the number of rows updated.
+    """
+    from sqlalchemy import select, update
+    from database_model import CricketDelivery, bump_ingest_version
+
+    columns = ['id', 'match_id', 'innings_number', 'runs_total', 'extras_wides', 'extras_noballs',
+               'is_wicket', 'wicket_kind']
+    pending = select(CricketDelivery.match_id).distinct()
+    if not all_rows:
+        pending = pending.where(CricketDelivery.innings_runs.is_(None))
+    match_ids = [match_id for (match_id,) in session.execute(pending)]
+    if not match_ids:
+        return 0
+
+    query = (select(*[getattr(CricketDelivery, col) for col in columns])
+             .where(CricketDelivery.match_id.in_(match_ids))
+             .order_by(CricketDelivery.match_id, CricketDelivery.innings_number,
+                       CricketDelivery.overs, CricketDelivery.balls))
+    deliveries = pd.DataFrame(session.execute(query).fetchall(), columns=columns)
+    contexts, missing = _source_contexts(session, match_ids)
+    if missing:
+        print(f"  ⚠️  No source file for {len(missing)} matches: limits and targets use the score only")
+    state = deliveries_state(deliveries, contexts)
+
+    records = state.astype(object).where(state.notna(), None)
+    records.insert(0, 'id', deliveries['id'].to_numpy())
+    records = records.to_dict('records')
+    statement = update(CricketDelivery)
+    for start in range(0, len(records), BACKFILL_BATCH_SIZE):
+        session.execute(statement, records[start:start + BACKFILL_BATCH_SIZE])
+    bump_ingest_version(session)
+    session.commit()
+    return len(records)
+
+
+def main(argv=None):
+    """Backfill the match-state columns of cricket_deliveries"""
+    from database_model import DatabaseManager, get_database_config
+
+    parser = argparse.ArgumentParser(description="Per-ball match state (score, target, run rates, partnerships)")
+    parser.add_argument('--database-url', default=None, help="Defaults to the DB_* environment variables")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    backfill_parser = subparsers.add_parser('backfill', help="Fill the state columns from the stored deliveries")
+    backfill_parser.add_argument('--all', action='store_true', help="Recompute every row, not only empty ones")
+    args = parser.parse_args(argv)
+
+    db = DatabaseManager(args.database_url or get_database_config(), profile='bulk-ingest')
+    if not db.connect():
+        return
+    session = db.get_session()
+    try:
+        started = time.perf_counter()
+        rows = backfill_match_state(session, all_rows=args.all)
+        print(f"📈 Match state written for {rows} deliveries in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Backfill failed: {e}")
+    finally:
+        session.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import json
+from pathlib import Path
+
+try:
+    import ijson
+except ImportError:  # Fall back to json.load (same events, but the whole file is held in memory)
+    ijson = None
+
+
+'''
+Incremental reader for Cricsheet match files.
+- A match file is {"meta": {...}, "info": {...}, "innings": [{"team": ..., "overs": [...], ...}]}.
+- The file is parsed from the raw byte stream with ijson, so only one over is held at a time.
+- Events come out in file order: meta, info, then every over of every innings.
+- Innings fields other than 'overs' (team, super_over, target, ...) are collected per innings.
+  'super_over' sits after 'overs' in the files, so it is only known once the innings ends.
+
+Use case
+stream = MatchStream("data/Nepal/ODI/1154649.json")
+meta, info = stream.read_header()        # stops before 'innings'
+for innings_num, over in stream.iter_overs():
+    ...
+stream.innings_headers                  # {0: {'team': 'United Arab Emirates', ...}, 1: {...}}
+'''
+
+
+class _Builder:
+    """Rebuild one JSON value from ijson events, tracking nesting depth"""
+    def __init__(self):
+        self.builder = ijson.ObjectBuilder()
+        self.depth = 0
+
+    def feed(self, event, value):
+        """Feed one event; returns True once the value is complete"""
+        self.builder.event(event, value)
+        if event in ('start_map', 'start_array'):
+            self.depth += 1
+        elif event in ('end_map', 'end_array'):
+            self.depth -= 1
+        return self.depth == 0
+
+    @property
+    def value(self):
+        return self.builder.value
+
+
+class MatchStream:
+    def __init__(self, json_file_path, opener=None):
+        """opener: returns a binary file object with the match (default: open the path)"""
+        self.json_file_path = Path(json_file_path)
+        self.opener = opener or (lambda: open(self.json_file_path, 'rb'))
+        self.innings_headers = {}
+
+    def iter_events(self):
+        """
+        Yield (kind, innings_num, value) in file order:
+        ('meta', None, meta), ('info', None, info), ('over', innings_num, over) for every over,
+        and ('innings', innings_num, header) when an innings ends.
+        """
+        if ijson is None:
+            yield from self._iter_events_json()
+            return
+
+        with self.opener() as f:
+            innings_num = -1
+            header = None
+            pending_key = None  # top-level or innings-level key whose value comes next
+            builder = None
+            building = None     # ('top', key) / ('header', key) / ('over', None)
+
+            for prefix, event, value in ijson.parse(f, use_float=True):
+                if builder is not None:
+                    if builder.feed(event, value):
+                        kind, key = building
+                        if kind == 'top':
+                            yield (key, None, builder.value)
+                        elif kind == 'header':
+                            header[key] = builder.value
+                        else:
+                            yield ('over', innings_num, builder.value)
+                        builder = None
+                        building = None
+                    continue
+
+                if prefix == '' and event == 'map_key':
+                    pending_key = value
+                elif prefix in ('meta', 'info') and pending_key == prefix:
+                    pending_key = None
+                    builder, building = self._start(event, value), ('top', prefix)
+                    if builder is None:
+                        yield (prefix, None, value)
+                elif prefix == 'innings.item' and event == 'start_map':
+                    innings_num += 1
+                    header = {}
+                elif prefix == 'innings.item' and event == 'map_key':
+                    pending_key = value
+                elif prefix == 'innings.item' and event == 'end_map':
+                    self.innings_headers[innings_num] = header
+                    yield ('innings', innings_num, header)
+                elif prefix == 'innings.item.overs.item' and event == 'start_map':
+                    builder, building = self._start(event, value), ('over', None)
+                elif prefix.startswith('innings.item.') and prefix.count('.') == 2 and pending_key:
+                    key = pending_key
+                    pending_key = None
+                    if key == 'overs':
+                        continue  # overs are yielded one at a time above
+                    builder = self._start(event, value)
+                    if builder is None:
+                        header[key] = value
+                    else:
+                        building = ('header', key)
+
+    def _start(self, event, value):
+        """Start a builder for a container value, or return None for a scalar"""
+        if event not in ('start_map', 'start_array'):
+            return None
+        builder = _Builder()
+        builder.feed(event, value)
+        return builder
+
+    def _iter_events_json(self):
+        """Same events as iter_events, from a fully loaded document"""
+        with self.opener() as f:
+            data = json.load(f)
+        for key in ('meta', 'info'):
+            if key in data:
+                yield (key, None, data[key])
+        for innings_num, inns in enumerate(data.get('innings', [])):
+            header = {key: value for key, value in inns.items() if key != 'overs'}
+            for over in inns.get('overs', []):
+                yield ('over', innings_num, over)
+            self.innings_headers[innings_num] = header
+            yield ('innings', innings_num, header)
+
+    def read_header(self):
+        """Return (meta, info) without parsing any innings"""
+        meta, info = {}, {}
+        events = self.iter_events()
+        try:
+            for kind, _, value in events:
+                if kind == 'meta':
+                    meta = value
+                elif kind == 'info':
+                    info = value
+                    break
+        finally:
+            events.close()
+        return meta, info
+
+    def iter_overs(self):
+        """Yield (innings_num, over) for every over; innings_headers is complete once exhausted"""
+        self.innings_headers.clear()
+        for kind, innings_num, value in self.iter_events():
+            if kind == 'over':
+                yield innings_num, value
+
+
+def read_match_header(json_file_path):
+    """Return (meta, info) for a match file, stopping before the innings"""
+    return MatchStream(json_file_path).read_header()
@@ -0,0 +1,284 @@
+import json
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).parent.parent
+QUARANTINE_REPORT = PROJECT_ROOT / 'data' / 'quarantine' / 'quarantine.jsonl'
+
+
+'''
+Pre-ingest validation of a flattened match (the frame from convert_match_to_df), before any
+database work. Every check is a vectorised pass over the frame's columns:
+    runs          runs.total = runs.batter + runs.extras, and runs.extras = the sum of the extras kinds
+    legal_balls   legal balls (no wide / no-ball) per over against info.balls_per_over. One ball
+                  more, or one fewer in an over that isn't the innings' last, is a warning (umpires
+                  miscount, and Cricsheet records what happened); anything further off is an error
+    overs         no innings has more overs than info.overs (super overs: one)
+    wickets       dismissals per innings (at most 10, 2 in a super over), the dismissed player is on
+                  strike or at the other end (except when timed out), no one is out twice in an
+                  innings, every wicket has a kind
+    players       batter, non-striker, bowler and dismissed player are in info.players, batters in
+                  the batting side's list, bowlers in the other side's
+    teams         each innings' team is one of info.teams; in limited-overs matches the two
+                  innings (and each pair of super overs) are batted by different teams
+- Issues are dicts: check, severity ('error' or 'warning'), innings, over, ball, detail.
+  Rows flagged by one check are summarised after MAX_ROWS_PER_CHECK.
+- validate_frame() raises MatchValidationError when there is any error. NepalODIProcessor and
+  async_ingest call it in the flatten step (worker processes when there are any), so a bad file
+  is written to the QuarantineReport instead of opening a transaction. It isn't recorded in the
+  ingest manifest, so the next run checks it again; when it is a new revision of a loaded match,
+  the loaded rows are kept.
+
+Use case
+python main.py ingest --quarantine-report data/quarantine/quarantine.jsonl
+python main.py validate data/Nepal/ODI data/Nepal/T20 --warnings      # print the issues of files
+'''
+
+MAX_ROWS_PER_CHECK = 5
+UMPIRE_MISCOUNT = 1  # Legal balls an over may be off by before it is an error
+LIMITED_OVERS = ('ODI', 'ODM', 'T20', 'IT20')
+# Not dismissals: the batter may come back
+NOT_OUT_KINDS = ('retired hurt', 'retired not out')
+NOT_AT_CREASE_KINDS = ('timed out',)  # The incoming batter is out before reaching the crease
+EXTRAS_COLUMNS = ['extras.wides', 'extras.legbyes', 'extras.noballs', 'extras.byes', 'extras.penalty']
+WICKET_FIELDS = ['innings_number', 'overs', 'balls', 'batter', 'non_striker', 'wicket_count', 'wicket_kind',
+                 'wicket_player_out']
+
+
+class MatchValidationError(ValueError):
+    """A match with validation errors (picklable, so worker processes can return it)"""
+
+    def __init__(self, match_id, issues):
+        super().__init__(match_id, issues)
+        self.match_id = match_id
+        self.issues = issues
+
+    def __str__(self):
+        errors = [issue for issue in self.issues if issue['severity'] == 'error']
+        shown = '; '.join(format_issue(issue) for issue in errors[:3])
+        more = f" (+{len(errors) - 3} more)" if len(errors) > 3 else ''
+        return f"{len(errors)} validation error{'' if len(errors) == 1 else 's'}: {shown}{more}"
+
+
+def format_issue(issue):
+    where = '.'.join(str(issue[key]) for key in ('innings', 'over', 'ball') if issue.get(key) is not None)
+    return f"[{issue['check']}{' ' + where if where else ''}] {issue['detail']}"
+
+
+def _issue(check, severity, detail, innings=None, over=None, ball=None):
+    return {'check': check, 'severity': severity, 'innings': innings, 'over': over, 'ball': ball,
+            'detail': detail}
+
+
+def _row_issues(df, mask, check, severity, detail):
+    """One issue per flagged ball (detail: format string over the row, '.' in column names -> '_')"""
+    mask = np.asarray(mask, dtype=bool)
+    flagged = int(mask.sum())
+    if not flagged:
+        return []
+    rows = df.loc[mask].head(MAX_ROWS_PER_CHECK).rename(columns=lambda column: column.replace('.', '_'))
+    issues = [_issue(check, severity, detail.format(**row), int(row['innings_number']), int(row['overs']),
+                     int(row['balls'])) for row in rows.to_dict('records')]
+    if flagged > MAX_ROWS_PER_CHECK:
+        issues.append(_issue(check, severity, f"{flagged - MAX_ROWS_PER_CHECK} more balls like these"))
+    return issues
+
+
+def check_runs(df, info):
+    batter, extras, total = (df[column].to_numpy() for column in ('runs.batter', 'runs.extras', 'runs.total'))
+    breakdown = np.nansum([df[column].to_numpy() for column in EXTRAS_COLUMNS], axis=0)
+    return (_row_issues(df, total != batter + extras, 'runs', 'error',
+                        "runs.total {runs_total} != batter {runs_batter} + extras {runs_extras}")
+            + _row_issues(df, breakdown != extras, 'runs', 'error',
+                          "runs.extras {runs_extras} doesn't match the extras breakdown"))
+
+
+def _overs(df):
+    """(innings, over) of every over in ball order, and each ball's over index"""
+    keys = df['innings_number'].to_numpy() * 10_000 + df['overs'].to_numpy()
+    over_keys, ball_over = np.unique(keys, return_inverse=True)
+    return over_keys // 10_000, over_keys % 10_000, ball_over
+
+
+def _innings(df):
+    """Innings numbers in order with their team and super_over flag"""
+    numbers, first = np.unique(df['innings_number'].to_numpy(), return_index=True)
+    return numbers, df['team'].to_numpy()[first], df['super_over'].to_numpy()[first]
+
+
+def check_legal_balls(df, info):
+    balls_per_over = info.get('balls_per_over', 6)
+    legal = (np.nan_to_num(df['extras.wides'].to_numpy()) == 0) & (np.nan_to_num(df['extras.noballs'].to_numpy()) == 0)
+    innings, overs, ball_over = _overs(df)
+    per_over = np.bincount(ball_over, weights=legal, minlength=len(overs)).astype(np.int64)
+    last_over = np.append(innings[1:] != innings[:-1], True)
+    off = per_over - balls_per_over
+    off[last_over & (off < 0)] = 0
+    issues = []
+    for severity, mask in (('error', np.abs(off) > UMPIRE_MISCOUNT), ('warning', np.abs(off) == UMPIRE_MISCOUNT)):
+        for index in np.flatnonzero(mask)[:MAX_ROWS_PER_CHECK]:
+            issues.append(_issue('legal_balls', severity, f"{per_over[index]} legal balls in an over of {balls_per_over}",
+                                 int(innings[index]), int(overs[index])))
+    return issues
+
+
+def check_overs(df, info):
+    limit = info.get('overs')
+    if not limit:
+        return []
+    innings, overs, _ = _overs(df)
+    numbers, _, super_overs = _innings(df)
+    last_over = np.append(innings[1:] != innings[:-1], True)
+    most = dict(zip(innings[last_over].tolist(), overs[last_over].tolist()))
+    return [_issue('overs', 'error', f"{most[number]} overs in an innings of at most {1 if super_over else limit}",
+                   number)
+            for number, super_over in zip(numbers.tolist(), super_overs.tolist())
+            if most[number] > (1 if super_over else limit)]
+
+
+def check_wickets(df, info):
+    rows = df['wicket_count'].to_numpy() > 0
+    if not rows.any():
+        return []
+    wickets = pd.DataFrame({column: df[column].to_numpy()[rows] for column in WICKET_FIELDS})
+    kinds, player_out = wickets['wicket_kind'].to_numpy(), wickets['wicket_player_out'].to_numpy()
+    issues = _row_issues(wickets, pd.isna(kinds), 'wickets', 'error', "wicket without a kind")
+    issues += _row_issues(wickets, (player_out != wickets['batter'].to_numpy())
+                          & (player_out != wickets['non_striker'].to_numpy())
+                          & ~np.isin(kinds, NOT_AT_CREASE_KINDS), 'wickets', 'error',
+                          "{wicket_player_out} is out but isn't batting")
+
+    out = wickets[[kind not in NOT_OUT_KINDS for kind in kinds]]
+    numbers = out['innings_number'].to_numpy()
+    per_innings = np.bincount(numbers, weights=out['wicket_count'].to_numpy()).astype(np.int64)
+    super_overs = dict(zip(*(values.tolist() for values in _innings(df)[::2])))
+    issues += [_issue('wickets', 'error', f"{count} dismissals in one innings", number)
+               for number, count in enumerate(per_innings.tolist())
+               if count > (2 if super_overs.get(number) else 10)]
+    seen = set()
+    repeated = np.zeros(len(out), dtype=bool)
+    for index, key in enumerate(zip(numbers.tolist(), out['wicket_player_out'].tolist())):
+        repeated[index] = key in seen
+        seen.add(key)
+    issues += _row_issues(out, repeated, 'wickets', 'error', "{wicket_player_out} is out a second time in the innings")
+    return issues
+
+
+def check_players(df, info):
+    squads = info.get('players')
+    if not squads:
+        return [_issue('players', 'warning', "info.players is missing, players not checked")]
+    # Each distinct name is looked up once; balls map to their name's code
+    listed = {name for names in squads.values() for name in names}
+    sides = {team: set(names) for team, names in squads.items()}
+    issues = []
+    for column in ('batter', 'non_striker', 'bowler', 'wicket_player_out'):
+        codes, names = pd.factorize(df[column])
+        known = np.array([name in listed for name in names] + [True], dtype=bool)  # code -1 (None) is fine
+        issues += _row_issues(df, ~known[codes], 'players', 'error', "{" + column + "} isn't in info.players")
+
+    # Batters belong to the innings' team, bowlers to the other side
+    innings = df['innings_number'].to_numpy()
+    for number, team, _ in zip(*_innings(df)):
+        rows = innings == number
+        side = sides.get(team, set())
+        for column, detail, wrong in (('batter', "{batter} batting for {team} isn't in its list",
+                                       lambda name: name in listed and name not in side),
+                                      ('bowler', "{bowler} bowling against their own side {team}",
+                                       lambda name: name in side)):
+            codes, names = pd.factorize(df[column].to_numpy()[rows])
+            flagged = np.zeros(len(df), dtype=bool)
+            flagged[rows] = np.array([wrong(name) for name in names] + [False], dtype=bool)[codes]
+            issues += _row_issues(df, flagged, 'players', 'error', detail)
+    return issues
+
+
+def check_teams(df, info):
+    teams = info.get('teams') or []
+    numbers, sides, super_overs = _innings(df)
+    issues = [_issue('teams', 'error', f"{team!r} isn't one of info.teams {teams}", number)
+              for number, team in zip(numbers.tolist(), sides.tolist()) if team not in teams]
+    if info.get('match_type') in LIMITED_OVERS:
+        for super_over in (False, True):
+            batted = sides[super_overs == super_over].tolist()
+            if not super_over and len(batted) > 2:
+                issues.append(_issue('teams', 'error', f"{len(batted)} innings in a limited-overs match"))
+            issues += [_issue('teams', 'error', f"{batted[i]!r} bats twice in a row")
+                       for i in range(0, len(batted) - 1, 2) if batted[i] == batted[i + 1]]
+    return issues
+
+
+CHECKS = (check_runs, check_legal_balls, check_overs, check_wickets, check_players, check_teams)
+
+
+def validate_match(df, info):
+    """Every issue of a flattened match (MATCH_COLUMNS frame) against its 'info' section"""
+    if df.empty:
+        return [_issue('deliveries', 'warning', "no deliveries")]
+    issues = []
+    for check in CHECKS:
+        issues += check(df, info)
+    return issues
+
+
+def validate_frame(df, info, match_id):
+    """Issues of a match (a list); raises MatchValidationError when any of them is an error"""
+    issues = validate_match(df, info)
+    if any(issue['severity'] == 'error' for issue in issues):
+        raise MatchValidationError(match_id, issues)
+    return issues
+
+
+class QuarantineReport:
+    """JSON lines file with one record per rejected file (thread-safe, opened on first use)"""
+
+    def __init__(self, path=QUARANTINE_REPORT):
+        self.path = Path(path)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, match_id, file_path, issues):
+        record = {'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                  'match_id': match_id, 'file_path': str(file_path) if file_path else None,
+                  'errors': sum(issue['severity'] == 'error' for issue in issues), 'issues': issues}
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+            self.count += 1
+        print(f"  🚧 Quarantined {match_id}: {MatchValidationError(match_id, issues)}")
+
+    def summary(self):
+        return f"🚧 Quarantined: {self.count}" + (f" (see {self.path})" if self.count else '')
+
+
+def main(argv=None):
+    """Validate match files without loading them"""
+    import argparse
+    from exploring_json_data_struct import extract_match_data
+
+    parser = argparse.ArgumentParser(description="Check match files the way the ingest does")
+    parser.add_argument('paths', nargs='+', help="Match JSON files or directories")
+    parser.add_argument('--warnings', action='store_true', help="Print warnings too")
+    args = parser.parse_args(argv)
+
+    files = [file for path in map(Path, args.paths)
+             for file in (sorted(path.glob('*.json')) if path.is_dir() else [path])]
+    bad = 0
+    for file in files:
+        match_data = extract_match_data(str(file))
+        issues = validate_match(match_data.convert_match_to_df(), match_data.data.get('info') or {})
+        errors = [issue for issue in issues if issue['severity'] == 'error']
+        bad += bool(errors)
+        for issue in (issues if args.warnings else errors):
+            print(f"{'❌' if issue['severity'] == 'error' else '⚠️ '} {file.stem} {format_issue(issue)}")
+    print(f"{'✅' if not bad else '❌'} {len(files) - bad} of {len(files)} files pass")
+    if bad:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+import argparse
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from database_model import (DatabaseManager, CricketDelivery, Matchup, MatchupBall, Player, bump_ingest_version,
+                            get_database_config, named_deliveries)
+from player_registry import player_aliases
+from query_cache import cached_query
+from scorecards import NOT_BOWLER_WICKETS
+
+
+'''
+Batter-vs-bowler matchup index over the whole corpus.
+- matchups has one row per (batter_id, bowler_id, match_type, phase) with running counters:
+  deliveries, balls faced, runs off the bat, dots, fours, sixes, wides, no-balls, and the
+  batter's dismissals on the bowler's deliveries (wickets credited to the bowler, and by kind).
+- matchup_balls is the posting list of each row: the cricket_deliveries.id of its balls, so the
+  drill-down to the exact deliveries is one index range plus primary-key reads.
+- Phases by over (overs are 1-based): T20 / IT20 powerplay 1-6, middle 7-15, death 16-20;
+  ODI / ODM 1-10, 11-40, 41-50; innings 3+ of those are super overs; other formats are 'all'.
+- add_match_matchups() adds one match in its ingest transaction (NepalODIProcessor and
+  async_ingest, next to the scorecards): one grouped pass over the match's balls, then the
+  counters are incremented in place (INSERT ... ON CONFLICT DO UPDATE) and the postings appended.
+- delete_match_rows() calls retract_match_matchups() before a match's deliveries go, which
+  subtracts exactly the balls found in the posting lists. A replaced match is counted once, and
+  a match loaded with --no-matchups is never subtracted.
+- A lookup by (batter, bowler[, match type[, phase]]) is one probe of uq_matchups_key reading at
+  most a dozen rows, however many matches the pair played; a bowler's dismissals read
+  ix_matchups_bowler.
+- Balls without player IDs (not backfilled yet, see player_registry.py) are left out; run
+  `rebuild` after a backfill.
+
+Use case
+python main.py matchups show "Aasif Sheikh" "Shaheen Shah Afridi" --phase death --balls
+python main.py matchups bowler "S Lamichhane" --match-type ODI
+python main.py matchups rebuild      # index a database loaded before matchups existed
+'''
+
+# Match type -> (last powerplay over, last middle over)
+PHASE_OVERS = {'T20': (6, 15), 'IT20': (6, 15), 'ODI': (10, 40), 'ODM': (10, 40)}
+PHASES = ('powerplay', 'middle', 'death', 'super_over', 'all')
+UNKNOWN_MATCH_TYPE = 'unknown'
+
+KEY_COLUMNS = ['batter_id', 'bowler_id', 'match_type', 'phase']
+COUNTER_COLUMNS = ['deliveries', 'balls', 'runs', 'dots', 'fours', 'sixes', 'wides', 'noballs',
+                   'dismissals', 'bowled', 'caught', 'lbw', 'stumped', 'run_outs', 'other_dismissals']
+KIND_COLUMNS = {'bowled': 'bowled', 'caught': 'caught', 'caught and bowled': 'caught', 'lbw': 'lbw',
+                'stumped': 'stumped', 'run out': 'run_outs'}
+DISMISSAL_COLUMNS = ['bowled', 'caught', 'lbw', 'stumped', 'run_outs', 'other_dismissals']
+
+BALL_FIELDS = ['id', 'match_type', 'innings_number', 'overs', 'batter_id', 'bowler_id', 'player_out_id',
+               'runs_batter', 'runs_total', 'extras_wides', 'extras_noballs', 'wicket_kind']
+DRILL_DOWN_FIELDS = ['match_id', 'innings_number', 'overs', 'balls', 'batter', 'bowler', 'runs_batter',
+                     'runs_extras', 'runs_total', 'is_wicket', 'wicket_kind', 'wicket_player_out']
+
+
+def ball_phases(match_type, innings_number, overs):
+    """Phase name of every ball (arrays of equal length)"""
+    phase = np.full(len(overs), 'all', dtype=object)
+    for name, (powerplay, middle) in PHASE_OVERS.items():
+        rows = match_type == name
+        phase[rows] = np.where(overs[rows] <= powerplay, 'powerplay',
+                               np.where(overs[rows] <= middle, 'middle', 'death'))
+        phase[rows & (innings_number >= 2)] = 'super_over'
+    return phase
+
+
+def ball_counters(df):
+    """Matchup key and counter values of every ball of a BALL_FIELDS frame (balls without player IDs dropped)"""
+    df = df[df['batter_id'].notna() & df['bowler_id'].notna()]
+    number = {col: pd.to_numeric(df[col]).fillna(0).to_numpy() for col in
+              ('runs_batter', 'runs_total', 'extras_wides', 'extras_noballs', 'innings_number', 'overs')}
+    batter = pd.to_numeric(df['batter_id']).to_numpy(dtype=np.int64)
+    player_out = pd.to_numeric(df['player_out_id']).to_numpy(dtype=float)
+    kinds = df['wicket_kind'].fillna('').astype(str).to_numpy()
+    match_type = df['match_type'].fillna(UNKNOWN_MATCH_TYPE).astype(str).to_numpy()
+
+    runs, faced = number['runs_batter'], number['extras_wides'] == 0
+    out = player_out == batter  # The striker was dismissed (NaN never matches)
+    counters = {
+        'batter_id': batter,
+        'bowler_id': pd.to_numeric(df['bowler_id']).to_numpy(dtype=np.int64),
+        'match_type': match_type,
+        'phase': ball_phases(match_type, number['innings_number'], number['overs']),
+        'deliveries': np.ones(len(df), dtype=np.int64),
+        'balls': faced,
+        'runs': runs,
+        'dots': faced & (number['runs_total'] == 0),
+        'fours': runs == 4,
+        'sixes': runs == 6,
+        'wides': number['extras_wides'] > 0,
+        'noballs': number['extras_noballs'] > 0,
+        'dismissals': out & ~np.isin(kinds, NOT_BOWLER_WICKETS),
+        'other_dismissals': out & ~np.isin(kinds, list(KIND_COLUMNS)),
+    }
+    for kind, column in KIND_COLUMNS.items():
+        counters[column] = counters.get(column, False) | (out & (kinds == kind))
+    for column in COUNTER_COLUMNS:
+        counters[column] = counters[column].astype(np.int64)
+    return pd.DataFrame(counters, index=df.index)
+
+
+def _upsert_counters(connection, rows):
+    """INSERT ... ON CONFLICT (key) DO UPDATE adding the counters (PostgreSQL / SQLite)"""
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif connection.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"matchup upserts need PostgreSQL or SQLite, got {connection.dialect.name}")
+    table = Matchup.__table__
+    statement = dialect_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=KEY_COLUMNS,
+        set_={column: table.c[column] + statement.excluded[column] for column in COUNTER_COLUMNS})
+    connection.execute(statement, rows)
+
+
+def _records(frame, columns):
+    """Rows as dicts of Python scalars (no NumPy types reach the driver)"""
+    return frame[columns].astype(object).to_dict('records')
+
+
+def add_match_matchups(session, match_id):
+    """Add one match's balls to the counters and posting lists (inside the caller's transaction)"""
+    session.flush()
+    connection = session.connection()
+    query = (select(*[getattr(CricketDelivery, field) for field in BALL_FIELDS])
+             .where(CricketDelivery.match_id == match_id))
+    df = pd.DataFrame(connection.execute(query).fetchall(), columns=BALL_FIELDS)
+    balls = ball_counters(df)
+    if balls.empty:
+        return 0
+    # Sorted keys, so concurrent writers lock the rows they share in the same order
+    totals = balls.groupby(KEY_COLUMNS, sort=True)[COUNTER_COLUMNS].sum().reset_index()
+    _upsert_counters(connection, _records(totals, KEY_COLUMNS + COUNTER_COLUMNS))
+
+    rows = connection.execute(select(Matchup.id, *[getattr(Matchup, column) for column in KEY_COLUMNS])
+                              .where(Matchup.batter_id.in_([int(i) for i in totals['batter_id'].unique()]),
+                                     Matchup.bowler_id.in_([int(i) for i in totals['bowler_id'].unique()])))
+    matchup_ids = {tuple(key): matchup_id for matchup_id, *key in rows}
+    delivery_ids = df.loc[balls.index, 'id'].to_numpy()
+    postings = [{'matchup_id': matchup_ids[(int(batter), int(bowler), match_type, phase)],
+                 'delivery_id': int(delivery_id)}
+                for batter, bowler, match_type, phase, delivery_id in
+                zip(balls['batter_id'], balls['bowler_id'], balls['match_type'], balls['phase'], delivery_ids)]
+    connection.execute(insert(MatchupBall), postings)
+    return len(totals)
+
+
+def retract_match_matchups(session, match_id):
+    """Subtract the balls of a match found in the posting lists (before its deliveries are deleted)"""
+    connection = session.connection()
+    fields = [getattr(CricketDelivery, field) for field in BALL_FIELDS]
+    rows = connection.execute(select(MatchupBall.matchup_id, *fields)
+                              .join(CricketDelivery, CricketDelivery.id == MatchupBall.delivery_id)
+                              .where(CricketDelivery.match_id == match_id)).fetchall()
+    if not rows:
+        return 0
+    df = pd.DataFrame(rows, columns=['matchup_id'] + BALL_FIELDS)
+    balls = ball_counters(df)
+    balls['matchup_id'] = df.loc[balls.index, 'matchup_id'].to_numpy()
+    totals = balls.groupby('matchup_id', sort=True)[COUNTER_COLUMNS].sum().reset_index()
+
+    table = Matchup.__table__
+    connection.execute(update(table).where(table.c.id == bindparam('key_id'))
+                       .values({column: table.c[column] - bindparam(column) for column in COUNTER_COLUMNS}),
+                       [{'key_id': int(row['matchup_id']), **{column: int(row[column]) for column in COUNTER_COLUMNS}}
+                        for row in totals.to_dict('records')])
+    delivery_ids = select(CricketDelivery.id).where(CricketDelivery.match_id == match_id)
+    connection.execute(delete(MatchupBall).where(MatchupBall.delivery_id.in_(delivery_ids)))
+    connection.execute(delete(Matchup).where(Matchup.id.in_([int(i) for i in totals['matchup_id']]),
+                                             Matchup.deliveries <= 0))
+    return len(totals)
+
+
+def rebuild_matchups(session):
+    """Re-index every match in one transaction; returns the number of matches"""
+    session.execute(delete(MatchupBall))
+    session.execute(delete(Matchup))
+    match_ids = [match_id for (match_id,) in
+                 session.execute(select(CricketDelivery.match_id).distinct().order_by(CricketDelivery.match_id))]
+    for count, match_id in enumerate(match_ids, 1):
+        add_match_matchups(session, match_id)
+        if count % 50 == 0:
+            print(f"  🔗 {count}/{len(match_ids)} matches indexed")
+    bump_ingest_version(session)
+    session.commit()
+    return len(match_ids)
+
+
+# --- Lookups -----------------------------------------------------------------------------
+
+def _filtered(query, match_type, phase):
+    if match_type:
+        query = query.where(Matchup.match_type.in_([match_type] if isinstance(match_type, str) else list(match_type)))
+    if phase:
+        query = query.where(Matchup.phase.in_([phase] if isinstance(phase, str) else list(phase)))
+    return query
+
+
+def _rate(numerator, denominator, scale):
+    return round(scale * numerator / denominator, 2) if denominator else None
+
+
+def _summed(session, query):
+    row = session.execute(query).one()
+    counters = {column: int(value or 0) for column, value in zip(COUNTER_COLUMNS, row)}
+    counters['strike_rate'] = _rate(counters['runs'], counters['balls'], 100)
+    counters['average'] = _rate(counters['runs'], counters['dismissals'], 1)
+    return counters
+
+
+@cached_query
+def get_matchup(session, batter_id, bowler_id, match_type=None, phase=None):
+    """Counters of a batter against a bowler, summed over the match types / phases not given (a dict)"""
+    query = select(*[func.sum(getattr(Matchup, column)) for column in COUNTER_COLUMNS]).where(
+        Matchup.batter_id == batter_id, Matchup.bowler_id == bowler_id)
+    return _summed(session, _filtered(query, match_type, phase))
+
+
+@cached_query
+def get_bowler_dismissals(session, bowler_id, match_type=None, phase=None):
+    """Counters of everything bowled by a bowler, dismissals by kind included (a dict)"""
+    query = select(*[func.sum(getattr(Matchup, column)) for column in COUNTER_COLUMNS]).where(
+        Matchup.bowler_id == bowler_id)
+    return _summed(session, _filtered(query, match_type, phase))
+
+
+@cached_query
+def get_player_matchups(session, batter_id=None, bowler_id=None, match_type=None, phase=None):
+    """
+    One row per opponent of a batter (bowlers faced) or of a bowler (batters bowled to),
+    with the summed counters, most balls first.
+    """
+    if (batter_id is None) == (bowler_id is None):
+        raise ValueError("give exactly one of batter_id and bowler_id")
+    own, other = ((Matchup.batter_id, Matchup.bowler_id) if batter_id is not None
+                  else (Matchup.bowler_id, Matchup.batter_id))
+    query = (select(other, Player.name, *[func.sum(getattr(Matchup, column)) for column in COUNTER_COLUMNS])
+             .join(Player, Player.id == other)
+             .where(own == (batter_id if batter_id is not None else bowler_id))
+             .group_by(other, Player.name))
+    df = pd.DataFrame(session.execute(_filtered(query, match_type, phase)).all(),
+                      columns=['player_id', 'name'] + COUNTER_COLUMNS)
+    df['strike_rate'] = [_rate(runs, balls, 100) for runs, balls in zip(df['runs'], df['balls'])]
+    return df.sort_values(['balls', 'name'], ascending=[False, True], ignore_index=True)
+
+
+def get_matchup_balls(session, batter_id, bowler_id, match_type=None, phase=None):
+    """The deliveries behind a matchup, read through its posting lists, in ball order"""
+    matchup_ids = _filtered(select(Matchup.id).where(Matchup.batter_id == batter_id,
+                                                     Matchup.bowler_id == bowler_id), match_type, phase)
+    deliveries = named_deliveries(['batter', 'bowler', 'wicket_player_out']).subquery()
+    query = (select(*(deliveries.c[field] for field in DRILL_DOWN_FIELDS))
+             .join(MatchupBall, MatchupBall.delivery_id == deliveries.c.id)
+             .where(MatchupBall.matchup_id.in_(matchup_ids))
+             .order_by(deliveries.c.match_id, deliveries.c.innings_number,
+                       deliveries.c.overs, deliveries.c.balls))
+    return pd.DataFrame(session.execute(query).all(), columns=DRILL_DOWN_FIELDS)
+
+
+def resolve_player(session, name):
+    """players.id of a name (or of a numeric players.id); exits when unknown or ambiguous"""
+    if name.isdigit():
+        return int(name)
+    players = player_aliases(session, name).drop_duplicates('player_id')
+    if players.empty:
+        raise SystemExit(f"❌ No player named {name}")
+    if len(players) > 1:
+        candidates = ', '.join(f"{row.player_id} ({row.registry_id})" for row in players.itertuples())
+        raise SystemExit(f"❌ Several players are named {name}: {candidates}; pass the players.id instead")
+    return int(players['player_id'].iloc[0])
+
+
+def format_counters(counters):
+    dismissals = ', '.join(f"{column.replace('_', ' ')} {counters[column]}"
+                           for column in DISMISSAL_COLUMNS if counters[column])
+    return (f"{counters['runs']} runs off {counters['balls']} balls (SR {counters['strike_rate']}), "
+            f"{counters['dots']} dots, {counters['fours']}x4, {counters['sixes']}x6, "
+            f"{counters['dismissals']} dismissals (avg {counters['average']})"
+            + (f"; out: {dismissals}" if dismissals else ''))
+
+
+def main(argv=None):
+    """Look up or rebuild the matchup index"""
+    parser = argparse.ArgumentParser(description="Batter-vs-bowler matchup index")
+    parser.add_argument('--database-url', default=None, help="Defaults to the DB_* environment variables")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('rebuild', help="Index every loaded match again")
+    show_parser = subparsers.add_parser('show', help="A batter against a bowler")
+    show_parser.add_argument('batter', help="Name (any alias) or players.id")
+    show_parser.add_argument('bowler', help="Name (any alias) or players.id")
+    show_parser.add_argument('--balls', action='store_true', help="List the deliveries too")
+    batter_parser = subparsers.add_parser('batter', help="Every bowler a batter faced")
+    batter_parser.add_argument('player')
+    bowler_parser = subparsers.add_parser('bowler', help="Dismissals by kind and every batter a bowler bowled to")
+    bowler_parser.add_argument('player')
+    for sub_parser in (show_parser, batter_parser, bowler_parser):
+        sub_parser.add_argument('--match-type', action='append', default=None, help="e.g. ODI (repeatable)")
+        sub_parser.add_argument('--phase', action='append', choices=PHASES, default=None, help="Repeatable")
+    for sub_parser in (batter_parser, bowler_parser):
+        sub_parser.add_argument('--limit', type=int, default=15)
+    args = parser.parse_args(argv)
+
+    db = DatabaseManager(args.database_url or get_database_config(),
+                         profile='bulk-ingest' if args.command == 'rebuild' else 'interactive-analytics')
+    if not db.connect():
+        return
+    session = db.get_session()
+    try:
+        if args.command == 'rebuild':
+            db.create_schema()
+            print(f"🔗 Indexed the matchups of {rebuild_matchups(session)} matches")
+        elif args.command == 'show':
+            batter_id, bowler_id = resolve_player(session, args.batter), resolve_player(session, args.bowler)
+            counters = get_matchup(session, batter_id, bowler_id, args.match_type, args.phase)
+            print(f"🏏 {args.batter} vs {args.bowler}: {format_counters(counters)}")
+            if args.balls:
+                balls = get_matchup_balls(session, batter_id, bowler_id, args.match_type, args.phase)
+                print(balls.to_string(index=False) if not balls.empty else "No deliveries")
+        else:
+            player_id = resolve_player(session, args.player)
+            if args.command == 'bowler':
+                counters = get_bowler_dismissals(session, player_id, args.match_type, args.phase)
+                print(f"🎯 {args.player}: {format_counters(counters)}")
+                rows = get_player_matchups(session, bowler_id=player_id, match_type=args.match_type, phase=args.phase)
+            else:
+                rows = get_player_matchups(session, batter_id=player_id, match_type=args.match_type, phase=args.phase)
+            fields = ['name', 'balls', 'runs', 'strike_rate', 'dots', 'fours', 'sixes', 'dismissals']
+            print(rows[fields].head(args.limit).to_string(index=False))
+    finally:
+        session.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import argparse
+import threading
+import pandas as pd
+from sqlalchemy import and_, bindparam, column, func, inspect, or_, select, table as sql_table, update
+from database_model import PLAYER_COLUMNS, CricketDelivery, IngestManifest, Player, PlayerAlias
+from match_stream import read_match_header
+
+
+'''
+Player dimension keyed on Cricsheet registry IDs.
+- players has one row per info.registry.people ID; player_aliases keeps every name that ID
+  was seen under, so a renamed player is still one player.
+- cricket_deliveries.batter_id / non_striker_id / bowler_id / player_out_id / fielder_id point
+  at players.id (foreign keys; schema_migrations.py adds them to older databases). The player
+  indexes are on the integer IDs.
+- The deliveries no longer store player names: readers join players for them
+  (database_model.named_deliveries(), or the cricket_deliveries_named view in SQL), so a
+  player reads under players.name in every match. The ingest resolves every name of a
+  match before writing it, so no delivery is left without its IDs.
+- Databases loaded before the IDs still have the legacy name columns (batter, non_striker,
+  bowler, wicket_player_out, wicket_fielder): `backfill` fills the IDs from them, `check`
+  counts what is left, and schema_migrations.py drops the columns once nothing is.
+- PlayerRegistry holds registry ID -> players.id and the known aliases for the whole run
+  (read once, like the ingest manifest), so resolving a known player is a dict hit.
+- Unknown players are inserted in the match's own transaction, sorted by registry ID and with
+  ON CONFLICT DO NOTHING, so concurrent writers neither duplicate nor deadlock on them.
+  They join the in-memory map only after that transaction commits.
+- Officials are in the registry too and are left out; a file without a registry falls back
+  to 'name:<name>' keys for its players.
+
+Use case
+python code/player_registry.py backfill      # fill the ID columns of deliveries loaded before them
+python code/player_registry.py show "RK Paudel"
+python code/player_registry.py check         # legacy names without a player ID, per column
+'''
+
+PLAYER_NAME_COLUMNS = list(PLAYER_COLUMNS)
+PLAYER_ID_COLUMNS = list(PLAYER_COLUMNS.values())
+
+
+def match_people(info, names=()):
+    """
+    name -> registry ID for everyone in a match file except the officials; names (e.g. from
+    delivery_names) that are in neither the registry nor the squads get 'name:<name>' keys
+    """
+    people = (info.get('registry') or {}).get('people') or {}
+    players = {name for team in (info.get('players') or {}).values() for name in team}
+    officials = {name for names in (info.get('officials') or {}).values() for name in names}
+    resolved = {name: registry_id for name, registry_id in people.items()
+                if name in players or name not in officials}
+    for name in (players | set(names)) - resolved.keys():
+        resolved[name] = f"name:{name}"
+    return resolved
+
+
+def delivery_names(table):
+    """Every player name in a table-shaped deliveries DataFrame"""
+    return {name for name in pd.unique(table[PLAYER_NAME_COLUMNS].to_numpy().ravel()) if isinstance(name, str)}
+
+
+def _insert_ignore(connection, table, rows, index_elements):
+    """INSERT ... ON CONFLICT DO NOTHING (PostgreSQL / SQLite)"""
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif connection.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"player inserts need PostgreSQL or SQLite, got {connection.dialect.name}")
+    connection.execute(insert(table).on_conflict_do_nothing(index_elements=index_elements), rows)
+
+
+class PlayerRegistry:
+    """In-memory registry ID -> players.id map and known aliases for one run (thread-safe)"""
+
+    def __init__(self, player_ids, aliases):
+        self.player_ids = player_ids  # registry_id -> players.id
+        self.aliases = aliases        # {(players.id, name)} already in player_aliases
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, session):
+        """Read all players and aliases (two queries per run)"""
+        player_ids = {registry_id: player_id
+                      for player_id, registry_id in session.execute(select(Player.id, Player.registry_id))}
+        aliases = set(session.execute(select(PlayerAlias.player_id, PlayerAlias.name)).tuples())
+        return cls(player_ids, aliases)
+
+    def resolve(self, session, people):
+        """
+        name -> players.id for a match (people from match_people), inserting unknown players and
+        names inside the session's transaction. Returns (ids, pending); hand pending to
+        remember() once that transaction has committed.
+        """
+        with self._lock:
+            ids = {name: self.player_ids.get(registry_id) for name, registry_id in people.items()}
+            known_aliases = self.aliases
+        missing = sorted({people[name] for name, player_id in ids.items() if player_id is None})
+
+        new_players = {}
+        if missing:
+            connection = session.connection()
+            first_name = {}
+            for name, registry_id in sorted(people.items()):
+                first_name.setdefault(registry_id, name)
+            _insert_ignore(connection, Player.__table__,
+                           [{'registry_id': registry_id, 'name': first_name[registry_id]} for registry_id in missing],
+                           ['registry_id'])
+            rows = connection.execute(select(Player.id, Player.registry_id).where(Player.registry_id.in_(missing)))
+            new_players = {registry_id: player_id for player_id, registry_id in rows}
+            for name, player_id in ids.items():
+                if player_id is None:
+                    ids[name] = new_players[people[name]]
+
+        new_aliases = sorted((player_id, name) for name, player_id in ids.items()
+                             if (player_id, name) not in known_aliases)
+        if new_aliases:
+            _insert_ignore(session.connection(), PlayerAlias.__table__,
+                           [{'player_id': player_id, 'name': name} for player_id, name in new_aliases],
+                           ['player_id', 'name'])
+        return ids, (new_players, new_aliases)
+
+    def remember(self, pending):
+        """Add the players and aliases of a committed transaction to the in-memory map"""
+        if not pending:
+            return
+        new_players, new_aliases = pending
+        with self._lock:
+            self.player_ids.update(new_players)
+            self.aliases.update(new_aliases)
+
+
+def assign_player_ids(table, ids):
+    """Fill the *_id columns of a table-shaped deliveries DataFrame from a name -> players.id map"""
+    for name_column, id_column in PLAYER_COLUMNS.items():
+        table[id_column] = table[name_column].map(ids).astype('Int64')
+    return table
+
+
+def legacy_name_columns(connection):
+    """Player name columns cricket_deliveries still has from before they were dropped (none once migrated)"""
+    existing = {column['name'] for column in inspect(connection).get_columns(CricketDelivery.__tablename__)}
+    return [name for name in PLAYER_NAME_COLUMNS if name in existing]
+
+
+def _legacy_deliveries(names):
+    """cricket_deliveries with its legacy name columns (they are not on the model any more)"""
+    return sql_table(CricketDelivery.__tablename__, column('match_id'),
+                     *(column(name) for name in names), *(column(PLAYER_COLUMNS[name]) for name in names))
+
+
+def backfill_player_ids(session, all_rows=False):
+    """
+    Resolve the players of every loaded match with a name but no player ID (or of every
+    match) from the file headers and the legacy name columns, committing per match.
+    Returns the number of matches (None when the name columns are already dropped).
+    """
+    names = legacy_name_columns(session.connection())
+    if not names:
+        return None
+    registry = PlayerRegistry.load(session)
+    table = _legacy_deliveries(names)
+    pending = select(table.c.match_id).distinct()
+    if not all_rows:
+        pending = pending.where(or_(*(and_(table.c[name].is_not(None), table.c[PLAYER_COLUMNS[name]].is_(None))
+                                      for name in names)))
+    match_ids = [match_id for (match_id,) in session.execute(pending)]
+    paths = dict(session.execute(select(IngestManifest.match_id, IngestManifest.file_path)
+                                 .where(IngestManifest.match_id.in_(match_ids))).all()) if match_ids else {}
+
+    statements = {PLAYER_COLUMNS[name]: update(table)
+                  .where(table.c.match_id == bindparam('key_match_id'), table.c[name] == bindparam('key_name'))
+                  .values({PLAYER_COLUMNS[name]: bindparam('key_player_id')})
+                  for name in names}
+
+    matches = 0
+    for match_id in match_ids:
+        try:
+            _, info = read_match_header(paths[match_id])
+            seen = {value for name in names for (value,) in session.execute(
+                        select(table.c[name]).distinct().where(table.c.match_id == match_id)) if value is not None}
+            ids, new = registry.resolve(session, match_people(info, seen))
+            params = [{'key_match_id': match_id, 'key_name': name, 'key_player_id': player_id}
+                      for name, player_id in ids.items()]
+            for statement in statements.values():
+                session.execute(statement, params)
+            session.commit()
+            registry.remember(new)
+            matches += 1
+        except KeyError:
+            print(f"  ⚠️  No source file recorded for {match_id}, skipping")
+        except Exception as e:
+            session.rollback()
+            print(f"  ❌ Error resolving players of {match_id}: {e}")
+    return matches
+
+
+def unresolved_names(connection):
+    """Deliveries with a legacy player name but no player ID, per name column ({} once they are dropped)"""
+    names = legacy_name_columns(connection)
+    table = _legacy_deliveries(names)
+    return {name: connection.execute(select(func.count()).select_from(table).where(
+                table.c[name].is_not(None), table.c[PLAYER_COLUMNS[name]].is_(None))).scalar()
+            for name in names}
+
+
+def player_aliases(session, name):
+    """Players known under a name, with every alias of each"""
+    player_ids = select(PlayerAlias.player_id).where(PlayerAlias.name == name)
+    rows = session.execute(select(Player.id, Player.registry_id, Player.name, PlayerAlias.name)
+                           .join(PlayerAlias, PlayerAlias.player_id == Player.id)
+                           .where(Player.id.in_(player_ids)).order_by(Player.id, PlayerAlias.name)).all()
+    return pd.DataFrame(rows, columns=['player_id', 'registry_id', 'name', 'alias'])
+
+
+def main(argv=None):
+    """Backfill or look up the players dimension"""
+    from database_model import DatabaseManager, get_database_config
+
+    parser = argparse.ArgumentParser(description="Players dimension keyed on Cricsheet registry IDs")
+    parser.add_argument('--database-url', default=None, help="Defaults to the DB_* environment variables")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    backfill_parser = subparsers.add_parser('backfill', help="Fill the player ID columns of existing deliveries")
+    backfill_parser.add_argument('--all', action='store_true', help="Resolve every match, not only unresolved ones")
+    show_parser = subparsers.add_parser('show', help="Registry ID and aliases of a player")
+    show_parser.add_argument('name')
+    subparsers.add_parser('check', help="Count legacy player names without a player ID (before migrate drops them)")
+    args = parser.parse_args(argv)
+
+    db = DatabaseManager(args.database_url or get_database_config(),
+                         profile='bulk-ingest' if args.command == 'backfill' else 'interactive-analytics')
+    if not db.connect():
+        return
+    session = db.get_session()
+    try:
+        if args.command == 'backfill':
+            matches = backfill_player_ids(session, all_rows=args.all)
+            if matches is None:
+                print("✅ The player name columns are dropped: the ingest writes the player IDs")
+            else:
+                print(f"👤 Resolved players for {matches} matches")
+        elif args.command == 'check':
+            unresolved = unresolved_names(session.connection())
+            if not unresolved:
+                print("✅ The player name columns are dropped: every delivery has its player IDs")
+            for name_column, rows in unresolved.items():
+                print(f"  {'✅' if rows == 0 else '⚠️ '} {name_column}: {rows} rows without {PLAYER_COLUMNS[name_column]}")
+        else:
+            aliases = player_aliases(session, args.name)
+            print(aliases.to_string(index=False) if not aliases.empty else f"No player named {args.name}")
+    finally:
+        session.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
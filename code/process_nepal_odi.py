@@ -1,26 +1,204 @@
 
+import argparse
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import pandas as pd
 from pathlib import Path
-import json
-import glob
 from exploring_json_data_struct import extract_match_data
-from database_model import DatabaseManager, CricketDelivery, CricketMatch, get_database_config
+from database_model import (DatabaseManager, CricketDelivery, CricketMatch, ENGINE_PROFILES, bump_ingest_version,
+                            get_database_config)
+from bulk_loader import batting_sides, deliveries_frame_to_rows, bulk_write_deliveries, table_records, ThroughputReport
+from ingest_manifest import (ManifestIndex, delete_match_rows, record_manifest, touch_manifest,
+                             SKIP, TOUCH, REPLACE)
+from match_validation import MatchValidationError, QuarantineReport, QUARANTINE_REPORT, validate_frame
+from matchups import add_match_matchups
+from scorecards import refresh_match_scorecards
+from ingest_metrics import IngestMetrics, NULL_METRICS, create_metrics
+from match_state import STATE_COLUMNS, STATE_FLOAT_COLUMNS
+from player_registry import PLAYER_COLUMNS, PlayerRegistry, assign_player_ids, delivery_names, match_people
+from match_catalog import select_match_files
+from corpus import unique_match_files
+from sqlalchemy.exc import OperationalError
 
 PROJECT_ROOT = Path(__file__).parent.parent
 CODE_DIR = PROJECT_ROOT / 'code'
 DATA_DIR = PROJECT_ROOT / 'data'
 
+WRITE_MODES = ('orm', 'bulk')
+RETRY_BACKOFF = 0.5  # Seconds before the first retry of a match transaction, doubled each time
+
+
+def match_info_record(info, match_id):
+    """Return the cricket_matches columns for the 'info' section of a match file"""
+    # Extract team names
+    teams = info.get('teams', [])
+    team1 = teams[0] if len(teams) > 0 else None
+    team2 = teams[1] if len(teams) > 1 else None
+    
+    # Extract toss info
+    toss = info.get('toss', {})
+    toss_winner = toss.get('winner')
+    toss_decision = toss.get('decision')
+    
+    # Extract outcome
+    outcome = info.get('outcome', {})
+    winner = outcome.get('winner')
+    result = outcome.get('result')
+    
+    # Extract venue info
+    venue = info.get('venue')
+    city = info.get('city')
+    
+    # Extract dates
+    dates = info.get('dates', [])
+    match_date = dates[0] if dates else None
+    
+    # Extract player of match
+    player_of_match = None
+    if 'player_of_match' in info:
+        pom = info['player_of_match']
+        player_of_match = pom[0] if isinstance(pom, list) and pom else pom
+    
+    return {
+        'match_id': match_id,
+        'match_type': info.get('match_type'),
+        'match_type_number': info.get('match_type_number'),
+        'gender': info.get('gender'),
+        'venue': venue,
+        'city': city,
+        'dates': str(match_date),
+        'team1': team1,
+        'team2': team2,
+        'toss_winner': toss_winner,
+        'toss_decision': toss_decision,
+        'winner': winner,
+        'result_type': result,
+        'player_of_match': player_of_match,
+    }
+
+
+def flatten_match_frame(match_data, match_id, validate=False):
+    """Flattened frame of a loaded match; with validate=True raises MatchValidationError for a bad file"""
+    df = match_data.convert_match_to_df(with_state=True)
+    if validate:
+        with match_data.metrics.stage('validate'):
+            validate_frame(df, match_data.data['info'], match_id)
+    return df
+
+
+def flatten_match_deliveries(match_data, match_id, validate=False, df=None):
+    """Flatten every innings of a loaded match into one table-shaped DataFrame"""
+    if df is None:
+        df = flatten_match_frame(match_data, match_id, validate)
+    info = match_data.data['info']
+    with match_data.metrics.stage('build'):
+        return deliveries_frame_to_rows(df, match_id, match_type=info.get('match_type'), teams=info.get('teams'))
+
+
+def flatten_match_batch(file_paths, streaming=False, validate=False):
+    """
+    Worker task for the process pool: parse, validate and flatten a batch of match files.
+    With streaming=True each file is read incrementally (see match_stream.py).
+    
+    Returns a list of (match_id, meta, info, deliveries_table, error, stages) tuples, one per file,
+    where stages holds the file's read / decode / flatten / validate / build seconds and bytes_read.
+    Errors are returned instead of raised so one bad file doesn't sink its batch: a
+    MatchValidationError for a file that failed validation, the message for anything else.
+    """
+    results = []
+    metrics = IngestMetrics()
+    for file_path in file_paths:
+        match_id = Path(file_path).stem
+        with metrics.span(match_id) as span:
+            try:
+                match_data = extract_match_data(str(file_path), streaming=streaming, metrics=metrics)
+                table = flatten_match_deliveries(match_data, match_id, validate)
+                result = (match_id, match_data.data.get('meta'), match_data.data['info'], table, None)
+            except MatchValidationError as e:
+                result = (match_id, None, None, None, e)
+            except Exception as e:
+                result = (match_id, None, None, None, str(e))
+        results.append(result + ({**span.stages, 'bytes_read': span.bytes_read},))
+    return results
+
+
 class NepalODIProcessor:
-    def __init__(self, database_url=None):
-        self.data_dir = DATA_DIR / "Nepal" / "ODI"
+    def __init__(self, database_url=None, write_mode='orm', data_dir=None,
+                 workers=1, batch_size=8, writers=1, streaming=False, scorecards=True,
+                 matchups=True, profile='bulk-ingest', retries=2, metrics=None, match_filter=None,
+                 validate=True, quarantine=None):
+        """
+        Args:
+            database_url: Database connection string (defaults to get_database_config())
+            write_mode: 'orm' (one CricketDelivery object per ball) or
+                        'bulk' (COPY FROM STDIN on PostgreSQL, executemany elsewhere)
+            data_dir: Directory (or list of directories) with match JSON files
+                      (defaults to data/Nepal/ODI)
+            workers: Number of worker processes that parse and flatten files.
+                     1 keeps the original sequential loop.
+            batch_size: Number of files handed to a worker per task
+            writers: Number of writer threads committing flattened matches (parallel mode only)
+            streaming: Read match files incrementally instead of json.load-ing them whole
+            scorecards: Refresh the match's scorecard tables in the same transaction
+            matchups: Add the match to the batter-vs-bowler matchup index in the same transaction
+            profile: Engine profile from database_model.ENGINE_PROFILES
+            retries: Times a match transaction is retried after a transient database error
+                     (lock timeout, deadlock, dropped connection)
+            metrics: IngestMetrics for per-stage timings (see ingest_metrics.py); off when None
+            match_filter: Catalog filters (match_type, team, since, ...) selecting the files to load,
+                          see match_catalog.query_catalog; all files when None
+            validate: Check every flattened match before any database work (match_validation.py);
+                      files with errors go to the quarantine report instead of the database
+            quarantine: QuarantineReport for rejected files (defaults to data/quarantine/quarantine.jsonl)
+        """
+        if write_mode not in WRITE_MODES:
+            raise ValueError(f"write_mode must be one of {WRITE_MODES}, got {write_mode!r}")
+        if workers < 1 or batch_size < 1 or writers < 1:
+            raise ValueError("workers, batch_size and writers must all be at least 1")
+        if data_dir is None:
+            self.data_dirs = [DATA_DIR / "Nepal" / "ODI"]
+        elif isinstance(data_dir, (list, tuple)):
+            self.data_dirs = [Path(d) for d in data_dir]
+        else:
+            self.data_dirs = [Path(data_dir)]
+        self.data_dir = self.data_dirs[0]
         self.database_url = database_url or get_database_config()
-        self.db_manager = DatabaseManager(self.database_url)
+        self.db_manager = DatabaseManager(self.database_url, profile=profile)
+        self.write_mode = write_mode
+        self.workers = workers
+        self.batch_size = batch_size
+        self.writers = writers
+        self.streaming = streaming
+        self.scorecards = scorecards
+        self.matchups = matchups
+        self.retries = retries
+        self.metrics = metrics or NULL_METRICS
+        self.match_filter = match_filter
+        self.validate = validate
+        self.quarantine = quarantine or QuarantineReport()
+        self.throughput = ThroughputReport(write_mode)
+        self.manifest = None
+        self.players = None
+        self._throughput_lock = threading.Lock()
         
     def get_all_odi_files(self):
-        """Get all JSON files in Nepal/ODI directory"""
-        json_files = list(self.data_dir.glob("*.json"))
-        print(f"Found {len(json_files)} ODI match files")
-        return json_files
+        """Get all JSON files in the configured data directories (only those passing match_filter)"""
+        if self.match_filter:
+            json_files = select_match_files(self.data_dirs, **self.match_filter)
+        else:
+            json_files = []
+            for data_dir in self.data_dirs:
+                json_files.extend(sorted(data_dir.glob("*.json")))
+        # A match in several directories is loaded from the first one only, so its manifest
+        # path stays put from run to run (otherwise every copy is re-hashed and touched)
+        unique_files = unique_match_files(json_files, self.data_dirs)
+        duplicates = len(json_files) - len(unique_files)
+        print(f"Found {len(unique_files)} match files"
+              + (f" matching {self.match_filter}" if self.match_filter else '')
+              + (f" ({duplicates} copies in later directories ignored)" if duplicates else ''))
+        return unique_files
     
     def extract_match_id(self, file_path):
         """Extract match ID from filename"""
@@ -28,136 +206,365 @@ class NepalODIProcessor:
     
     def process_match_info(self, match_data, match_id):
         """Extract and return match information"""
+        return self.build_match_info(match_data.data['info'], match_id)
+    
+    def build_match_info(self, info, match_id):
+        """Build a CricketMatch from the 'info' section of a match file"""
         try:
-            info = match_data.data['info']
-            
-            # Extract team names
-            teams = info.get('teams', [])
-            team1 = teams[0] if len(teams) > 0 else None
-            team2 = teams[1] if len(teams) > 1 else None
-            
-            # Extract toss info
-            toss = info.get('toss', {})
-            toss_winner = toss.get('winner')
-            toss_decision = toss.get('decision')
-            
-            # Extract outcome
-            outcome = info.get('outcome', {})
-            winner = outcome.get('winner')
-            result = outcome.get('result')
-            
-            # Extract venue info
-            venue = info.get('venue')
-            city = info.get('city')
-            
-            # Extract dates
-            dates = info.get('dates', [])
-            match_date = dates[0] if dates else None
-            
-            # Extract player of match
-            player_of_match = None
-            if 'player_of_match' in info:
-                pom = info['player_of_match']
-                player_of_match = pom[0] if isinstance(pom, list) and pom else pom
-            
-            match_info = CricketMatch(
-                match_id=match_id,
-                match_type=info.get('match_type'),
-                match_type_number=info.get('match_type_number'),
-                gender=info.get('gender'),
-                venue=venue,
-                city=city,
-                dates=str(match_date),
-                team1=team1,
-                team2=team2,
-                toss_winner=toss_winner,
-                toss_decision=toss_decision,
-                winner=winner,
-                result_type=result,
-                player_of_match=player_of_match
-            )
-            
-            return match_info
+            return CricketMatch(**match_info_record(info, match_id))
             
         except Exception as e:
             print(f"Error processing match info for {match_id}: {e}")
             return None
     
-    def process_deliveries(self, match_data, match_id):
-        """Process all deliveries for both innings"""
+    def process_deliveries(self, match_data, match_id, player_ids=None, df=None):
+        """
+        Process all deliveries for both innings (player_ids: name -> players.id; df: the match
+        already flattened). Errors propagate, so a match is never committed with part of its balls.
+        """
+        player_ids = player_ids or {}
         all_deliveries = []
         
-        try:
-            # Process both innings
-            for innings_num in range(len(match_data.data['innings'])):
-                df = match_data.convert_json_to_df(innings_num)
-                
-                # Convert DataFrame rows to CricketDelivery objects
-                for _, row in df.iterrows():
-                    delivery = CricketDelivery(
-                        match_id=match_id,
-                        innings_number=innings_num,
-                        overs=int(row['overs']),
-                        balls=int(row['balls']),
-                        batter=row['batter'],
-                        non_striker=row['non_striker'],
-                        bowler=row['bowler'],
-                        runs_batter=int(row.get('runs.batter', 0) or 0),
-                        runs_extras=int(row.get('runs.extras', 0) or 0),
-                        runs_total=int(row.get('runs.total', 0) or 0),
-                        extras_wides=int(row['extras.wides']) if pd.notna(row['extras.wides']) else None,
-                        extras_legbyes=int(row['extras.legbyes']) if pd.notna(row['extras.legbyes']) else None,
-                        extras_noballs=int(row['extras.noballs']) if pd.notna(row['extras.noballs']) else None,
-                        description=row.get('description', ''),
-                        ball_areas=row.get('ball_areas', ''),
-                        is_wicket=int(row.get('is_wicket', 0)),
-                        wicket_player_out=row['wicket_player_out'] if pd.notna(row['wicket_player_out']) else None,
-                        wicket_kind=row['wicket_kind'] if pd.notna(row['wicket_kind']) else None,
-                        wicket_fielder=row['wicket_fielder'] if pd.notna(row['wicket_fielder']) else None,
-                        is_drs=row.get('is_drs', ''),
-                        is_umpires_call=row.get('is_umpires_call', '')
-                    )
-                    all_deliveries.append(delivery)
-                    
-        except Exception as e:
-            print(f"Error processing deliveries for {match_id}: {e}")
-            
+        # Flatten both innings in one pass
+        if df is None:
+            df = flatten_match_frame(match_data, match_id)
+        match_type = match_data.data['info'].get('match_type')
+        sides = batting_sides(df['team'], match_data.data['info'].get('teams'))
+        
+        # Convert DataFrame rows to CricketDelivery objects
+        with self.metrics.stage('build'):
+            for side, (_, row) in zip(sides, df.iterrows()):
+                delivery = CricketDelivery(
+                    match_id=match_id,
+                    match_type=match_type,
+                    innings_number=int(row['innings_number']),
+                    batting_side=None if pd.isna(side) else int(side),
+                    overs=int(row['overs']),
+                    balls=int(row['balls']),
+                    runs_batter=int(row.get('runs.batter', 0) or 0),
+                    runs_extras=int(row.get('runs.extras', 0) or 0),
+                    runs_total=int(row.get('runs.total', 0) or 0),
+                    extras_wides=int(row['extras.wides']) if pd.notna(row['extras.wides']) else None,
+                    extras_legbyes=int(row['extras.legbyes']) if pd.notna(row['extras.legbyes']) else None,
+                    extras_noballs=int(row['extras.noballs']) if pd.notna(row['extras.noballs']) else None,
+                    extras_byes=int(row['extras.byes']) if pd.notna(row['extras.byes']) else None,
+                    description=row.get('description', ''),
+                    ball_areas=row.get('ball_areas', ''),
+                    is_wicket=int(row.get('is_wicket', 0)),
+                    wicket_kind=row['wicket_kind'] if pd.notna(row['wicket_kind']) else None,
+                    is_drs=row.get('is_drs', ''),
+                    is_umpires_call=row.get('is_umpires_call', ''),
+                    **{col: (None if pd.isna(row[col]) else
+                             float(row[col]) if col in STATE_FLOAT_COLUMNS else int(row[col]))
+                       for col in STATE_COLUMNS},
+                    **{id_col: player_ids.get(row[name_col]) for name_col, id_col in PLAYER_COLUMNS.items()}
+                )
+                all_deliveries.append(delivery)
+        
         return all_deliveries
     
+    def process_deliveries_bulk(self, match_data, match_id, session, player_ids=None, df=None):
+        """
+        Write all deliveries for both innings through the bulk loader, inside the session's transaction.
+        Returns (rows, seconds spent inserting).
+        """
+        table = flatten_match_deliveries(match_data, match_id, df=df)
+        assign_player_ids(table, player_ids or {})
+        return self.write_deliveries(session, table=table)
+    
+    def write_deliveries(self, session, table=None, deliveries=None):
+        """
+        Insert one match's deliveries, from a table-shaped frame (bulk) or CricketDelivery
+        objects (ORM), and return (rows, seconds). Only the insert is timed: the match row
+        must already be flushed, so both modes time the same work.
+        """
+        started = time.perf_counter()
+        with self.metrics.stage('write'):
+            if table is not None:
+                rows = bulk_write_deliveries(session.connection(), table)
+            else:
+                session.add_all(deliveries)
+                session.flush()
+                rows = len(deliveries)
+        return rows, time.perf_counter() - started
+    
+    def commit_timed(self, session, match_id, state, meta, new_players):
+        """commit_match, returning its seconds (scorecards, matchups, manifest and COMMIT)"""
+        started = time.perf_counter()
+        self.commit_match(session, match_id, state, meta, new_players)
+        return time.perf_counter() - started
+    
+    def get_manifest(self, session):
+        """Ingestion manifest for this run, read from the database once"""
+        if self.manifest is None:
+            self.manifest = ManifestIndex.load(session)
+        return self.manifest
+    
+    def resolve_players(self, session, info, names=()):
+        """
+        name -> players.id for a match (names: those in its deliveries, see delivery_names);
+        the registry is read once per run, then it's dict lookups
+        """
+        if self.players is None:
+            self.players = PlayerRegistry.load(session)
+        return self.players.resolve(session, match_people(info, names))
+    
+    def handle_unchanged(self, session, match_id, action, state):
+        """Skip an unchanged file, refreshing its manifest row if only path/mtime moved"""
+        if action == TOUCH:
+            touch_manifest(session, state)
+            session.commit()
+            self.manifest.mark_loaded(state, self.manifest.previous_revision(match_id))
+        self.metrics.mark('skipped')
+        print(f"  ⏭️  Match {match_id} unchanged, skipping...")
+    
+    def announce_replace(self, match_id, meta):
+        previous = self.manifest.previous_revision(match_id)
+        current = (meta or {}).get('revision')
+        print(f"  🔄 Match {match_id} changed (revision {previous} -> {current}), replacing rows...")
+    
+    def run_match_transaction(self, session, match_id, load, file_path=None):
+        """
+        Run load() (which commits one match) and return its result.
+        Transient database errors roll back and retry the whole match; anything else
+        rolls back and fails it. A match that failed validation (before any database work)
+        is quarantined. Returns False when the match failed or was quarantined.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                return load()
+            except MatchValidationError as e:
+                self.quarantine_match(e, file_path)
+                return False
+            except OperationalError as e:
+                session.rollback()
+                self.metrics.count('rollbacks')
+                if attempt < self.retries:
+                    self.metrics.count('retries')
+                    print(f"  🔁 Retrying {match_id} after a database error: {e.orig}")
+                    time.sleep(RETRY_BACKOFF * 2 ** attempt)
+                    continue
+                print(f"  ❌ Error processing {match_id}: {e}")
+            except Exception as e:
+                print(f"  ❌ Error processing {match_id}: {e}")
+                session.rollback()
+                self.metrics.count('rollbacks')
+            break
+        self.metrics.mark('failed')
+        return False
+    
+    def quarantine_match(self, error, file_path):
+        """Report a file that failed validation instead of loading it"""
+        self.quarantine.add(error.match_id, file_path, error.issues)
+        self.metrics.mark('quarantined')
+    
+    def commit_match(self, session, match_id, state, meta, new_players=None):
+        """Scorecards, matchups, manifest row and COMMIT for the match in the session"""
+        if self.scorecards:
+            with self.metrics.stage('scorecards'):
+                refresh_match_scorecards(session, match_id)
+        if self.matchups:
+            with self.metrics.stage('matchups'):
+                add_match_matchups(session, match_id)
+        record_manifest(session, state, meta)
+        bump_ingest_version(session)
+        with self.metrics.stage('commit'):
+            session.commit()
+        self.manifest.mark_loaded(state, (meta or {}).get('revision'))
+        self.players.remember(new_players)
+    
     def process_single_match(self, file_path, session):
-        """Process a single match file"""
+        """
+        Process a single match file. Returns the manifest action taken (LOAD, REPLACE, or SKIP /
+        TOUCH for an unchanged file), or False when the match failed or was quarantined.
+        """
         match_id = self.extract_match_id(file_path)
         print(f"Processing match: {match_id}")
         
-        try:
-            # Check if match already exists
-            existing_match = session.query(CricketMatch).filter_by(match_id=match_id).first()
-            if existing_match:
-                print(f"  ⏭️  Match {match_id} already exists, skipping...")
-                return True
+        def load():
+            # Check the file against the ingestion manifest (no per-file query)
+            manifest = self.get_manifest(session)
+            action, state = manifest.plan(file_path, match_id)
+            if action in (SKIP, TOUCH):
+                self.handle_unchanged(session, match_id, action, state)
+                return action
             
             # Load match data
-            match_data = extract_match_data(str(file_path))
+            match_data = extract_match_data(str(file_path), streaming=self.streaming, metrics=self.metrics)
+            meta = match_data.data.get('meta')
+            
+            # Flatten and validate before touching the database
+            df = flatten_match_frame(match_data, match_id, self.validate)
+            
+            # A changed match is deleted and re-inserted in the same transaction
+            if action == REPLACE:
+                self.announce_replace(match_id, meta)
+                delete_match_rows(session, match_id)
             
             # Process match info
             match_info = self.process_match_info(match_data, match_id)
             if match_info:
                 session.add(match_info)
+            player_ids, new_players = self.resolve_players(session, match_data.data['info'], delivery_names(df))
             
-            # Process deliveries
-            deliveries = self.process_deliveries(match_data, match_id)
-            if deliveries:
-                session.add_all(deliveries)
-                print(f"  ✅ Added {len(deliveries)} deliveries")
+            # Match row and new players first, so only the deliveries are in the timed insert
+            with self.metrics.stage('flush'):
+                session.flush()
+            if self.write_mode == 'bulk':
+                rows_written, write_seconds = self.process_deliveries_bulk(match_data, match_id, session,
+                                                                           player_ids, df)
+            else:
+                deliveries = self.process_deliveries(match_data, match_id, player_ids, df)
+                rows_written, write_seconds = self.write_deliveries(session, deliveries=deliveries)
             
-            # Commit this match
-            session.commit()
-            return True
+            # Commit this match together with its scorecards and manifest row
+            commit_seconds = self.commit_timed(session, match_id, state, meta, new_players)
+            self.throughput.record(rows_written, write_seconds, commit_seconds)
+            self.metrics.add_rows(rows_written)
+            if rows_written:
+                print(f"  ✅ Added {rows_written} deliveries")
+            return action
+        
+        with self.metrics.span(match_id):
+            return self.run_match_transaction(session, match_id, load, file_path)
+    
+    def write_flattened_match(self, session, match_id, meta, info, table, action, state):
+        """Commit one match that was already parsed and flattened by a worker process"""
+        def load():
+            if action == REPLACE:
+                self.announce_replace(match_id, meta)
+                delete_match_rows(session, match_id)
             
-        except Exception as e:
-            print(f"  ❌ Error processing {match_id}: {e}")
-            session.rollback()
-            return False
+            match_info = self.build_match_info(info, match_id)
+            if match_info:
+                session.add(match_info)
+            player_ids, new_players = self.resolve_players(session, info, delivery_names(table))
+            assign_player_ids(table, player_ids)
+            
+            # Match row and new players first, so only the deliveries are in the timed insert
+            with self.metrics.stage('flush'):
+                session.flush()
+            if self.write_mode == 'bulk':
+                rows_written, write_seconds = self.write_deliveries(session, table=table)
+            else:
+                with self.metrics.stage('build'):
+                    deliveries = [CricketDelivery(**record) for record in table_records(table)]
+                rows_written, write_seconds = self.write_deliveries(session, deliveries=deliveries)
+            
+            # Commit this match together with its scorecards and manifest row
+            commit_seconds = self.commit_timed(session, match_id, state, meta, new_players)
+            with self._throughput_lock:
+                self.throughput.record(rows_written, write_seconds, commit_seconds)
+            self.metrics.add_rows(rows_written)
+            print(f"Processing match: {match_id}")
+            if rows_written:
+                print(f"  ✅ Added {rows_written} deliveries")
+            return True
+        
+        return self.run_match_transaction(session, match_id, load)
+    
+    def process_matches_parallel(self, json_files):
+        """
+        Parse and flatten files in a process pool while writer threads commit each match.
+        
+        Returns (successful, failed) with the same meaning as the sequential loop:
+        unchanged matches count as successful, quarantined ones as failed, and every
+        match is committed (or rolled back) on its own.
+        """
+        counts = {'successful': 0, 'failed': 0}
+        counts_lock = threading.Lock()
+        pending = []
+        plans = {}
+        
+        # Only new or changed files are sent to the pool
+        session = self.db_manager.get_session()
+        try:
+            manifest = self.get_manifest(session)
+            for file_path in json_files:
+                match_id = self.extract_match_id(file_path)
+                try:
+                    action, state = manifest.plan(file_path, match_id)
+                    if action in (SKIP, TOUCH):
+                        with self.metrics.span(match_id):
+                            self.handle_unchanged(session, match_id, action, state)
+                        counts['successful'] += 1
+                    elif match_id in plans:
+                        print(f"  ⏭️  Match {match_id} already queued from another file, skipping...")
+                        counts['successful'] += 1
+                    else:
+                        plans[match_id] = (action, state)
+                        pending.append(str(file_path))
+                except Exception as e:
+                    print(f"  ❌ Error processing {match_id}: {e}")
+                    session.rollback()
+                    counts['failed'] += 1
+        finally:
+            session.close()
+        
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        # Bounded hand-off between the pool and the writers keeps memory flat
+        results_queue = queue.Queue(maxsize=self.writers * 2)
+        
+        def writer_loop():
+            writer_session = self.db_manager.get_session()
+            try:
+                while True:
+                    batch = results_queue.get()
+                    if batch is None:
+                        break
+                    for match_id, meta, info, table, error, stages in batch:
+                        with self.metrics.span(match_id):
+                            self.metrics.add_stages(stages)
+                            if isinstance(error, MatchValidationError):
+                                self.quarantine_match(error, plans[match_id][1].file_path)
+                                ok = False
+                            elif error is not None:
+                                print(f"  ❌ Error processing {match_id}: {error}")
+                                self.metrics.mark('failed')
+                                ok = False
+                            else:
+                                action, state = plans[match_id]
+                                ok = self.write_flattened_match(writer_session, match_id, meta, info,
+                                                                table, action, state)
+                        with counts_lock:
+                            counts['successful' if ok else 'failed'] += 1
+            finally:
+                writer_session.close()
+        
+        writer_threads = [threading.Thread(target=writer_loop, daemon=True) for _ in range(self.writers)]
+        for thread in writer_threads:
+            thread.start()
+        
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                in_flight = {}
+                batch_iter = iter(batches)
+                max_in_flight = self.workers * 2
+                
+                while True:
+                    while len(in_flight) < max_in_flight:
+                        batch = next(batch_iter, None)
+                        if batch is None:
+                            break
+                        in_flight[pool.submit(flatten_match_batch, batch, self.streaming, self.validate)] = batch
+                    if not in_flight:
+                        break
+                    
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        batch = in_flight.pop(future)
+                        try:
+                            results_queue.put(future.result())
+                        except Exception as e:
+                            # The worker process itself died; fail every file in its batch
+                            results_queue.put([(Path(p).stem, None, None, None, str(e), {}) for p in batch])
+        finally:
+            for _ in writer_threads:
+                results_queue.put(None)
+            for thread in writer_threads:
+                thread.join()
+        
+        return counts['successful'], counts['failed']
     
     def process_all_matches(self):
         """Process all Nepal ODI matches"""
@@ -165,6 +572,7 @@ class NepalODIProcessor:
         if not self.db_manager.connect():
             print("Failed to connect to database")
             return False
+        self.db_manager.create_schema()
         
         # Get all files
         json_files = self.get_all_odi_files()
@@ -172,6 +580,31 @@ class NepalODIProcessor:
             print("No JSON files found")
             return False
         
+        # Re-read the manifest and the players at the start of every run
+        self.manifest = None
+        self.players = None
+        self.quarantine.count = 0
+        
+        if self.workers > 1:
+            successful, failed = 0, 0
+            try:
+                successful, failed = self.process_matches_parallel(json_files)
+                
+                print(f"\n📊 Processing Complete:")
+                print(f"✅ Successful: {successful}")
+                print(f"❌ Failed: {failed - self.quarantine.count}")
+                print(self.quarantine.summary())
+                print(f"📁 Total files: {len(json_files)}")
+                print(self.throughput.summary())
+                
+            except Exception as e:
+                print(f"Error during batch processing: {e}")
+            finally:
+                self.db_manager.close()
+                self.metrics.close()
+            
+            return successful > 0
+        
         session = self.db_manager.get_session()
         successful = 0
         failed = 0
@@ -185,24 +618,69 @@ class NepalODIProcessor:
             
             print(f"\n📊 Processing Complete:")
             print(f"✅ Successful: {successful}")
-            print(f"❌ Failed: {failed}")
+            print(f"❌ Failed: {failed - self.quarantine.count}")
+            print(self.quarantine.summary())
             print(f"📁 Total files: {len(json_files)}")
+            print(self.throughput.summary())
             
         except Exception as e:
             print(f"Error during batch processing: {e}")
         finally:
             session.close()
             self.db_manager.close()
+            self.metrics.close()
         
         return successful > 0
 
-def main():
+def main(argv=None):
     """Main function to process all Nepal ODI data"""
+    parser = argparse.ArgumentParser(description="Load Nepal match JSON files into the database")
+    parser.add_argument('--database-url', default=None, help="Defaults to the DB_* environment variables")
+    parser.add_argument('--write-mode', choices=WRITE_MODES, default='orm',
+                        help="orm: one ORM object per ball; bulk: COPY (PostgreSQL) / executemany (SQLite)")
+    parser.add_argument('--data-dir', action='append', default=None,
+                        help="Directory with match JSON files, repeatable (default: data/Nepal/ODI)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes for parsing/flattening (1 = sequential)")
+    parser.add_argument('--batch-size', type=int, default=8, help="Files per worker task")
+    parser.add_argument('--writers', type=int, default=1, help="Writer threads committing matches")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Read match files incrementally (flat memory for very large dumps)")
+    parser.add_argument('--profile', choices=sorted(ENGINE_PROFILES), default='bulk-ingest',
+                        help="Engine profile (pool size, batching, isolation level)")
+    parser.add_argument('--retries', type=int, default=2,
+                        help="Retries of a match after a transient database error (lock, deadlock, lost connection)")
+    parser.add_argument('--metrics-jsonl', default=None,
+                        help="Append per-match stage timings and a run summary to this JSON lines file")
+    parser.add_argument('--metrics-prom', default=None,
+                        help="Write run metrics to this Prometheus text-format file")
+    parser.add_argument('--no-scorecards', dest='scorecards', action='store_false',
+                        help="Skip refreshing the scorecard tables (backfill later with scorecards.py refresh --all)")
+    parser.add_argument('--no-matchups', dest='matchups', action='store_false',
+                        help="Skip the matchup index (backfill later with matchups.py rebuild)")
+    parser.add_argument('--no-validate', dest='validate', action='store_false',
+                        help="Skip the pre-ingest checks of each flattened match (match_validation.py)")
+    parser.add_argument('--quarantine-report', default=str(QUARANTINE_REPORT),
+                        help="JSON lines file listing the files that failed validation, with their issues")
+    parser.add_argument('--match-type', action='append', default=None,
+                        help="Only load these match types, repeatable (selected through the match catalog)")
+    parser.add_argument('--team', default=None, help="Only load matches of this team")
+    parser.add_argument('--since', default=None, help="Only load matches on or after YYYY-MM-DD")
+    args = parser.parse_args(argv)
+    match_filter = {key: value for key, value in (('match_type', args.match_type), ('team', args.team),
+                                                  ('since', args.since)) if value}
+    
     print("🏏 Nepal ODI Data Processor")
     print("=" * 40)
     
     # Initialize processor
-    processor = NepalODIProcessor()
+    processor = NepalODIProcessor(database_url=args.database_url, write_mode=args.write_mode,
+                                  data_dir=args.data_dir, workers=args.workers, batch_size=args.batch_size,
+                                  writers=args.writers, streaming=args.streaming,
+                                  scorecards=args.scorecards, matchups=args.matchups, profile=args.profile, retries=args.retries,
+                                  metrics=create_metrics(args.metrics_jsonl, args.metrics_prom),
+                                  match_filter=match_filter or None, validate=args.validate,
+                                  quarantine=QuarantineReport(args.quarantine_report))
     
     # Process all matches
     success = processor.process_all_matches()
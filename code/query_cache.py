@@ -0,0 +1,309 @@
+import copy
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+from sqlalchemy import inspect as sa_inspect
+from database_model import IngestState, read_ingest_version
+
+
+'''
+Result cache for the stats / query functions (scorecards, player aggregates).
+- A function decorated with @cached_query takes a Session or Connection first; its result is
+  keyed on (database, ingest version, function, arguments). Arguments are bound to the
+  signature with defaults applied and coerced (coerce=), and the function is called with the
+  very values that were keyed, so get_batting_scorecard(s, 1154649) and
+  get_batting_scorecard(s, match_id='1154649', innings_number=None) share one entry, while
+  'A Balbirnie ' and 'A Balbirnie' (or lists in another order) stay separate queries.
+- The ingest version is ingest_state.version, bumped in the same transaction as every commit
+  that loads or replaces a match (NepalODIProcessor, async_ingest, scorecards refresh).
+  Each call reads it with one primary-key lookup; when it moved, the entries of the older
+  version are dropped, so a stale result is never returned.
+- Entries live in an in-process LRU bounded by bytes (DataFrame memory usage, pickle size for
+  anything else). With a disk directory, evicted entries are pickled there instead of being
+  lost, and close() writes the rest, so the next process starts warm; files of older
+  versions are removed on the next version change.
+- Hits, misses, disk hits, evictions and invalidations are counted (cache_stats()).
+- A database without ingest_state (not migrated yet) is never cached.
+
+Use case
+python main.py scorecard players --match-type ODI --cache-dir data/query_cache --cache-stats
+'''
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+
+
+def _normalize(value):
+    """Hashable form of an argument (equal only for arguments the function can't tell apart)"""
+    if hasattr(value, 'item') and not hasattr(value, '__len__'):
+        value = value.item()  # numpy scalar
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted((_normalize(item) for item in value), key=repr))
+    if isinstance(value, dict):
+        return tuple(sorted((str(key), _normalize(item)) for key, item in value.items()))
+    return value
+
+
+def _size_of(value):
+    if hasattr(value, 'memory_usage'):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _detach(value):
+    """Copy handed to the caller, so mutating a result never changes the cached one"""
+    return value.copy() if hasattr(value, 'memory_usage') else copy.deepcopy(value)
+
+
+def _bind_of(session_or_connection):
+    if hasattr(session_or_connection, 'get_bind'):
+        return session_or_connection.get_bind()
+    return session_or_connection.engine
+
+
+def database_key(session_or_connection):
+    """Identity of the database behind a Session / Connection (password hidden)"""
+    engine = _bind_of(session_or_connection).engine
+    url = engine.url
+    key = url.render_as_string(hide_password=True)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        key = f"{key}#{id(engine)}"  # every in-memory database is a different one
+    return key
+
+
+def _connection_of(session_or_connection):
+    if hasattr(session_or_connection, 'connection'):
+        return session_or_connection.connection()
+    return session_or_connection
+
+
+class QueryCache:
+    """Byte-bounded LRU of query results, invalidated by the ingest version"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, disk_dir=None, max_disk_bytes=DEFAULT_MAX_DISK_BYTES,
+                 enabled=True):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        self.enabled = enabled
+        self.bytes = 0
+        self.counters = Counter()
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._versions = {}            # database key -> last ingest version seen
+        self._versioned = set()        # database keys known to have an ingest_state table
+        self._lock = threading.Lock()  # shared by the stats service threads: guards every dict above
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    # --- Versions -------------------------------------------------------------------
+
+    def current_version(self, session_or_connection, db_key):
+        """
+        Ingest version of the database (None when it has no ingest_state table).
+        A database without the table is checked again on every call, so it is cached as
+        soon as it is migrated; the database is read outside the lock.
+        """
+        connection = _connection_of(session_or_connection)
+        with self._lock:
+            versioned = db_key in self._versioned
+        if not versioned:
+            if not sa_inspect(connection).has_table(IngestState.__tablename__):
+                return None
+            with self._lock:
+                self._versioned.add(db_key)
+        version = read_ingest_version(connection)
+        with self._lock:
+            previous = self._versions.get(db_key)
+            self._versions[db_key] = version
+        if previous is not None and previous != version:
+            self.invalidate(db_key, keep_version=version)
+        return version
+
+    def invalidate(self, db_key=None, keep_version=None):
+        """Drop the entries of a database (all databases when None), except those of keep_version"""
+        with self._lock:
+            stale = [key for key in self._entries
+                     if (db_key is None or key[0] == db_key) and key[1] != keep_version]
+            for key in stale:
+                _, size = self._entries.pop(key)
+                self.bytes -= size
+            self.counters['invalidations'] += len(stale)
+        if self.disk_dir:
+            prefix = '*' if db_key is None else f"{self._digest(db_key)}-*"
+            current = f"-{keep_version}-" if keep_version is not None else None
+            for file_path in self.disk_dir.glob(f"{prefix}.pkl"):
+                if current is None or current not in file_path.name:
+                    file_path.unlink(missing_ok=True)
+
+    # --- Entries --------------------------------------------------------------------
+
+    @staticmethod
+    def _digest(value):
+        return hashlib.sha256(repr(value).encode()).hexdigest()[:16]
+
+    def _disk_path(self, key):
+        return self.disk_dir / f"{self._digest(key[0])}-{key[1]}-{self._digest(key)}.pkl"
+
+    def get(self, key):
+        """(True, value) on a hit, (False, None) on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.counters['hits'] += 1
+                return True, entry[0]
+        if self.disk_dir:
+            file_path = self._disk_path(key)
+            try:
+                with open(file_path, 'rb') as f:
+                    stored_key, value = pickle.load(f)
+                os.utime(file_path)  # mtime orders the files for prune_disk
+            except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+                stored_key = None
+            if stored_key == key:
+                with self._lock:
+                    self.counters['disk_hits'] += 1
+                self.put(key, value, count=False)
+                return True, value
+        with self._lock:
+            self.counters['misses'] += 1
+        return False, None
+
+    def put(self, key, value, count=True):
+        size = _size_of(value)
+        if count:
+            with self._lock:
+                self.counters['stores'] += 1
+        if size > self.max_bytes:
+            self.spill(key, value)
+            return
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, (old_value, old_size) = self._entries.popitem(last=False)
+                self.bytes -= old_size
+                evicted.append((old_key, old_value))
+            self.counters['evictions'] += len(evicted)
+        for old_key, old_value in evicted:
+            self.spill(old_key, old_value)
+
+    def spill(self, key, value):
+        """Pickle one entry into the disk directory (no-op without one)"""
+        if not self.disk_dir:
+            return
+        file_path = self._disk_path(key)
+        if file_path.exists():
+            return
+        tmp_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((key, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, file_path)
+        with self._lock:
+            self.counters['spills'] += 1
+        self.prune_disk()
+
+    def prune_disk(self):
+        """Remove the least recently used files beyond max_disk_bytes"""
+        files = [(file_path.stat(), file_path) for file_path in self.disk_dir.glob("*.pkl")]
+        total = sum(stat.st_size for stat, _ in files)
+        for stat, file_path in sorted(files, key=lambda item: item[0].st_mtime):
+            if total <= self.max_disk_bytes:
+                break
+            file_path.unlink(missing_ok=True)
+            total -= stat.st_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def close(self):
+        """Write the in-memory entries to the disk directory (if any)"""
+        if not self.disk_dir:
+            return
+        with self._lock:
+            entries = list(self._entries.items())
+        for key, (value, _) in entries:
+            self.spill(key, value)
+
+    def stats(self):
+        lookups = self.counters['hits'] + self.counters['disk_hits'] + self.counters['misses']
+        hits = self.counters['hits'] + self.counters['disk_hits']
+        return {**{name: self.counters[name] for name in
+                   ('hits', 'disk_hits', 'misses', 'stores', 'evictions', 'spills', 'invalidations')},
+                'entries': len(self._entries), 'bytes': self.bytes,
+                'hit_rate': round(hits / lookups, 3) if lookups else None}
+
+    # --- Calls ----------------------------------------------------------------------
+
+    def call(self, func, signature, coerce, session_or_connection, args, kwargs):
+        if not self.enabled:
+            return func(session_or_connection, *args, **kwargs)
+        db_key = database_key(session_or_connection)
+        version = self.current_version(session_or_connection, db_key)
+        if version is None:
+            return func(session_or_connection, *args, **kwargs)
+
+        bound = signature.bind(session_or_connection, *args, **kwargs)
+        bound.apply_defaults()
+        params = []
+        for name, value in list(bound.arguments.items())[1:]:
+            if name in coerce and value is not None:
+                value = coerce[name](value)
+                bound.arguments[name] = value  # the function gets the keyed value
+            params.append((name, _normalize(value)))
+        key = (db_key, version, f"{func.__module__}.{func.__qualname__}", tuple(params))
+
+        hit, value = self.get(key)
+        if not hit:
+            value = func(*bound.args, **bound.kwargs)
+            self.put(key, value)
+        return _detach(value)
+
+
+QUERY_CACHE = QueryCache()
+
+
+def configure_query_cache(max_mb=None, disk_dir=None, max_disk_mb=None, enabled=True):
+    """Replace the process-wide cache (e.g. from CLI options); returns it"""
+    global QUERY_CACHE
+    QUERY_CACHE = QueryCache(max_bytes=int(max_mb * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES,
+                             disk_dir=disk_dir,
+                             max_disk_bytes=int(max_disk_mb * 1024 * 1024) if max_disk_mb else DEFAULT_MAX_DISK_BYTES,
+                             enabled=enabled)
+    return QUERY_CACHE
+
+
+def cache_stats():
+    return QUERY_CACHE.stats()
+
+
+def cached_query(func=None, *, coerce=None):
+    """
+    Decorator for query functions whose first argument is a Session or Connection.
+    coerce maps argument names to a callable applied before keying (e.g. {'match_id': str}).
+    The undecorated function stays available as .uncached.
+    """
+    if func is None:
+        return functools.partial(cached_query, coerce=coerce)
+    signature = inspect.signature(func)
+    coerce = coerce or {}
+
+    @functools.wraps(func)
+    def wrapper(session_or_connection, *args, **kwargs):
+        return QUERY_CACHE.call(func, signature, coerce, session_or_connection, args, kwargs)
+
+    wrapper.uncached = func
+    return wrapper
@@ -0,0 +1,400 @@
+import argparse
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+from database_model import (NAMED_DELIVERIES, Base, CricketDelivery, CricketMatch, Player, create_named_deliveries_view,
+                            create_schema, dispose_engine, get_engine, get_database_config)
+from player_registry import PLAYER_ID_COLUMNS, unresolved_names
+
+
+'''
+Migration path for databases created before the current schema.
+- create_all only creates missing tables, so existing tables never got new columns or indexes.
+- migrate() adds missing columns, backfills cricket_deliveries.match_type, removes duplicate
+  balls (so the unique ball key can be created), creates every index declared on the models,
+  drops retired ones and, on PostgreSQL, adds the deliveries -> matches and -> players
+  foreign keys (a fresh database gets them from create_all).
+- drop_player_name_columns() drops the legacy player name columns of cricket_deliveries once
+  every name has its player ID (`players backfill` first); the names are read from players
+  (database_model.named_deliveries / the cricket_deliveries_named view, recreated at the end).
+- partition_deliveries() (PostgreSQL only, optional) turns cricket_deliveries into a table
+  partitioned by LIST (match_type), so ODI / ODM / T20 queries only scan their partition.
+- explain_checks() runs EXPLAIN for the main access patterns and reports whether each one
+  uses an index (and, when partitioned, whether partitions are pruned).
+Every step is idempotent, so migrate() can be run on any database at any time.
+
+Use case
+python code/schema_migrations.py migrate --partition
+python code/schema_migrations.py explain
+'''
+
+DELIVERIES = CricketDelivery.__tablename__
+MATCHES = CricketMatch.__tablename__
+FK_NAME = 'fk_deliveries_match'
+
+# Partition name -> match_type values (everything else lands in the default partition)
+MATCH_TYPE_PARTITIONS = {
+    'odi': ['ODI'],
+    'odm': ['ODM'],
+    't20': ['T20', 'IT20'],
+}
+
+BALL_KEY = ['match_id', 'innings_number', 'overs', 'balls']
+
+# Indexes no longer declared on the models (the player indexes moved to the players.id columns)
+RETIRED_INDEXES = ['ix_deliveries_batter', 'ix_deliveries_bowler', 'ix_deliveries_bowler_batter',
+                   'ix_deliveries_player_out']
+
+
+def add_missing_columns(conn):
+    """ALTER TABLE ... ADD COLUMN for model columns the existing tables don't have yet"""
+    inspector = inspect(conn)
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {col['name'] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            col_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def backfill_match_type(conn):
+    """Copy match_type from cricket_matches onto deliveries that don't have it"""
+    result = conn.execute(text(f"""
+        UPDATE {DELIVERIES}
+        SET match_type = (SELECT m.match_type FROM {MATCHES} m WHERE m.match_id = {DELIVERIES}.match_id)
+        WHERE match_type IS NULL
+    """))
+    return result.rowcount
+
+
+def remove_duplicate_balls(conn):
+    """Keep the first row of every (match_id, innings_number, overs, balls) key"""
+    key = ', '.join(BALL_KEY)
+    result = conn.execute(text(f"""
+        DELETE FROM {DELIVERIES}
+        WHERE id NOT IN (SELECT MIN(id) FROM {DELIVERIES} GROUP BY {key})
+    """))
+    return result.rowcount
+
+
+def create_model_indexes(conn):
+    """CREATE INDEX IF NOT EXISTS for every index declared in database_model.py"""
+    created = []
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            conn.execute(CreateIndex(index, if_not_exists=True))
+            created.append(index.name)
+    return created
+
+
+def drop_retired_indexes(conn):
+    """DROP INDEX for the indexes in RETIRED_INDEXES that still exist"""
+    if not inspect(conn).has_table(DELIVERIES):
+        return []
+    existing = {index['name'] for index in inspect(conn).get_indexes(DELIVERIES)}
+    dropped = [name for name in RETIRED_INDEXES if name in existing]
+    for name in dropped:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    return dropped
+
+
+def drop_player_name_columns(conn):
+    """
+    ALTER TABLE ... DROP COLUMN for the legacy player name columns, only once none of them
+    holds a name without its player ID. Returns (dropped columns, unresolved rows per column).
+    """
+    unresolved = unresolved_names(conn)
+    if any(unresolved.values()):
+        return [], unresolved
+    for name in unresolved:
+        conn.execute(text(f"ALTER TABLE {DELIVERIES} DROP COLUMN {name}"))
+    return list(unresolved), {}
+
+
+def has_foreign_key(conn, column):
+    """PostgreSQL: whether cricket_deliveries has a foreign key on column (whatever its name)"""
+    return conn.execute(text("""
+        SELECT 1 FROM pg_constraint c
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = ANY (c.conkey)
+        WHERE c.conrelid = CAST(:table AS regclass) AND c.contype = 'f' AND a.attname = :column
+    """), {'table': DELIVERIES, 'column': column}).first() is not None
+
+
+def add_constraint(conn, name, definition):
+    """ALTER TABLE cricket_deliveries ADD CONSTRAINT, checked without a long lock where possible"""
+    if is_partitioned(conn):
+        # PostgreSQL before 18 rejects NOT VALID foreign keys on partitioned tables
+        conn.execute(text(f"ALTER TABLE {DELIVERIES} ADD CONSTRAINT {name} {definition}"))
+        return
+    # NOT VALID skips the full-table check while holding the lock; VALIDATE runs it afterwards
+    conn.execute(text(f"ALTER TABLE {DELIVERIES} ADD CONSTRAINT {name} {definition} NOT VALID"))
+    conn.execute(text(f"ALTER TABLE {DELIVERIES} VALIDATE CONSTRAINT {name}"))
+
+
+def add_foreign_key(conn):
+    """PostgreSQL: add the deliveries -> matches foreign key if it is missing"""
+    if conn.dialect.name != 'postgresql':
+        return False  # SQLite can't add constraints to an existing table
+    if has_foreign_key(conn, 'match_id'):
+        return False
+    add_constraint(conn, FK_NAME, f"FOREIGN KEY (match_id) REFERENCES {MATCHES} (match_id) ON DELETE CASCADE")
+    return True
+
+
+def add_player_foreign_keys(conn):
+    """PostgreSQL: add the deliveries -> players foreign keys of the *_id columns that lack one"""
+    if conn.dialect.name != 'postgresql':
+        return []
+    added = []
+    for column in PLAYER_ID_COLUMNS:
+        if has_foreign_key(conn, column):
+            continue
+        name = f"fk_deliveries_{column}"
+        add_constraint(conn, name, f"FOREIGN KEY ({column}) REFERENCES {Player.__tablename__} (id)")
+        added.append(name)
+    return added
+
+
+def foreign_key_definitions(conn):
+    """(name, definition) of every foreign key on cricket_deliveries"""
+    rows = conn.execute(text("""
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'
+    """), {'table': DELIVERIES}).fetchall()
+    return [(name, definition.replace(' NOT VALID', '')) for name, definition in rows]
+
+
+def is_partitioned(conn):
+    if conn.dialect.name != 'postgresql':
+        return False
+    relkind = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+                           {'table': DELIVERIES}).scalar()
+    return relkind == 'p'
+
+
+def partition_deliveries(conn):
+    """
+    PostgreSQL: rebuild cricket_deliveries as PARTITION BY LIST (match_type).
+
+    Runs inside the caller's transaction, so either the whole swap happens or nothing does.
+    The primary key and the unique ball key gain match_type, as PostgreSQL requires the
+    partition key in every unique constraint; match_type is fixed per match, so the ball
+    key is still unique per ball.
+    """
+    if conn.dialect.name != 'postgresql':
+        print("  ⏭️  Partitioning is only available on PostgreSQL, skipping...")
+        return False
+    if is_partitioned(conn):
+        print(f"  ⏭️  {DELIVERIES} is already partitioned")
+        return False
+
+    old = f"{DELIVERIES}_unpartitioned"
+    sequence = f"{DELIVERIES}_id_seq"
+    # The view would follow the renamed table and block dropping it; migrate() recreates it
+    conn.execute(text(f"DROP VIEW IF EXISTS {NAMED_DELIVERIES}"))
+    # LIKE copies no foreign keys: remember them (matches and players) to recreate on the new table
+    foreign_keys = foreign_key_definitions(conn)
+    conn.execute(text(f"UPDATE {DELIVERIES} SET match_type = 'unknown' WHERE match_type IS NULL"))
+    conn.execute(text(f"ALTER TABLE {DELIVERIES} RENAME TO {old}"))
+    conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+
+    # Index and constraint names are schema-wide, so free them up on the old table first
+    for index in CricketDelivery.__table__.indexes:
+        conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    for name, _ in foreign_keys:
+        conn.execute(text(f"ALTER TABLE {old} DROP CONSTRAINT IF EXISTS {name}"))
+
+    conn.execute(text(f"""
+        CREATE TABLE {DELIVERIES} (LIKE {old} INCLUDING DEFAULTS)
+        PARTITION BY LIST (match_type)
+    """))
+    conn.execute(text(f"ALTER TABLE {DELIVERIES} ALTER COLUMN match_type SET NOT NULL"))
+    conn.execute(text(f"ALTER TABLE {DELIVERIES} ADD PRIMARY KEY (id, match_type)"))
+    for name, values in MATCH_TYPE_PARTITIONS.items():
+        value_list = ', '.join(f"'{value}'" for value in values)
+        conn.execute(text(f"CREATE TABLE {DELIVERIES}_{name} PARTITION OF {DELIVERIES} FOR VALUES IN ({value_list})"))
+    conn.execute(text(f"CREATE TABLE {DELIVERIES}_other PARTITION OF {DELIVERIES} DEFAULT"))
+
+    conn.execute(text(f"INSERT INTO {DELIVERIES} SELECT * FROM {old}"))
+    conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {DELIVERIES}.id"))
+    conn.execute(text(f"DROP TABLE {old}"))
+
+    key = ', '.join(BALL_KEY)
+    conn.execute(text(f"CREATE UNIQUE INDEX uq_deliveries_ball ON {DELIVERIES} ({key}, match_type)"))
+    create_model_indexes(conn)
+    for name, definition in foreign_keys:
+        add_constraint(conn, name, definition)
+    add_foreign_key(conn)
+    return True
+
+
+def migrate(engine, partition=False):
+    """Bring an existing database up to the current schema (safe to re-run)"""
+    create_schema(engine)
+    with engine.begin() as conn:
+        added = add_missing_columns(conn)
+        for column in added:
+            print(f"  ➕ Added column {column}")
+
+        filled = backfill_match_type(conn)
+        if filled:
+            print(f"  🔁 Backfilled match_type on {filled} deliveries")
+
+        if not is_partitioned(conn):
+            removed = remove_duplicate_balls(conn)
+            if removed:
+                print(f"  🧹 Removed {removed} duplicate deliveries")
+
+        for index_name in create_model_indexes(conn):
+            print(f"  📇 Created index {index_name}")
+        for index_name in drop_retired_indexes(conn):
+            print(f"  🗑️  Dropped index {index_name}")
+
+        if add_foreign_key(conn):
+            print(f"  🔗 Added foreign key {FK_NAME}")
+        for name in add_player_foreign_keys(conn):
+            print(f"  🔗 Added foreign key {name}")
+
+        dropped, unresolved = drop_player_name_columns(conn)
+        for name in dropped:
+            print(f"  🗑️  Dropped column {DELIVERIES}.{name}")
+        if unresolved:
+            print(f"  ⚠️  Kept the player name columns, names without a player ID: {unresolved}; "
+                  f"run `players backfill`, then migrate again")
+
+        if partition and partition_deliveries(conn):
+            print(f"  🗂️  Partitioned {DELIVERIES} by match_type")
+        create_named_deliveries_view(conn, replace=True)
+
+    print("✅ Schema is up to date")
+
+
+# Main access patterns: (name, SQL, index expected, partition pruning expected)
+EXPLAIN_QUERIES = [
+    ("deliveries of one match",
+     f"SELECT * FROM {DELIVERIES} WHERE match_id = :match_id ORDER BY innings_number, overs, balls",
+     True, False),
+    ("one innings of a match",
+     f"SELECT * FROM {DELIVERIES} WHERE match_id = :match_id AND innings_number = 0",
+     True, False),
+    ("balls faced by a batter",
+     f"SELECT match_id, runs_batter FROM {DELIVERIES} WHERE batter_id = :batter_id",
+     True, False),
+    ("balls bowled by a bowler",
+     f"SELECT match_id, runs_total, is_wicket FROM {DELIVERIES} WHERE bowler_id = :bowler_id",
+     True, False),
+    ("batter vs bowler",
+     f"SELECT runs_batter, is_wicket FROM {DELIVERIES} WHERE bowler_id = :bowler_id AND batter_id = :batter_id",
+     True, False),
+    ("dismissals of a player",
+     f"SELECT match_id, wicket_kind FROM {DELIVERIES} WHERE player_out_id = :batter_id",
+     True, False),
+    ("all T20 deliveries",
+     f"SELECT SUM(runs_total) FROM {DELIVERIES} WHERE match_type = 'T20'",
+     False, True),
+    ("matches of one type",
+     f"SELECT match_id FROM {MATCHES} WHERE match_type = 'ODI'",
+     True, False),
+    ("page of newest matches",
+     f"SELECT match_id FROM {MATCHES} WHERE (dates, match_id) < ('9999-12-31', '~') "
+     f"ORDER BY dates DESC, match_id DESC LIMIT 50",
+     True, False),
+    ("matchup counters",
+     "SELECT SUM(runs), SUM(balls), SUM(dismissals) FROM matchups "
+     "WHERE batter_id = :batter_id AND bowler_id = :bowler_id",
+     True, False),
+]
+
+
+def sample_params(conn):
+    row = conn.execute(text(f"SELECT match_id, batter_id, bowler_id FROM {DELIVERIES} LIMIT 1")).first()
+    if row is None:
+        return {'match_id': '0', 'batter_id': 0, 'bowler_id': 0}
+    return {'match_id': row.match_id, 'batter_id': row.batter_id, 'bowler_id': row.bowler_id}
+
+
+def explain_plan(conn, sql, params):
+    if conn.dialect.name == 'sqlite':
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).fetchall()
+        return '\n'.join(row[-1] for row in rows)
+    rows = conn.execute(text(f"EXPLAIN {sql}"), params).fetchall()
+    return '\n'.join(row[0] for row in rows)
+
+
+def plan_uses_index(conn, plan):
+    if conn.dialect.name == 'sqlite':
+        return 'USING INDEX' in plan or 'USING COVERING INDEX' in plan or 'USING INTEGER PRIMARY KEY' in plan
+    return 'Index' in plan and 'Seq Scan' not in plan
+
+
+def plan_prunes_partitions(conn, plan):
+    scanned = [name for name in MATCH_TYPE_PARTITIONS if f"{DELIVERIES}_{name}" in plan]
+    return len(scanned) == 1 and f"{DELIVERIES}_other" not in plan
+
+
+def explain_checks(engine):
+    """Run EXPLAIN for the main queries; returns a list of (name, ok, plan)"""
+    results = []
+    with engine.begin() as conn:
+        params = sample_params(conn)
+        partitioned = is_partitioned(conn)
+        if conn.dialect.name == 'postgresql':
+            # Small tables are cheaper to scan; we only want to know an index is usable
+            conn.execute(text("SET LOCAL enable_seqscan = off"))
+
+        for name, sql, expect_index, expect_pruning in EXPLAIN_QUERIES:
+            plan = explain_plan(conn, sql, params)
+            if expect_pruning:
+                if not partitioned:
+                    results.append((name, None, plan))
+                    continue
+                ok = plan_prunes_partitions(conn, plan)
+            else:
+                ok = plan_uses_index(conn, plan) if expect_index else True
+            results.append((name, ok, plan))
+
+    for name, ok, plan in results:
+        status = '⏭️ ' if ok is None else ('✅' if ok else '❌')
+        print(f"{status} {name}")
+        for line in plan.splitlines():
+            print(f"      {line}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate the cricket database schema and check query plans")
+    parser.add_argument('--database-url', default=None, help="Defaults to the DB_* environment variables")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    migrate_parser = subparsers.add_parser('migrate', help="Add missing columns, indexes and constraints")
+    migrate_parser.add_argument('--partition', action='store_true',
+                                help="PostgreSQL: partition cricket_deliveries by match_type")
+    subparsers.add_parser('explain', help="EXPLAIN the main queries and check index usage")
+    args = parser.parse_args(argv)
+
+    database_url = args.database_url or get_database_config()
+    engine = get_engine(database_url)
+    try:
+        if args.command == 'migrate':
+            migrate(engine, partition=args.partition)
+        else:
+            results = explain_checks(engine)
+            failed = [name for name, ok, _ in results if ok is False]
+            if failed:
+                raise SystemExit(f"❌ {len(failed)} queries don't use an index: {', '.join(failed)}")
+    finally:
+        dispose_engine(database_url)
+
+
+if __name__ == "__main__":
+    main()
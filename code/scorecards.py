@@ -0,0 +1,392 @@
+import argparse
+import numpy as np
+import pandas as pd
+from sqlalchemy import case, func, insert, select
+from database_model import (DatabaseManager, CricketDelivery, CricketMatch, InningsScorecard,
+                            BattingScorecard, BowlingScorecard, bump_ingest_version, get_database_config,
+                            named_deliveries)
+from player_registry import PLAYER_NAME_COLUMNS
+from query_cache import cache_stats, cached_query, configure_query_cache
+from match_state import NOT_TEAM_WICKETS
+
+
+'''
+Materialised scorecards.
+- innings_scorecards, batting_scorecards and bowling_scorecards hold the per-innings figures
+  that EDA.py used to recompute from raw deliveries every time.
+- refresh_match_scorecards() rebuilds the three tables for one match from its rows in
+  cricket_deliveries (one indexed read on the ball key). process_nepal_odi.py calls it for
+  every loaded match inside the same transaction, so scorecards never lag behind deliveries
+  and no full rebuild is needed.
+- Reading a card back is one indexed read on (match_id, innings_number, position).
+- Player aggregates (career batting / bowling per match type or team) are summed from the
+  scorecard tables rather than from cricket_deliveries.
+- Cards and aggregates are cached per ingest version (query_cache.py).
+
+Use case
+python code/scorecards.py refresh --all      # backfill a database loaded before scorecards existed
+python code/scorecards.py show 1154649
+python code/scorecards.py players --match-type ODI --team Nepal --limit 15
+'''
+
+# Dismissals that don't count as the bowler's wicket
+NOT_BOWLER_WICKETS = ['run out', 'retired hurt', 'retired out', 'retired not out',
+                      'obstructing the field', 'handled the ball', 'timed out']
+
+# Batting card 'dismissal' values that leave the batter not out (averages, innings wickets)
+NOT_OUT = ['not out'] + NOT_TEAM_WICKETS
+EXTRAS_KINDS = ['extras_byes', 'extras_legbyes', 'extras_wides', 'extras_noballs']
+
+SCORECARD_MODELS = [InningsScorecard, BattingScorecard, BowlingScorecard]
+
+DELIVERY_FIELDS = ['innings_number', 'overs', 'balls', 'batter', 'non_striker', 'bowler',
+                   'runs_batter', 'runs_extras', 'runs_total',
+                   'extras_wides', 'extras_legbyes', 'extras_noballs', 'extras_byes',
+                   'is_wicket', 'wicket_player_out', 'wicket_kind', 'wicket_fielder']
+COUNT_FIELDS = ['runs_batter', 'runs_extras', 'runs_total', 'extras_wides', 'extras_legbyes',
+                'extras_noballs', 'extras_byes', 'is_wicket']
+
+
+def overs_text(balls):
+    """Legal balls -> cricket overs notation (57 -> '9.3', 60 -> '10')"""
+    balls = int(balls)
+    return f"{balls // 6}" if balls % 6 == 0 else f"{balls // 6}.{balls % 6}"
+
+
+def read_batting_sides(connection, match_id):
+    """innings_number -> batting_side (1 / 2) of a match's deliveries (None for rows loaded before it)"""
+    query = (select(CricketDelivery.innings_number, func.min(CricketDelivery.batting_side))
+             .where(CricketDelivery.match_id == match_id)
+             .group_by(CricketDelivery.innings_number))
+    return dict(connection.execute(query).fetchall())
+
+
+def innings_teams(match, sides):
+    """
+    Batting team per innings number: team1 / team2 as stored on the deliveries (batting_side).
+    Deliveries loaded before batting_side fall back to the toss; from innings 2 on, each pair of
+    super overs is opened by the side that batted second in the pair before.
+    """
+    if match is None or not match.team1 or not match.team2:
+        return {}
+    teams = {1: match.team1, 2: match.team2}
+    first = second = None
+    if match.toss_winner in (match.team1, match.team2):
+        other = match.team2 if match.toss_winner == match.team1 else match.team1
+        first, second = (match.toss_winner, other) if match.toss_decision == 'bat' else (other, match.toss_winner)
+    batting = {}
+    for number, side in sides.items():
+        if side in teams:
+            batting[number] = teams[side]
+        elif first is not None:
+            batting[number] = first if (number // 2 + number) % 2 == 0 else second
+    return batting
+
+
+def read_match_deliveries(connection, match_id):
+    """All deliveries of a match in ball order, with the player names from players"""
+    deliveries = named_deliveries(PLAYER_NAME_COLUMNS).subquery()
+    query = (select(*(deliveries.c[field] for field in DELIVERY_FIELDS))
+             .where(deliveries.c.match_id == match_id)
+             .order_by(deliveries.c.innings_number, deliveries.c.overs, deliveries.c.balls))
+    return scorecard_fields(pd.DataFrame(connection.execute(query).fetchall(), columns=DELIVERY_FIELDS))
+
+
+def scorecard_fields(table):
+    """DELIVERY_FIELDS of a table-shaped deliveries frame, with the counts as plain int64 (nulls -> 0)"""
+    df = table[DELIVERY_FIELDS].copy()
+    for col in COUNT_FIELDS:
+        df[col] = pd.to_numeric(df[col]).fillna(0).astype(np.int64)
+    return df
+
+
+def _rate(numerator, denominator, scale):
+    return round(scale * numerator / denominator, 2) if denominator else None
+
+
+def compute_scorecards(df, match_id, teams=None):
+    """
+    Return (innings rows, batting rows, bowling rows) as lists of dicts for one match.
+    Players are factorized in order of first appearance, so every figure is a bincount.
+    """
+    teams = teams or {}
+    innings_rows, batting_rows, bowling_rows = [], [], []
+
+    innings_number = df['innings_number'].to_numpy()
+    bounds = np.flatnonzero(np.r_[True, innings_number[1:] != innings_number[:-1], True])
+    columns = {col: df[col].to_numpy() for col in DELIVERY_FIELDS}
+
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        inns = {col: values[start:stop] for col, values in columns.items()}
+        number = int(inns['innings_number'][0])
+        team = teams.get(number)
+        bowling_team = next((t for t in set(teams.values()) if t != team), None) if team else None
+
+        wides, noballs = inns['extras_wides'], inns['extras_noballs']
+        legal = (wides == 0) & (noballs == 0)
+        conceded = inns['runs_batter'] + wides + noballs
+        kinds = inns['wicket_kind']
+        credited = pd.notna(kinds) & ~np.isin(kinds.astype(str), NOT_BOWLER_WICKETS)
+        # Retired hurt / not out end no team wicket (as in match_state)
+        team_wickets = pd.notna(kinds) & ~np.isin(kinds.astype(str), NOT_TEAM_WICKETS)
+
+        runs_total, legal_balls = int(inns['runs_total'].sum()), int(legal.sum())
+        extras = {col: int(inns[col].sum()) for col in EXTRAS_KINDS}
+        # Penalty runs are only in runs_extras on the delivery rows, so they are what's left of it
+        extras_total = int(inns['runs_extras'].sum())
+        innings_rows.append({
+            'match_id': match_id, 'innings_number': number, 'team': team,
+            'runs': runs_total, 'wickets': int(team_wickets.sum()),
+            'balls': legal_balls, 'overs': overs_text(legal_balls),
+            'run_rate': _rate(runs_total, legal_balls, 6),
+            'extras': extras_total, **extras,
+            'extras_penalty': extras_total - sum(extras.values()),
+        })
+
+        # Batting order: first appearance at either end (or as the dismissed player)
+        appearances = np.column_stack([inns['batter'], inns['non_striker'], inns['wicket_player_out']]).ravel()
+        codes, batters = pd.factorize(appearances)
+        batter_codes, size = codes[0::3], len(batters)
+        runs = inns['runs_batter']
+        faced = np.bincount(batter_codes, weights=wides == 0, minlength=size)
+        scored = np.bincount(batter_codes, weights=runs, minlength=size)
+        fours = np.bincount(batter_codes, weights=runs == 4, minlength=size)
+        sixes = np.bincount(batter_codes, weights=runs == 6, minlength=size)
+        dismissals = {}  # A batter's last wicket row (retired hurt, then out later, is out)
+        for i in np.flatnonzero(codes[2::3] >= 0):
+            dismissals[inns['wicket_player_out'][i]] = i
+        for position, batter in enumerate(batters):
+            wicket = dismissals.get(batter)
+            batting_rows.append({
+                'match_id': match_id, 'innings_number': number, 'team': team,
+                'batting_position': position + 1, 'batter': batter,
+                'runs': int(scored[position]), 'balls': int(faced[position]),
+                'fours': int(fours[position]), 'sixes': int(sixes[position]),
+                'strike_rate': _rate(scored[position], faced[position], 100),
+                'dismissal': kinds[wicket] if wicket is not None else 'not out',
+                'dismissed_by': inns['bowler'][wicket] if wicket is not None and credited[wicket] else None,
+                'fielder': inns['wicket_fielder'][wicket] if wicket is not None else None,
+            })
+
+        # Bowling order: first ball bowled; a maiden is a complete over with nothing conceded
+        bowler_codes, bowlers = pd.factorize(inns['bowler'])
+        size = len(bowlers)
+        balls = np.bincount(bowler_codes, weights=legal, minlength=size)
+        given = np.bincount(bowler_codes, weights=conceded, minlength=size)
+        over_keys, over_index = np.unique(bowler_codes.astype(np.int64) * 1000 + inns['overs'], return_inverse=True)
+        maiden_overs = ((np.bincount(over_index, weights=legal) >= 6)
+                        & (np.bincount(over_index, weights=conceded) == 0))
+        maidens = np.bincount(over_keys[maiden_overs] // 1000, minlength=size)
+        wickets = np.bincount(bowler_codes, weights=credited, minlength=size)
+        dots = np.bincount(bowler_codes, weights=legal & (conceded == 0), minlength=size)
+        bowled_wides = np.bincount(bowler_codes, weights=wides, minlength=size)
+        bowled_noballs = np.bincount(bowler_codes, weights=noballs, minlength=size)
+        for position, bowler in enumerate(bowlers):
+            bowling_rows.append({
+                'match_id': match_id, 'innings_number': number, 'team': bowling_team,
+                'bowling_position': position + 1, 'bowler': bowler,
+                'balls': int(balls[position]), 'overs': overs_text(balls[position]),
+                'maidens': int(maidens[position]), 'runs': int(given[position]),
+                'wickets': int(wickets[position]), 'economy': _rate(given[position], balls[position], 6),
+                'dots': int(dots[position]),
+                'wides': int(bowled_wides[position]), 'noballs': int(bowled_noballs[position]),
+            })
+
+    return innings_rows, batting_rows, bowling_rows
+
+
+def delete_match_scorecards(session, match_id):
+    for model in SCORECARD_MODELS:
+        session.query(model).filter_by(match_id=match_id).delete(synchronize_session=False)
+
+
+def refresh_match_scorecards(session, match_id):
+    """Rebuild the scorecards of one match from its deliveries (inside the caller's transaction)"""
+    session.flush()
+    delete_match_scorecards(session, match_id)
+    match = session.query(CricketMatch).filter_by(match_id=match_id).first()
+    df = read_match_deliveries(session.connection(), match_id)
+    if df.empty:
+        return 0
+    teams = innings_teams(match, read_batting_sides(session.connection(), match_id))
+    innings_rows, batting_rows, bowling_rows = compute_scorecards(df, match_id, teams)
+    for model, rows in zip(SCORECARD_MODELS, (innings_rows, batting_rows, bowling_rows)):
+        if rows:
+            session.execute(insert(model), rows)
+    return len(innings_rows)
+
+
+def refresh_all_scorecards(session, match_ids=None):
+    """Refresh every match (or the given ones), committing per match"""
+    if match_ids is None:
+        match_ids = [match_id for (match_id,) in session.query(CricketMatch.match_id).order_by(CricketMatch.match_id)]
+    for match_id in match_ids:
+        try:
+            innings = refresh_match_scorecards(session, match_id)
+            bump_ingest_version(session)
+            session.commit()
+            print(f"  ✅ {match_id}: {innings} innings")
+        except Exception as e:
+            print(f"  ❌ Error refreshing {match_id}: {e}")
+            session.rollback()
+    return len(match_ids)
+
+
+def _read_card(session, model, match_id, innings_number, order_column):
+    query = session.query(model).filter(model.match_id == match_id)
+    if innings_number is not None:
+        query = query.filter(model.innings_number == innings_number)
+    rows = query.order_by(model.innings_number, order_column).all()
+    columns = [col.name for col in model.__table__.columns if col.name != 'id']
+    return pd.DataFrame([{col: getattr(row, col) for col in columns} for row in rows], columns=columns)
+
+
+@cached_query(coerce={'match_id': str})
+def get_innings_scorecard(session, match_id):
+    return _read_card(session, InningsScorecard, match_id, None, InningsScorecard.innings_number)
+
+
+@cached_query(coerce={'match_id': str})
+def get_batting_scorecard(session, match_id, innings_number=None):
+    return _read_card(session, BattingScorecard, match_id, innings_number, BattingScorecard.batting_position)
+
+
+@cached_query(coerce={'match_id': str})
+def get_bowling_scorecard(session, match_id, innings_number=None):
+    return _read_card(session, BowlingScorecard, match_id, innings_number, BowlingScorecard.bowling_position)
+
+
+def _player_query(session, model, player_column, columns, match_type, team):
+    query = session.query(player_column, *columns).join(CricketMatch, CricketMatch.match_id == model.match_id)
+    if match_type:
+        types = [match_type] if isinstance(match_type, str) else list(match_type)
+        query = query.filter(CricketMatch.match_type.in_(types))
+    if team:
+        query = query.filter(model.team == team)
+    return query.group_by(player_column)
+
+
+@cached_query
+def get_player_batting_stats(session, match_type=None, team=None, min_innings=1):
+    """Career batting per player: innings, runs, balls, outs, highest score, average, strike rate"""
+    card = BattingScorecard
+    out = case((card.dismissal.in_(NOT_OUT), 0), else_=1)
+    columns = ['batter', 'innings', 'runs', 'balls', 'outs', 'highest', 'fours', 'sixes']
+    query = _player_query(session, card, card.batter,
+                          [func.count(card.id), func.sum(card.runs), func.sum(card.balls), func.sum(out),
+                           func.max(card.runs), func.sum(card.fours), func.sum(card.sixes)], match_type, team)
+    df = pd.DataFrame(query.having(func.count(card.id) >= min_innings).all(), columns=columns)
+    df['average'] = [_rate(runs, outs, 1) for runs, outs in zip(df['runs'], df['outs'])]
+    df['strike_rate'] = [_rate(runs, balls, 100) for runs, balls in zip(df['runs'], df['balls'])]
+    return df.sort_values(['runs', 'batter'], ascending=[False, True], ignore_index=True)
+
+
+@cached_query
+def get_player_bowling_stats(session, match_type=None, team=None, min_innings=1):
+    """Career bowling per player: innings, balls, maidens, runs, wickets, average, economy"""
+    card = BowlingScorecard
+    columns = ['bowler', 'innings', 'balls', 'maidens', 'runs', 'wickets', 'dots']
+    query = _player_query(session, card, card.bowler,
+                          [func.count(card.id), func.sum(card.balls), func.sum(card.maidens), func.sum(card.runs),
+                           func.sum(card.wickets), func.sum(card.dots)], match_type, team)
+    df = pd.DataFrame(query.having(func.count(card.id) >= min_innings).all(), columns=columns)
+    df['overs'] = [overs_text(balls) for balls in df['balls']]
+    df['average'] = [_rate(runs, wickets, 1) for runs, wickets in zip(df['runs'], df['wickets'])]
+    df['economy'] = [_rate(runs, balls, 6) for runs, balls in zip(df['runs'], df['balls'])]
+    return df.sort_values(['wickets', 'runs', 'bowler'], ascending=[False, True, True], ignore_index=True)
+
+
+@cached_query
+def get_player_career(session, names):
+    """
+    Batting and bowling of one player per match type, summed over every name in names
+    (the player's aliases); returns (batting, bowling) DataFrames.
+    """
+    bat, bowl = BattingScorecard, BowlingScorecard
+    out = case((bat.dismissal.in_(NOT_OUT), 0), else_=1)
+    batting = pd.DataFrame(
+        session.query(CricketMatch.match_type, func.count(bat.id), func.sum(bat.runs), func.sum(bat.balls),
+                      func.sum(out), func.max(bat.runs), func.sum(bat.fours), func.sum(bat.sixes))
+        .join(CricketMatch, CricketMatch.match_id == bat.match_id).filter(bat.batter.in_(list(names)))
+        .group_by(CricketMatch.match_type).order_by(CricketMatch.match_type).all(),
+        columns=['match_type', 'innings', 'runs', 'balls', 'outs', 'highest', 'fours', 'sixes'])
+    batting['average'] = [_rate(runs, outs, 1) for runs, outs in zip(batting['runs'], batting['outs'])]
+    batting['strike_rate'] = [_rate(runs, balls, 100) for runs, balls in zip(batting['runs'], batting['balls'])]
+    bowling = pd.DataFrame(
+        session.query(CricketMatch.match_type, func.count(bowl.id), func.sum(bowl.balls), func.sum(bowl.maidens),
+                      func.sum(bowl.runs), func.sum(bowl.wickets), func.sum(bowl.dots))
+        .join(CricketMatch, CricketMatch.match_id == bowl.match_id).filter(bowl.bowler.in_(list(names)))
+        .group_by(CricketMatch.match_type).order_by(CricketMatch.match_type).all(),
+        columns=['match_type', 'innings', 'balls', 'maidens', 'runs', 'wickets', 'dots'])
+    bowling['overs'] = [overs_text(balls) for balls in bowling['balls']]
+    bowling['average'] = [_rate(runs, wickets, 1) for runs, wickets in zip(bowling['runs'], bowling['wickets'])]
+    bowling['economy'] = [_rate(runs, balls, 6) for runs, balls in zip(bowling['runs'], bowling['balls'])]
+    return batting, bowling
+
+
+def main(argv=None):
+    """Backfill scorecards or print the stored cards of a match"""
+    parser = argparse.ArgumentParser(description="Materialised batting and bowling scorecards")
+    parser.add_argument('--database-url', default=None, help="Defaults to the DB_* environment variables")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    refresh_parser = subparsers.add_parser('refresh', help="Rebuild scorecards from cricket_deliveries")
+    refresh_parser.add_argument('match_ids', nargs='*')
+    refresh_parser.add_argument('--all', action='store_true', help="Refresh every match in the database")
+    show_parser = subparsers.add_parser('show', help="Print the stored scorecards of a match")
+    show_parser.add_argument('match_id')
+    players_parser = subparsers.add_parser('players', help="Career batting (or bowling) per player")
+    players_parser.add_argument('--match-type', action='append', default=None, help="e.g. ODI (repeatable)")
+    players_parser.add_argument('--team', default=None)
+    players_parser.add_argument('--bowling', action='store_true', help="Bowling figures instead of batting")
+    players_parser.add_argument('--min-innings', type=int, default=1)
+    players_parser.add_argument('--limit', type=int, default=20)
+    for sub_parser in (show_parser, players_parser):
+        sub_parser.add_argument('--cache-dir', default=None,
+                                help="Keep query results on disk between runs (see query_cache.py)")
+        sub_parser.add_argument('--cache-mb', type=float, default=None, help="In-memory cache size")
+        sub_parser.add_argument('--cache-stats', action='store_true', help="Print cache hits and misses")
+    args = parser.parse_args(argv)
+    cache = None
+    if args.command != 'refresh':
+        cache = configure_query_cache(max_mb=args.cache_mb, disk_dir=args.cache_dir)
+
+    # Refreshing is a batch write; showing is a handful of small reads
+    profile = 'bulk-ingest' if args.command == 'refresh' else 'interactive-analytics'
+    db = DatabaseManager(args.database_url or get_database_config(), profile=profile)
+    if not db.connect():
+        return
+    session = db.get_session()
+    try:
+        if args.command == 'refresh':
+            if not args.all and not args.match_ids:
+                parser.error("give match IDs or --all")
+            count = refresh_all_scorecards(session, None if args.all else args.match_ids)
+            print(f"📋 Refreshed scorecards for {count} matches")
+        elif args.command == 'players':
+            stats = (get_player_bowling_stats if args.bowling else get_player_batting_stats)(
+                session, args.match_type, args.team, args.min_innings)
+            fields = (['bowler', 'innings', 'overs', 'maidens', 'runs', 'wickets', 'average', 'economy']
+                      if args.bowling else
+                      ['batter', 'innings', 'runs', 'balls', 'outs', 'highest', 'average', 'strike_rate'])
+            print(stats[fields].head(args.limit).to_string(index=False))
+        else:
+            innings = get_innings_scorecard(session, args.match_id)
+            for row in innings.itertuples():
+                print(f"\n🏏 {row.team} {row.runs}/{row.wickets} ({row.overs} overs, extras {row.extras})")
+                batting = get_batting_scorecard(session, args.match_id, row.innings_number)
+                print(batting[['batter', 'dismissal', 'dismissed_by', 'runs', 'balls', 'fours', 'sixes',
+                               'strike_rate']].to_string(index=False))
+                bowling = get_bowling_scorecard(session, args.match_id, row.innings_number)
+                print(bowling[['bowler', 'overs', 'maidens', 'runs', 'wickets', 'economy',
+                               'wides', 'noballs']].to_string(index=False))
+    finally:
+        session.close()
+        db.close()
+        if cache is not None:
+            cache.close()
+            if args.cache_stats:
+                print(f"\n🗄️  Query cache: {cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import argparse
+import asyncio
+import json
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import quote, urlencode, urlsplit
+
+PROJECT_ROOT = Path(__file__).parent.parent
+LOADTEST_LOG = PROJECT_ROOT / 'data' / 'benchmarks' / 'loadtest.jsonl'
+
+
+'''
+Load test for the stats service (stats_service.py), standard library only.
+- --concurrency keep-alive connections send requests back to back for --duration seconds
+  (after --warmup seconds that aren't counted).
+- The URLs are discovered from the service itself: match IDs, teams and match pages (by
+  following next_cursor) from /matches, player names from /players. Requests are drawn from
+  them with the weights in MIX: scorecards, match details, match pages, leaderboards, player
+  careers and head-to-head records.
+- A --conditional share of the requests revalidates with the ETag last seen for its URL
+  (If-None-Match), like a dashboard polling for changes.
+- Prints requests per second, latency p50 / p95 / p99 and status counts, appends them to
+  data/benchmarks/loadtest.jsonl, and exits non-zero below --min-rps or on any 5xx.
+- --spawn starts `main.py serve` on a free port against --database-url for the run.
+
+Use case
+python main.py loadtest --spawn --database-url sqlite:///data/cricket.db --duration 10
+python main.py loadtest --url http://127.0.0.1:8080 --concurrency 64 --conditional 0.5
+'''
+
+# Request kind -> weight
+MIX = {'scorecard': 25, 'match': 15, 'matches': 15, 'players': 15, 'player': 20, 'head_to_head': 10}
+MIN_RPS = 300
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def get(self, target, headers=None):
+        """(status, headers, body); reconnects when the server closed the connection"""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f"GET {target} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            self.close()
+            raise ConnectionError("connection closed by the server")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        body = await self.reader.readexactly(int(response_headers.get('content-length', 0)))
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, response_headers, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def discover(host, port, pages=10):
+    """Request kind -> list of target URLs, built from what the service returns"""
+    connection = Connection(host, port)
+    try:
+        async def get_json(target):
+            status, _, body = await connection.get(target)
+            if status != 200:
+                raise RuntimeError(f"GET {target} returned {status}")
+            return json.loads(body)
+
+        page_targets, matches, cursor = [], [], None
+        for _ in range(pages):
+            target = '/matches?' + urlencode({'limit': 20, **({'cursor': cursor} if cursor else {})})
+            page = await get_json(target)
+            page_targets.append(target)
+            matches.extend(page['matches'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        if not matches:
+            raise RuntimeError("the service has no matches, load some first")
+        match_types = sorted({match['match_type'] for match in matches if match['match_type']})
+        teams = sorted({team for match in matches for team in (match['team1'], match['team2']) if team})
+        players = (await get_json('/players?limit=100'))['players']
+        bowlers = (await get_json('/players?role=bowling&limit=50'))['players']
+        names = sorted({row['batter'] for row in players} | {row['bowler'] for row in bowlers})
+    finally:
+        connection.close()
+
+    leaderboards = [f'/players?role={role}' for role in ('batting', 'bowling')]
+    leaderboards += [f'/players?role={role}&match_type={match_type}&limit=20'
+                     for role in ('batting', 'bowling') for match_type in match_types]
+    return {
+        'scorecard': [f"/matches/{quote(match['match_id'])}/scorecard" for match in matches],
+        'match': [f"/matches/{quote(match['match_id'])}" for match in matches],
+        'matches': page_targets + [f"/matches?team={quote(team)}&limit=20" for team in teams],
+        'players': leaderboards,
+        'player': [f"/players/{quote(name)}" for name in names],
+        'head_to_head': [f"/head-to-head?team={quote(team)}" for team in teams],
+    }
+
+
+class LoadTest:
+    def __init__(self, host, port, targets, concurrency=32, conditional=0.3, seed=1):
+        self.host = host
+        self.port = port
+        self.kinds = [kind for kind in MIX if targets.get(kind)]
+        self.weights = [MIX[kind] for kind in self.kinds]
+        self.targets = targets
+        self.concurrency = concurrency
+        self.conditional = conditional
+        self.random = random.Random(seed)
+        self.etags = {}
+        self.reset()
+
+    def reset(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = Counter()
+
+    def next_target(self):
+        kind = self.random.choices(self.kinds, self.weights)[0]
+        return self.random.choice(self.targets[kind])
+
+    async def worker(self, deadline):
+        connection = Connection(self.host, self.port)
+        try:
+            while time.perf_counter() < deadline:
+                target = self.next_target()
+                headers = {}
+                if target in self.etags and self.random.random() < self.conditional:
+                    headers['If-None-Match'] = self.etags[target]
+                started = time.perf_counter()
+                try:
+                    status, response_headers, _ = await connection.get(target, headers)
+                except (ConnectionError, OSError, asyncio.IncompleteReadError) as e:
+                    connection.close()
+                    self.errors[type(e).__name__] += 1
+                    continue
+                self.latencies.append(time.perf_counter() - started)
+                self.statuses[status] += 1
+                if 'etag' in response_headers:
+                    self.etags[target] = response_headers['etag']
+        finally:
+            connection.close()
+
+    async def run(self, duration, warmup=1.0):
+        if warmup:
+            await asyncio.gather(*[self.worker(time.perf_counter() + warmup) for _ in range(self.concurrency)])
+            self.reset()
+        started = time.perf_counter()
+        await asyncio.gather(*[self.worker(started + duration) for _ in range(self.concurrency)])
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed):
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            return round(1000 * latencies[min(len(latencies) - 1, int(fraction * len(latencies)))], 2) if latencies else None
+
+        return {
+            'requests': len(latencies),
+            'seconds': round(elapsed, 2),
+            'rps': round(len(latencies) / elapsed, 1),
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'mean_ms': round(1000 * statistics.fmean(latencies), 2) if latencies else None,
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+            'connection_errors': dict(self.errors),
+            'concurrency': self.concurrency,
+            'conditional': self.conditional,
+        }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def spawn_service(database_url, port, timeout=60):
+    """Start `main.py serve` and wait for /health"""
+    command = [sys.executable, str(PROJECT_ROOT / 'main.py'), 'serve', '--port', str(port)]
+    if database_url:
+        command += ['--database-url', database_url]
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("the service exited during startup")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1) as sock:
+                sock.sendall(b"GET /health HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+                if sock.recv(64).startswith(b"HTTP/1.1 200"):
+                    return process
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"the service didn't answer on port {port} within {timeout}s")
+
+
+def main(argv=None):
+    """Load-test the stats service"""
+    parser = argparse.ArgumentParser(description="Load test for the stats service")
+    parser.add_argument('--url', default='http://127.0.0.1:8080', help="Service to test (ignored with --spawn)")
+    parser.add_argument('--spawn', action='store_true', help="Start `main.py serve` on a free port for the run")
+    parser.add_argument('--database-url', default=None, help="Database of the spawned service")
+    parser.add_argument('--duration', type=float, default=10.0, help="Measured seconds")
+    parser.add_argument('--warmup', type=float, default=1.0, help="Seconds of load before measuring")
+    parser.add_argument('--concurrency', type=int, default=32, help="Keep-alive connections")
+    parser.add_argument('--conditional', type=float, default=0.3,
+                        help="Share of requests sent with If-None-Match once an ETag is known")
+    parser.add_argument('--min-rps', type=float, default=MIN_RPS, help="Fail below this many requests per second")
+    parser.add_argument('--no-record', dest='record', action='store_false',
+                        help=f"Don't append the result to {LOADTEST_LOG.relative_to(PROJECT_ROOT)}")
+    args = parser.parse_args(argv)
+
+    process = None
+    if args.spawn:
+        host, port = '127.0.0.1', free_port()
+        process = spawn_service(args.database_url, port)
+    else:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    try:
+        targets = asyncio.run(discover(host, port))
+        print(f"🎯 {sum(len(urls) for urls in targets.values())} URLs: "
+              f"{', '.join(f'{kind} {len(urls)}' for kind, urls in targets.items())}")
+        load_test = LoadTest(host, port, targets, args.concurrency, args.conditional)
+        result = asyncio.run(load_test.run(args.duration, args.warmup))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    server_errors = sum(count for status, count in result['statuses'].items() if status.startswith('5'))
+    ok = result['rps'] >= args.min_rps and not server_errors and not result['connection_errors']
+    print(f"{'✅' if ok else '❌'} {result['rps']} req/s over {result['seconds']}s ({result['requests']} requests, "
+          f"{args.concurrency} connections): p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, "
+          f"p99 {result['p99_ms']} ms; statuses {result['statuses']}")
+    if result['connection_errors']:
+        print(f"  ❌ Connection errors: {result['connection_errors']}")
+
+    if args.record:
+        from benchmarks import git_revision
+        commit, dirty = git_revision()
+        LOADTEST_LOG.parent.mkdir(parents=True, exist_ok=True)
+        with open(LOADTEST_LOG, 'a') as f:
+            f.write(json.dumps({'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                                'commit': commit, 'dirty': dirty, 'min_rps': args.min_rps, 'ok': ok,
+                                **result}) + '\n')
+        print(f"📝 Recorded in {LOADTEST_LOG}")
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,549 @@
+import argparse
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import re
+import signal
+import time
+from bisect import bisect_right
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+from sqlalchemy import or_, select, tuple_
+from database_model import CricketMatch, DatabaseManager, get_database_config, read_ingest_version
+from player_registry import player_aliases
+from scorecards import (get_batting_scorecard, get_bowling_scorecard, get_innings_scorecard,
+                        get_player_batting_stats, get_player_bowling_stats, get_player_career)
+
+
+'''
+Read-only JSON stats service over the database (asyncio, standard library HTTP/1.1).
+- GET /health                         ingest version
+  GET /matches                        newest first; match_type (repeatable), team, opponent, since, until
+  GET /matches/<match_id>             match row and innings totals
+  GET /matches/<match_id>/scorecard   batting and bowling cards of every innings
+  GET /players                        career leaderboard; role=batting|bowling, match_type, team, min_innings
+  GET /players/<name>                 one player's career per match type, over all of their aliases
+  GET /head-to-head?team=Nepal        won / lost / tied / no result against every opponent (or one)
+- Scorecards come from the scorecard tables filled at ingest time; leaderboards are summed
+  from them. Result tables (leaderboards, head-to-head) are built once per ingest version and
+  the encoded JSON bodies are kept in an LRU per ingest version, so a repeated request is a
+  dict lookup. When the version moves the old entries are dropped and the common responses
+  (leaderboards per match type, head-to-head, first page of matches) are computed again
+  before anyone asks.
+- The ingest version (ingest_state.version) is polled every --version-interval seconds. Every
+  response carries ETag "<version>-<format>-<request digest>" and Cache-Control: no-cache, so a client
+  revalidates with If-None-Match and gets 304 without a database read until the next ingest.
+- Lists are keyset-paginated: the response has next_cursor, passed back as cursor=. /matches
+  seeks on (dates, match_id) through ix_matches_dates; /players seeks in the precomputed
+  leaderboard. limit is capped at MAX_LIMIT.
+- Database work runs in a thread pool the size of the interactive-analytics pool, with one
+  pooled Session per call; the event loop only parses requests and writes bytes.
+- The same leaderboard or card requested while it's being computed waits for that one computation.
+
+Use case
+python main.py serve --port 8080
+curl -s 'localhost:8080/players?role=bowling&match_type=ODI&limit=5'
+curl -s 'localhost:8080/matches?team=Nepal&limit=20&cursor=<next_cursor>'
+python main.py loadtest --url http://127.0.0.1:8080 --duration 10
+'''
+
+DEFAULT_PORT = 8080
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+DB_THREADS = 8            # Threads running queries (the interactive-analytics pool is 5 + 10 overflow)
+VERSION_INTERVAL = 0.5    # Seconds between two reads of the ingest version
+CACHE_MB = 64             # Encoded responses kept per ingest version
+RESPONSE_FORMAT = 1       # Part of every ETag; bump when a response shape changes
+
+MATCH_FIELDS = ['match_id', 'dates', 'match_type', 'team1', 'team2', 'venue', 'city', 'winner', 'result_type']
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise HTTPError(400, "invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPError(400, "invalid cursor")
+    return values
+
+
+def records(df):
+    """JSON-ready rows of a DataFrame (NaN -> null, numpy scalars -> Python)"""
+    return json.loads(df.to_json(orient='records'))
+
+
+def encode_json(value):
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+class Params:
+    """Query string access with validation errors as 400s"""
+
+    def __init__(self, query):
+        self.values = parse_qs(query, keep_blank_values=False)
+
+    def one(self, name, default=None):
+        values = self.values.get(name)
+        return values[-1].strip() if values else default
+
+    def many(self, name):
+        return sorted({value.strip() for value in self.values.get(name, [])})
+
+    def integer(self, name, default, minimum=0, maximum=None):
+        value = self.one(name)
+        if value is None:
+            return default
+        try:
+            number = int(value)
+        except ValueError:
+            raise HTTPError(400, f"{name} must be an integer")
+        if number < minimum or (maximum is not None and number > maximum):
+            raise HTTPError(400, f"{name} must be between {minimum} and {maximum}")
+        return number
+
+    def key(self):
+        """Order-independent form, part of the cache key and the ETag"""
+        return tuple(sorted((name, tuple(sorted(values))) for name, values in self.values.items()))
+
+
+# --- Queries (run in the thread pool, one Session each) ----------------------------------
+
+def match_page(session, match_types, team, opponent, since, until, cursor, limit):
+    """One page of matches, newest first, seeking past the cursor's (dates, match_id)"""
+    m = CricketMatch
+    query = select(*[getattr(m, field) for field in MATCH_FIELDS])
+    if match_types:
+        query = query.where(m.match_type.in_(match_types))
+    if team:
+        query = query.where(or_(m.team1 == team, m.team2 == team))
+    if opponent:
+        query = query.where(or_(m.team1 == opponent, m.team2 == opponent))
+    if since:
+        query = query.where(m.dates >= since)
+    if until:
+        query = query.where(m.dates <= until)
+    if cursor:
+        query = query.where(tuple_(m.dates, m.match_id) < tuple_(*cursor))
+    rows = session.execute(query.order_by(m.dates.desc(), m.match_id.desc()).limit(limit + 1)).mappings().all()
+    matches = [dict(row) for row in rows[:limit]]
+    next_cursor = encode_cursor([matches[-1]['dates'], matches[-1]['match_id']]) if len(rows) > limit else None
+    return {'matches': matches, 'next_cursor': next_cursor}
+
+
+def match_detail(session, match_id):
+    match = session.query(CricketMatch).filter(CricketMatch.match_id == match_id).one_or_none()
+    if match is None:
+        return None
+    columns = [column.name for column in CricketMatch.__table__.columns if column.name != 'id']
+    return {'match': {column: getattr(match, column) for column in columns},
+            'innings': records(get_innings_scorecard.uncached(session, match_id))}
+
+
+def match_scorecard(session, match_id):
+    innings = get_innings_scorecard.uncached(session, match_id)
+    if innings.empty:
+        return None
+    batting = get_batting_scorecard.uncached(session, match_id)
+    bowling = get_bowling_scorecard.uncached(session, match_id)
+    return {'match_id': match_id, 'innings': [
+        {**row, 'batting': records(batting[batting['innings_number'] == row['innings_number']]),
+         'bowling': records(bowling[bowling['innings_number'] == row['innings_number']])}
+        for row in records(innings)]}
+
+
+def leaderboard(session, role, match_types, team, min_innings):
+    """Rows of a career leaderboard and their sort keys (for seeking), in leaderboard order"""
+    if role == 'batting':
+        rows = records(get_player_batting_stats.uncached(session, match_types or None, team, min_innings))
+        keys = [(-row['runs'], row['batter']) for row in rows]
+    else:
+        rows = records(get_player_bowling_stats.uncached(session, match_types or None, team, min_innings))
+        keys = [(-row['wickets'], row['runs'], row['bowler']) for row in rows]
+    return rows, keys
+
+
+def player_career(session, name):
+    aliases = player_aliases(session, name)
+    names = sorted(set(aliases['alias'])) or [name]
+    batting, bowling = get_player_career.uncached(session, names)
+    if batting.empty and bowling.empty:
+        return None
+    return {'name': name,
+            'registry_ids': sorted(set(aliases['registry_id'])),
+            'aliases': names,
+            'batting': records(batting),
+            'bowling': records(bowling)}
+
+
+def match_results(session):
+    """(match_type, team1, team2, winner, result_type, dates) of every match"""
+    m = CricketMatch
+    return [tuple(row) for row in session.execute(select(m.match_type, m.team1, m.team2, m.winner,
+                                                         m.result_type, m.dates))]
+
+
+def head_to_head(results, team, opponent=None, match_types=()):
+    """Record of team against every opponent (or one), from match_results rows"""
+    table = {}
+    for match_type, team1, team2, winner, result_type, dates in results:
+        if team not in (team1, team2) or (match_types and match_type not in match_types):
+            continue
+        other = team2 if team1 == team else team1
+        if opponent and other != opponent:
+            continue
+        record = table.setdefault(other, {'opponent': other, 'played': 0, 'won': 0, 'lost': 0, 'tied': 0,
+                                          'no_result': 0, 'last_played': None})
+        record['played'] += 1
+        if winner == team:
+            record['won'] += 1
+        elif winner == other:
+            record['lost'] += 1
+        elif result_type == 'tie':
+            record['tied'] += 1
+        else:
+            record['no_result'] += 1
+        if dates and dates != 'None' and (record['last_played'] is None or dates > record['last_played']):
+            record['last_played'] = dates
+    return sorted(table.values(), key=lambda record: (-record['played'], record['opponent']))
+
+
+# --- Service ---------------------------------------------------------------------------
+
+class VersionState:
+    """Responses and result tables of one ingest version"""
+
+    def __init__(self, version, max_bytes):
+        self.version = version
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.responses = OrderedDict()  # (path, params key) -> encoded body
+        self.tables = {}                # leaderboards and match results
+        self.pending = {}               # key -> Future of a computation in progress
+
+    def get(self, key):
+        body = self.responses.get(key)
+        if body is not None:
+            self.responses.move_to_end(key)
+        return body
+
+    def put(self, key, body):
+        self.responses[key] = body
+        self.bytes += len(body)
+        while self.bytes > self.max_bytes and len(self.responses) > 1:
+            _, old = self.responses.popitem(last=False)
+            self.bytes -= len(old)
+
+
+class StatsService:
+    def __init__(self, database_url=None, db_threads=DB_THREADS, version_interval=VERSION_INTERVAL,
+                 cache_mb=CACHE_MB, warm=True):
+        """
+        Args:
+            database_url: Database connection string (defaults to get_database_config())
+            db_threads: Threads running queries, each with its own pooled Session
+            version_interval: Seconds between two reads of the ingest version
+            cache_mb: Encoded responses kept per ingest version
+            warm: Compute the common responses as soon as a new ingest version shows up
+        """
+        self.db = DatabaseManager(database_url or get_database_config(), profile='interactive-analytics')
+        self.executor = ThreadPoolExecutor(max_workers=db_threads, thread_name_prefix='stats-db')
+        self.version_interval = version_interval
+        self.max_bytes = int(cache_mb * 1024 * 1024)
+        self.warm = warm
+        self.state = None
+        self.counters = Counter()
+        self.routes = [
+            (re.compile(r'/health'), self.health),
+            (re.compile(r'/matches'), self.matches),
+            (re.compile(r'/matches/([^/]+)'), self.match),
+            (re.compile(r'/matches/([^/]+)/scorecard'), self.scorecard),
+            (re.compile(r'/players'), self.players),
+            (re.compile(r'/players/([^/]+)'), self.player),
+            (re.compile(r'/head-to-head'), self.head_to_head),
+        ]
+
+    def _with_session(self, fn, args):
+        session = self.db.get_session()
+        try:
+            return fn(session, *args)
+        finally:
+            session.close()
+
+    async def run_db(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._with_session, fn, args)
+
+    async def once(self, state, key, compute):
+        """compute() for key at most once at a time per version; later callers share its result"""
+        future = state.pending.get(key)
+        if future is None:
+            future = asyncio.ensure_future(compute())
+            state.pending[key] = future
+            future.add_done_callback(lambda _: state.pending.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def table(self, state, key, fn, *args):
+        """Result table built once per ingest version"""
+        if key not in state.tables:
+            state.tables[key] = await self.once(state, ('table', key), lambda: self.run_db(fn, *args))
+        return state.tables[key]
+
+    # --- Versions ------------------------------------------------------------------
+
+    async def refresh_version(self):
+        version = await self.run_db(lambda session: read_ingest_version(session.connection()))
+        if self.state is None or version != self.state.version:
+            previous = self.state.version if self.state else None
+            self.state = VersionState(version, self.max_bytes)
+            self.counters['versions'] += 1
+            if previous is not None:
+                print(f"🔄 Ingest version {previous} -> {version}, responses recomputed")
+            if self.warm:
+                asyncio.ensure_future(self.warm_up(self.state))
+
+    async def track_version(self):
+        while True:
+            await asyncio.sleep(self.version_interval)
+            try:
+                await self.refresh_version()
+            except Exception as e:
+                print(f"  ⚠️  Couldn't read the ingest version: {e}")
+
+    async def warm_up(self, state):
+        """Compute the common responses of a new version before they're asked for"""
+        started = time.perf_counter()
+        results = await self.table(state, 'results', match_results)
+        match_types = sorted({row[0] for row in results if row[0]})
+        targets = ['/matches', '/players?role=batting', '/players?role=bowling']
+        for match_type in match_types:
+            targets += [f'/players?role=batting&match_type={match_type}',
+                        f'/players?role=bowling&match_type={match_type}',
+                        f'/matches?match_type={match_type}']
+        for target in targets:
+            if self.state is not state:
+                return
+            try:
+                await self.body(state, *self.parse(target))
+            except Exception as e:
+                print(f"  ⚠️  Couldn't precompute {target}: {e}")
+        print(f"🔥 Precomputed {len(targets)} responses for ingest version {state.version} "
+              f"in {time.perf_counter() - started:.2f}s")
+
+    # --- Handlers (return a JSON-able value; None is a 404) --------------------------
+
+    async def health(self, state, params):
+        return {'status': 'ok', 'ingest_version': state.version}
+
+    async def matches(self, state, params):
+        limit = params.integer('limit', DEFAULT_LIMIT, 1, MAX_LIMIT)
+        cursor = params.one('cursor')
+        cursor = decode_cursor(cursor) if cursor else None
+        if cursor is not None and len(cursor) != 2:
+            raise HTTPError(400, "invalid cursor")
+        return await self.run_db(match_page, params.many('match_type'), params.one('team'),
+                                 params.one('opponent'), params.one('since'), params.one('until'), cursor, limit)
+
+    async def match(self, state, params, match_id):
+        return await self.run_db(match_detail, match_id)
+
+    async def scorecard(self, state, params, match_id):
+        return await self.run_db(match_scorecard, match_id)
+
+    async def players(self, state, params):
+        role = params.one('role', 'batting')
+        if role not in ('batting', 'bowling'):
+            raise HTTPError(400, "role must be batting or bowling")
+        match_types, team = tuple(params.many('match_type')), params.one('team')
+        min_innings = params.integer('min_innings', 1, 1)
+        limit = params.integer('limit', DEFAULT_LIMIT, 1, MAX_LIMIT)
+        rows, keys = await self.table(state, ('leaderboard', role, match_types, team, min_innings),
+                                      leaderboard, role, list(match_types), team, min_innings)
+        start = 0
+        cursor = params.one('cursor')
+        if cursor:
+            try:
+                start = bisect_right(keys, tuple(decode_cursor(cursor)))
+            except TypeError:
+                raise HTTPError(400, "invalid cursor")
+        page = rows[start:start + limit]
+        next_cursor = encode_cursor(list(keys[start + limit - 1])) if start + limit < len(rows) else None
+        return {'role': role, 'total': len(rows), 'players': page, 'next_cursor': next_cursor}
+
+    async def player(self, state, params, name):
+        return await self.run_db(player_career, name)
+
+    async def head_to_head(self, state, params):
+        team = params.one('team')
+        if not team:
+            raise HTTPError(400, "team is required")
+        results = await self.table(state, 'results', match_results)
+        opponent = params.one('opponent')
+        return {'team': team, 'records': head_to_head(results, team, opponent, set(params.many('match_type')))}
+
+    # --- HTTP ----------------------------------------------------------------------
+
+    def route(self, path):
+        for pattern, handler in self.routes:
+            matched = pattern.fullmatch(path)
+            if matched:
+                return handler, [unquote(group) for group in matched.groups()]
+        raise HTTPError(404, f"no route for {path}")
+
+    def parse(self, target):
+        """(handler, path arguments, Params, cache key) of a request target"""
+        parts = urlsplit(target)
+        path = parts.path.rstrip('/') or '/'
+        handler, args = self.route(path)
+        params = Params(parts.query)
+        return handler, args, params, (path, params.key())
+
+    @staticmethod
+    def etag(state, key):
+        return f'"{state.version}-{RESPONSE_FORMAT}-{hashlib.sha1(repr(key).encode()).hexdigest()[:16]}"'
+
+    async def body(self, state, handler, args, params, key):
+        """Encoded body of a request, from the version's cache when possible"""
+        body = state.get(key)
+        if body is not None:
+            self.counters['cache_hits'] += 1
+            return body
+
+        async def compute():
+            value = await handler(state, params, *args)
+            if value is None:
+                raise HTTPError(404, f"nothing found for {key[0]}")
+            return encode_json(value)
+
+        self.counters['cache_misses'] += 1
+        body = await self.once(state, key, compute)
+        if handler != self.health:
+            state.put(key, body)
+        return body
+
+    async def respond(self, method, target, headers):
+        """(status, extra headers, body) of one request"""
+        self.counters['requests'] += 1
+        if method not in ('GET', 'HEAD'):
+            return 405, {'Allow': 'GET, HEAD'}, encode_json({'error': "read-only service"})
+        state = self.state
+        try:
+            handler, args, params, key = self.parse(target)
+            extra = {'Content-Type': 'application/json; charset=utf-8', 'X-Ingest-Version': str(state.version)}
+            if handler != self.health:
+                # The ETag is known without the body, so a revalidation never touches the database
+                extra.update({'ETag': self.etag(state, key), 'Cache-Control': 'no-cache'})
+                if_none_match = headers.get('if-none-match')
+                if if_none_match and (if_none_match.strip() == '*' or extra['ETag'] in
+                                      [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]):
+                    self.counters['not_modified'] += 1
+                    return 304, {'ETag': extra['ETag'], 'Cache-Control': 'no-cache'}, b''
+            return 200, extra, await self.body(state, handler, args, params, key)
+        except HTTPError as e:
+            self.counters[f'http_{e.status}'] += 1
+            return e.status, {'Content-Type': 'application/json; charset=utf-8'}, encode_json({'error': e.message})
+        except Exception as e:
+            self.counters['http_500'] += 1
+            print(f"  ❌ Error serving {target}: {e}")
+            return 500, {'Content-Type': 'application/json; charset=utf-8'}, encode_json({'error': "internal error"})
+
+    async def handle_connection(self, reader, writer):
+        """HTTP/1.1 with keep-alive; requests on a connection are answered in order"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, http_version = request_line.decode('latin-1').split()
+                except ValueError:
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if int(headers.get('content-length') or 0):
+                    await reader.readexactly(int(headers['content-length']))
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if http_version == 'HTTP/1.1' else connection == 'keep-alive'
+                status, extra, body = await self.respond(method, target, headers)
+                head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}", f"Content-Length: {len(body)}"]
+                head += [f"{name}: {value}" for name, value in extra.items()]
+                if not keep_alive:
+                    head.append("Connection: close")
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + (body if method != 'HEAD' else b''))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """Serve until SIGINT / SIGTERM"""
+        if not self.db.connect():
+            return False
+        try:
+            await self.refresh_version()
+        except Exception as e:
+            print(f"❌ Couldn't read the ingest version ({e}); run `python main.py migrate migrate` first")
+            self.db.close()
+            return False
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        tracker = asyncio.ensure_future(self.track_version())
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        print(f"🌐 Serving stats on http://{host}:{port} (ingest version {self.state.version}), Ctrl+C to stop")
+        async with server:
+            await stop.wait()
+        tracker.cancel()
+        self.executor.shutdown(wait=True)
+        self.db.close()
+        print(f"📊 {dict(self.counters)}")
+        return True
+
+
+def main(argv=None):
+    """Serve the stats API"""
+    parser = argparse.ArgumentParser(description="Read-only JSON stats service")
+    parser.add_argument('--database-url', default=None, help="Defaults to the DB_* environment variables")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--db-threads', type=int, default=DB_THREADS, help="Threads running queries")
+    parser.add_argument('--version-interval', type=float, default=VERSION_INTERVAL,
+                        help="Seconds between two reads of the ingest version")
+    parser.add_argument('--cache-mb', type=float, default=CACHE_MB, help="Encoded responses kept per ingest version")
+    parser.add_argument('--no-warm', dest='warm', action='store_false',
+                        help="Don't precompute the common responses when the ingest version moves")
+    args = parser.parse_args(argv)
+
+    service = StatsService(args.database_url, db_threads=args.db_threads, version_interval=args.version_interval,
+                           cache_mb=args.cache_mb, warm=args.warm)
+    asyncio.run(service.serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
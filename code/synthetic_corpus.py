@@ -0,0 +1,315 @@
+import argparse
+import hashlib
+import json
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DATA_DIR = PROJECT_ROOT / 'data'
+SYNTHETIC_DIR = DATA_DIR / 'synthetic'
+
+
+'''
+Synthetic Cricsheet match files for benchmarking at scales the real corpus can't reach.
+- Same layout as the real files: meta / info / innings -> overs -> deliveries, indented the same way,
+  so every reader in code/ (json.load, match_stream, catalog) handles them unchanged.
+- Scale 1 is the size of data/Nepal/ODI (72 matches); --scale 10 / 100 / 1000 multiply it.
+- Covers the awkward cases: wides and no-balls (extra deliveries in an over), byes / leg byes,
+  every dismissal kind, reviews, two wickets on one ball, chases that stop mid-over, and tied
+  matches decided by super over innings.
+- Deterministic: the same seed and scale always write the same files.
+
+Use case
+python code/synthetic_corpus.py --scale 10
+python code/synthetic_corpus.py --scale 100 --match-type ODI --match-type T20
+'''
+
+BASE_MATCHES = 72  # data/Nepal/ODI
+FIRST_MATCH_ID = 9000001  # Well clear of real Cricsheet IDs
+MATCH_OVERS = {'ODI': 50, 'ODM': 50, 'T20': 20, 'IT20': 20}
+
+TEAMS = ['Nepal', 'United Arab Emirates', 'Oman', 'Scotland', 'Namibia', 'Netherlands', 'Papua New Guinea',
+         'United States of America', 'Canada', 'Hong Kong', 'Kenya', 'Malaysia', 'Singapore', 'Qatar']
+VENUES = [('Tribhuvan University International Cricket Ground', 'Kirtipur'), ('Dubai International Cricket Stadium', 'Dubai'),
+          ('Al Amerat Cricket Ground', 'Al Amarat'), ('Kinrara Academy Oval', 'Kuala Lumpur'),
+          ('Wanderers Cricket Ground', 'Windhoek'), ('The Grange Club', 'Edinburgh')]
+FIRST_NAMES = ['A', 'B', 'D', 'G', 'K', 'M', 'P', 'R', 'S', 'T', 'Y', 'AK', 'RK', 'SP']
+SURNAMES = ['Sharma', 'Khan', 'Malla', 'Airee', 'Bhurtel', 'Paudel', 'Rajbanshi', 'Watts', 'Cross', 'Leask',
+            'Smit', 'Erasmus', 'Vala', 'Ali', 'Naseem', 'Patel', 'Singh', 'Jha', 'Kami', 'Sheikh']
+
+# Ball outcomes per delivery: (outcome, weight)
+OUTCOMES = [('dot', 440), ('run', 300), ('four', 80), ('six', 30), ('wicket', 28), ('wide', 29),
+            ('legbye', 10), ('bye', 3), ('noball', 3)]
+BATTER_RUNS = [(1, 78), (2, 18), (3, 4)]
+WICKET_KINDS = [('caught', 2447), ('bowled', 970), ('lbw', 576), ('run out', 455), ('stumped', 165),
+                ('caught and bowled', 151), ('hit wicket', 6), ('obstructing the field', 4),
+                ('retired hurt', 3), ('retired out', 3)]
+FIELDED_WICKETS = {'caught', 'run out', 'stumped'}
+MULTI_WICKET_RATE = 0.03  # Share of run outs where the non-striker also goes (retired hurt) on the same ball
+REVIEW_RATE = 0.004
+TIE_EVERY = 12  # Every 12th match is steered towards a tie so scale 1 already has super overs
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def _person_id(name):
+    return hashlib.sha1(name.encode()).hexdigest()[:8]
+
+
+def _name_pools():
+    """FIRST_NAMES x SURNAMES shuffled once and split into one disjoint pool per team"""
+    names = sorted(f"{first} {surname}" for first in FIRST_NAMES for surname in SURNAMES)
+    random.Random('squads').shuffle(names)
+    per_team = len(names) // len(TEAMS)
+    return {team: names[i * per_team:(i + 1) * per_team] for i, team in enumerate(TEAMS)}
+
+
+NAME_POOLS = _name_pools()  # No name plays for two teams, so one name is one registry person
+
+
+def team_squad(team, size=16):
+    """Stable squad of made-up names for a team"""
+    rng = random.Random(f"squad:{team}")
+    return sorted(rng.sample(NAME_POOLS[team], size))
+
+
+class InningsSimulator:
+    """Ball-by-ball simulation of one innings, producing Cricsheet deliveries"""
+
+    def __init__(self, rng, batting_order, bowlers, fielders, bowling_team, max_overs, max_wickets=10,
+                 target=None, steer_tie=False):
+        self.rng = rng
+        self.bowling_team = bowling_team
+        self.order = batting_order
+        self.bowlers = bowlers
+        self.fielders = fielders
+        self.max_overs = max_overs
+        self.max_wickets = max_wickets
+        self.target = target
+        self.steer_tie = steer_tie
+
+        self.striker, self.non_striker = batting_order[0], batting_order[1]
+        self.next_batter = 2
+        self.runs = 0
+        self.wickets = 0
+        self.batter_runs = {}
+
+    def finished(self):
+        if self.wickets >= self.max_wickets or self.next_batter > len(self.order):
+            return True
+        return self.target is not None and self.runs >= self.target
+
+    def replace(self, player_out):
+        self.wickets += 1
+        incoming = self.order[self.next_batter] if self.next_batter < len(self.order) else None
+        self.next_batter += 1
+        if player_out == self.striker:
+            self.striker = incoming
+        else:
+            self.non_striker = incoming
+
+    def wicket(self, kind):
+        record = {'player_out': self.striker, 'kind': kind}
+        if kind in FIELDED_WICKETS:
+            record['fielders'] = [{'name': self.rng.choice(self.fielders)}]
+        if kind == 'run out' and self.rng.random() < 0.5:
+            record['player_out'] = self.non_striker
+        wickets = [record]
+        if kind == 'run out' and self.rng.random() < MULTI_WICKET_RATE and self.wickets + 2 <= self.max_wickets:
+            other = self.non_striker if record['player_out'] == self.striker else self.striker
+            wickets.append({'player_out': other, 'kind': 'retired hurt'})
+        return wickets
+
+    def delivery(self, bowler):
+        """One delivery dict; returns (delivery, legal)"""
+        rng = self.rng
+        outcome = _weighted(rng, OUTCOMES)
+        batter_runs, extras, legal, wickets = 0, {}, True, None
+        if outcome == 'run':
+            batter_runs = _weighted(rng, BATTER_RUNS)
+        elif outcome == 'four':
+            batter_runs = 4
+        elif outcome == 'six':
+            batter_runs = 6
+        elif outcome == 'wide':
+            extras['wides'] = 5 if rng.random() < 0.03 else 1
+            legal = False
+        elif outcome == 'noball':
+            extras['noballs'] = 1
+            batter_runs = rng.choice([0, 0, 1, 4, 6])
+            legal = False
+        elif outcome == 'legbye':
+            extras['legbyes'] = rng.choice([1, 1, 1, 4])
+        elif outcome == 'bye':
+            extras['byes'] = rng.choice([1, 4])
+        elif outcome == 'wicket':
+            wickets = self.wicket(_weighted(rng, WICKET_KINDS))
+            if wickets[0]['kind'] == 'run out':
+                batter_runs = rng.choice([0, 1])
+
+        extra_runs = sum(extras.values())
+        if self.steer_tie and self.runs + batter_runs + extra_runs >= self.target:
+            # Tie steering: nothing may take the chase past the first innings score
+            batter_runs, extras, extra_runs, legal, wickets = 0, {}, 0, True, None
+        delivery = {'batter': self.striker, 'bowler': bowler}
+        if extras:
+            delivery['extras'] = extras
+        delivery['non_striker'] = self.non_striker
+        if outcome == 'dot' and rng.random() < REVIEW_RATE:
+            delivery['review'] = {'by': self.bowling_team, 'umpire': 'Synthetic Umpire', 'batter': self.striker,
+                                  'decision': 'struck down', 'type': 'wicket'}
+        delivery['runs'] = {'batter': batter_runs, 'extras': extra_runs, 'total': batter_runs + extra_runs}
+        if wickets:
+            delivery['wickets'] = wickets
+
+        self.runs += batter_runs + extra_runs
+        self.batter_runs[self.striker] = self.batter_runs.get(self.striker, 0) + batter_runs
+        if wickets:
+            for wicket in wickets:
+                self.replace(wicket['player_out'])
+        # Odd runs taken by running swap ends (boundary wides count as running for simplicity)
+        ran = batter_runs + extras.get('legbyes', 0) + extras.get('byes', 0) + max(extras.get('wides', 1) - 1, 0)
+        if ran % 2 == 1:
+            self.striker, self.non_striker = self.non_striker, self.striker
+        return delivery, legal
+
+    def play(self):
+        """List of Cricsheet overs"""
+        overs = []
+        previous_bowler = None
+        spells = dict.fromkeys(self.bowlers, 0)
+        max_spell = max(self.max_overs // 5, 1)  # 10 overs each in an ODI, 4 in a T20
+        for over_num in range(self.max_overs):
+            if self.finished():
+                break
+            available = [b for b in self.bowlers if b != previous_bowler and spells[b] < max_spell]
+            bowler = self.rng.choice(available)
+            spells[bowler] += 1
+            previous_bowler = bowler
+            deliveries, legal_balls = [], 0
+            while legal_balls < 6 and not self.finished():
+                delivery, legal = self.delivery(bowler)
+                deliveries.append(delivery)
+                legal_balls += legal
+            overs.append({'over': over_num, 'deliveries': deliveries})
+            self.striker, self.non_striker = self.non_striker, self.striker
+        return overs
+
+
+def _powerplays(max_overs):
+    if max_overs == 20:
+        return [{'from': 0.1, 'to': 5.6, 'type': 'mandatory'}]
+    return [{'from': 0.1, 'to': 9.6, 'type': 'mandatory'}, {'from': 10.1, 'to': 39.6, 'type': 'mandatory'},
+            {'from': 40.1, 'to': 49.6, 'type': 'mandatory'}]
+
+
+def _squads(rng, teams):
+    xi = {team: rng.sample(team_squad(team), 11) for team in teams}
+    bowlers = {team: players[-6:] for team, players in xi.items()}
+    return xi, bowlers
+
+
+def _super_over(rng, batting, bowling, xi, bowlers, target=None):
+    sim = InningsSimulator(rng, xi[batting][:3], bowlers[bowling][:2], xi[bowling], bowling, max_overs=1,
+                           max_wickets=2, target=target)
+    return {'team': batting, 'overs': sim.play(), 'super_over': True}, sim.runs
+
+
+def generate_match(index, match_type='ODI', seed=0):
+    """One synthetic match document; index makes every match different and repeatable"""
+    rng = random.Random(seed * 1_000_003 + index)
+    max_overs = MATCH_OVERS[match_type]
+    teams = rng.sample(TEAMS, 2)
+    venue, city = rng.choice(VENUES)
+    match_date = date(2015, 1, 1) + timedelta(days=rng.randrange(3650))
+    xi, bowlers = _squads(rng, teams)
+
+    toss_winner = rng.choice(teams)
+    toss_decision = rng.choice(['bat', 'field'])
+    first = toss_winner if toss_decision == 'bat' else next(t for t in teams if t != toss_winner)
+    second = next(t for t in teams if t != first)
+
+    sim1 = InningsSimulator(rng, xi[first], bowlers[second], xi[second], second, max_overs)
+    innings = [{'team': first, 'overs': sim1.play(), 'powerplays': _powerplays(max_overs)}]
+    target = sim1.runs + 1
+    sim2 = InningsSimulator(rng, xi[second], bowlers[first], xi[first], first, max_overs, target=target,
+                            steer_tie=index % TIE_EVERY == TIE_EVERY - 1)
+    innings.append({'team': second, 'overs': sim2.play(), 'powerplays': _powerplays(max_overs),
+                    'target': {'overs': max_overs, 'runs': target}})
+
+    if sim2.runs >= target:
+        outcome = {'winner': second, 'by': {'wickets': max(10 - sim2.wickets, 1)}}
+    elif sim2.runs < sim1.runs:
+        outcome = {'winner': first, 'by': {'runs': sim1.runs - sim2.runs}}
+    else:
+        # Tie: the side batting second bats first in the super over
+        super1, runs1 = _super_over(rng, second, first, xi, bowlers)
+        super2, runs2 = _super_over(rng, first, second, xi, bowlers, target=runs1 + 1)
+        innings += [super1, super2]
+        outcome = {'result': 'tie', 'eliminator': first if runs2 > runs1 else second}
+
+    batter_runs = {**sim1.batter_runs, **sim2.batter_runs}
+    people = sorted(xi[first] + xi[second])
+    match_id = FIRST_MATCH_ID + index
+    info = {
+        'balls_per_over': 6,
+        'city': city,
+        'dates': [match_date.isoformat()],
+        'event': {'name': 'Synthetic Series', 'match_number': index % 50 + 1},
+        'gender': 'male',
+        'match_type': match_type,
+        'match_type_number': match_id - FIRST_MATCH_ID + 1,
+        'officials': {'umpires': ['Synthetic Umpire', 'Second Umpire']},
+        'outcome': outcome,
+        'overs': max_overs,
+        'player_of_match': [max(batter_runs, key=batter_runs.get)],
+        'players': {team: xi[team] for team in teams},
+        'registry': {'people': {name: _person_id(name) for name in people}},
+        'season': str(match_date.year),
+        'team_type': 'international',
+        'teams': teams,
+        'toss': {'decision': toss_decision, 'winner': toss_winner},
+        'venue': venue,
+    }
+    meta = {'data_version': '1.1.0', 'created': match_date.isoformat(), 'revision': 1}
+    return str(match_id), {'meta': meta, 'info': info, 'innings': innings}
+
+
+def corpus_dir(scale, out_root=SYNTHETIC_DIR):
+    return Path(out_root) / f"x{scale}"
+
+
+def generate_corpus(scale=1, out_dir=None, match_types=('ODI',), seed=0):
+    """Write BASE_MATCHES * scale match files (skipping ones already there); returns the directory"""
+    out_dir = Path(out_dir) if out_dir else corpus_dir(scale)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for index in range(BASE_MATCHES * scale):
+        out_path = out_dir / f"{FIRST_MATCH_ID + index}.json"
+        if out_path.exists():
+            continue
+        match_id, match = generate_match(index, match_types[index % len(match_types)], seed)
+        with open(out_path, 'w') as f:
+            json.dump(match, f, indent=2)
+    return out_dir
+
+
+def main(argv=None):
+    """Write a synthetic corpus"""
+    parser = argparse.ArgumentParser(description="Generate synthetic Cricsheet match files")
+    parser.add_argument('--scale', type=int, default=1, help=f"Multiple of the ODI corpus ({BASE_MATCHES} matches)")
+    parser.add_argument('--out-dir', default=None, help="Defaults to data/synthetic/x<scale>")
+    parser.add_argument('--match-type', action='append', choices=sorted(MATCH_OVERS), default=None,
+                        help="Repeatable; match types are used in turn (default: ODI)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    out_dir = generate_corpus(args.scale, args.out_dir, tuple(args.match_type or ['ODI']), args.seed)
+    print(f"✅ {BASE_MATCHES * args.scale} matches in {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,180 @@
-def main():
-    print("Hello from cricket-nepal!")
+import time
+
+STARTED = time.perf_counter()
+
+import importlib
+import json
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+CODE_DIR = PROJECT_ROOT / 'code'
+DATA_DIR = PROJECT_ROOT / 'data'
+
+STARTUP_LOG = DATA_DIR / 'benchmarks' / 'startup.jsonl'
+
+# The modules in code/ import each other by bare name
+sys.path.insert(0, str(CODE_DIR))
+
+
+'''
+Single entry point for the project.
+- Each subcommand lives in its own module under code/ and is only imported when it runs,
+  so pandas / SQLAlchemy / pyarrow are never loaded for commands that don't use them.
+- Importing any module has no side effects (no file reads, no prints, no DB connections).
+- --timing reports the wall time and which heavy modules a command loaded;
+  `python main.py startup` measures cold starts in fresh interpreters and appends the
+  result to data/benchmarks/startup.jsonl so regressions show up over time.
+
+Use case
+python main.py catalog --match-type ODI --team Nepal
+python main.py ingest --write-mode bulk --workers 4
+python main.py ingest-async --writers 4
+python main.py watch --latency-log data/benchmarks/watch_latency.jsonl
+python main.py scorecard show 1154649
+python main.py export 1154649 --format xlsx
+python main.py serve --port 8080
+python main.py bench run --scale 10
+python main.py startup
+'''
+
+# command -> (module in code/, needs database settings, help)
+COMMANDS = {
+    'ingest': ('process_nepal_odi', True, "Load match JSON files into the database"),
+    'ingest-async': ('async_ingest', True, "Load match files with overlapping read / parse / write stages"),
+    'catalog': ('match_catalog', False, "List matches from the file headers"),
+    'validate': ('match_validation', False, "Check match files the way the ingest does, without loading them"),
+    'watch': ('ingest_watch', True, "Ingest new match files as they land in the data directories"),
+    'scorecard': ('scorecards', True, "Show or refresh the stored scorecards"),
+    'export': ('match_export', False, "Export flattened matches or scorecards to CSV / Excel / Parquet"),
+    'migrate': ('schema_migrations', True, "Bring an existing database up to the current schema"),
+    'state': ('match_state', True, "Backfill the per-ball match state columns"),
+    'players': ('player_registry', True, "Backfill or look up the players dimension"),
+    'matchups': ('matchups', True, "Batter-vs-bowler matchups, or rebuild their index"),
+    'deliveries': ('delivery_reader', True, "Stream deliveries out of the database in typed chunks"),
+    'serve': ('stats_service', True, "Serve match lists, scorecards and player stats as JSON over HTTP"),
+    'loadtest': ('stats_loadtest', False, "Load-test the stats service"),
+    'snapshot': ('analytics_snapshot', False, "Build or query the Parquet + DuckDB snapshot"),
+    'archive': ('match_archive', False, "Pack or read the compressed match archive"),
+    'engine': ('ball_engine', False, "Build or query the in-memory ball engine"),
+    'bench': ('benchmarks', False, "Run the benchmark suite or compare recorded runs"),
+    'synthetic': ('synthetic_corpus', False, "Generate a synthetic Cricsheet corpus for benchmarks"),
+}
+
+HEAVY_MODULES = ['pandas', 'numpy', 'sqlalchemy', 'pyarrow', 'duckdb', 'openpyxl']
+
+# Commands that should start without any heavy module, with their budget in ms
+QUICK_COMMANDS = {
+    'help': (['--help'], 150),
+    'catalog': (['catalog', '--limit', '5'], 1500),
+}
+
+
+def load_env():
+    """Read .env into the environment (DB_* settings) when python-dotenv is installed"""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv(PROJECT_ROOT / '.env')
+
+
+def heavy_modules_loaded():
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def report_timing(command, timing):
+    elapsed_ms = (time.perf_counter() - STARTED) * 1000
+    heavy = heavy_modules_loaded()
+    if timing == 'json':
+        print(json.dumps({'command': command, 'ms': round(elapsed_ms, 1), 'heavy_modules': heavy}), file=sys.stderr)
+    else:
+        print(f"⏱️  {command}: {elapsed_ms:.1f} ms (heavy modules: {', '.join(heavy) or 'none'})", file=sys.stderr)
+
+
+def print_usage():
+    print("usage: python main.py [--timing] <command> [args...]\n")
+    print("commands:")
+    for name, (_, _, help_text) in COMMANDS.items():
+        print(f"  {name:<13} {help_text}")
+    print(f"  {'startup':<13} Measure cold-start time of the quick commands")
+    print("\nRun `python main.py <command> --help` for the options of a command.")
+
+
+def run_startup(argv):
+    """Time the quick commands in fresh interpreters and record the result"""
+    import argparse
+    parser = argparse.ArgumentParser(prog='main.py startup', description="Measure cold-start time")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--no-record', dest='record', action='store_false',
+                        help=f"Don't append the result to {STARTUP_LOG.relative_to(PROJECT_ROOT)}")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name, (command, budget_ms) in QUICK_COMMANDS.items():
+        wall, heavy = [], set()
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            proc = subprocess.run([sys.executable, str(Path(__file__).resolve()), '--timing=json', *command],
+                                  capture_output=True, text=True, cwd=PROJECT_ROOT)
+            wall.append((time.perf_counter() - started) * 1000)
+            for line in proc.stderr.splitlines():
+                if line.startswith('{'):
+                    heavy.update(json.loads(line)['heavy_modules'])
+        median_ms = statistics.median(wall)
+        ok = median_ms <= budget_ms and not heavy
+        results.append({'command': name, 'median_ms': round(median_ms, 1), 'min_ms': round(min(wall), 1),
+                        'budget_ms': budget_ms, 'heavy_modules': sorted(heavy), 'ok': ok})
+        status = '✅' if ok else '❌'
+        print(f"{status} {name:<10} median {median_ms:7.1f} ms  min {min(wall):7.1f} ms  "
+              f"(budget {budget_ms} ms, heavy modules: {', '.join(sorted(heavy)) or 'none'})")
+
+    if args.record:
+        STARTUP_LOG.parent.mkdir(parents=True, exist_ok=True)
+        with open(STARTUP_LOG, 'a') as f:
+            f.write(json.dumps({'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                                'python': sys.version.split()[0], 'runs': args.runs,
+                                'results': results}) + '\n')
+        print(f"📝 Recorded in {STARTUP_LOG}")
+    return all(result['ok'] for result in results)
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    timing = None
+    for flag in ('--timing', '--timing=json'):
+        if flag in argv:
+            argv.remove(flag)
+            timing = 'json' if flag.endswith('json') else 'text'
+
+    if not argv or argv[0] in ('-h', '--help'):
+        print_usage()
+        if timing:
+            report_timing('help', timing)
+        return
+
+    command, rest = argv[0], argv[1:]
+    if command == 'startup':
+        if not run_startup(rest):
+            raise SystemExit(1)
+        return
+    if command not in COMMANDS:
+        print_usage()
+        raise SystemExit(f"\n❌ Unknown command: {command}")
+
+    module_name, needs_database, _ = COMMANDS[command]
+    if needs_database:
+        load_env()
+    module = importlib.import_module(module_name)
+    sys.argv[0] = f"main.py {command}"  # argparse usage lines read "main.py <command> ..."
+    try:
+        module.main(rest)
+    finally:
+        if timing:
+            report_timing(command, timing)
 
 
 if __name__ == "__main__":
@@ -77,6 +77,7 @@ def test_database_connection():
         
         if db.connect():
             print("✅ Database connection successful!")
+            db.create_schema()
             print("✅ Database tables created/verified!")
             db.close()
             return True